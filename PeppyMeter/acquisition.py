@@ -0,0 +1,111 @@
+#! /usr/bin/python3
+# Copyright 2016-2024 PeppyMeter peppy.player@gmail.com
+#
+# This file is part of PeppyMeter.
+#
+# PeppyMeter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PeppyMeter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PeppyMeter. If not, see <http://www.gnu.org/licenses/>.
+
+import signal
+import logging
+
+from threading import Event
+from configparser import ConfigParser
+from configfileparser import FILE_CONFIG, DATA_SOURCE, PIPE_NAME, VOLUME_MAX_IN_PIPE, SHM_NAME, SHM_SLOTS, \
+    SPECTRUM_PIPE_NAME, SPECTRUM_SIZE
+from framedecoder import FrameDecoder, FRAME, FRAME_SIZE
+from levelbus import LevelBus, METER_BUS, SPECTRUM_BUS
+from reactor import InputReactor
+
+PIPE_BUFFER_SIZE = 1048576 # as defined for Raspberry OS in /proc/sys/fs/pipe-max-size
+
+class Acquisition(object):
+    """ Acquisition daemon. Owns the meter and spectrum pipes and publishes
+    decoded frames into the shared memory level buses which are read by
+    the 'shm' data source and any other consumers.
+    """
+
+    def __init__(self, config):
+        """ Initializer
+
+        :param config: data source configuration section
+        """
+        self.config = config
+        name = config[SHM_NAME]
+        slots = config[SHM_SLOTS]
+        self.reactor = InputReactor()
+        self.decoder = FrameDecoder(config[VOLUME_MAX_IN_PIPE], PIPE_BUFFER_SIZE)
+        self.meter_bus = LevelBus(name + METER_BUS, FRAME_SIZE, slots, create=True)
+        self.spectrum_bus = None
+        if config[SPECTRUM_PIPE_NAME] and config[SPECTRUM_SIZE]:
+            self.spectrum_bus = LevelBus(name + SPECTRUM_BUS, 4 * config[SPECTRUM_SIZE], slots, create=True)
+        self.stop_event = Event()
+
+    def start(self):
+        """ Open the pipes in the reactor """
+
+        self.reactor.add_pipe(self.config[PIPE_NAME], self.read_meter_pipe)
+        if self.spectrum_bus:
+            size = self.spectrum_bus.frame_size
+            reader = self.reactor.get_frame_reader(self.config[SPECTRUM_PIPE_NAME], size, PIPE_BUFFER_SIZE)
+            reader.listener = self.spectrum_bus.publish
+        self.reactor.start()
+
+    def read_meter_pipe(self, fd):
+        """ Publish the newest meter frame
+
+        :param fd: pipe file descriptor
+        :raise EOFError: the pipe writer is disconnected
+        """
+        frame = self.decoder.read(fd)
+        if frame:
+            self.meter_bus.publish(FRAME.pack(frame[0], frame[1]))
+
+    def run(self):
+        """ Run until SIGTERM or SIGINT """
+
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        self.start()
+        while not self.stop_event.wait(1.0):
+            pass
+        self.reactor.stop()
+        self.meter_bus.close()
+        if self.spectrum_bus:
+            self.spectrum_bus.close()
+
+    def stop(self, signum=None, frame=None):
+        """ Signal handler """
+
+        self.stop_event.set()
+
+def get_data_source_config():
+    """ Read data source section of the configuration file
+
+    :return: dictionary with pipe and level bus settings
+    """
+    c = ConfigParser()
+    c.read(FILE_CONFIG)
+    d = {}
+    d[PIPE_NAME] = c.get(DATA_SOURCE, PIPE_NAME)
+    d[VOLUME_MAX_IN_PIPE] = c.getfloat(DATA_SOURCE, VOLUME_MAX_IN_PIPE)
+    d[SHM_NAME] = c[DATA_SOURCE].get(SHM_NAME, "peppymeter")
+    d[SHM_SLOTS] = c[DATA_SOURCE].getint(SHM_SLOTS, 64)
+    d[SPECTRUM_PIPE_NAME] = c[DATA_SOURCE].get(SPECTRUM_PIPE_NAME, "")
+    d[SPECTRUM_SIZE] = c[DATA_SOURCE].getint(SPECTRUM_SIZE, 0)
+    return d
+
+if __name__ == "__main__":
+    """ This is called by audiotop.py when the data source type is 'shm' """
+
+    Acquisition(get_data_source_config()).run()
@@ -19,6 +19,10 @@ import pygame
 import time
 import math
 
+from collections import OrderedDict
+
+TEXT_CACHE_SIZE = 64
+
 class Component(object):
     """ Represent the lowest UI component level.
     This is the only class which knows how to draw on Pygame Screen.
@@ -131,26 +135,118 @@ class TextComponent(Component):
         self.osversion = '---'
         self.fontcolor =  self.config['metatext.fontcolor']
         self.textcolor = self.config['metatext.textcolor']
-        self.bigfont = pygame.font.Font('fonts/'+self.config['metatext.fontname'],self.config['metatext.bigfontsize'])
-        self.smallfont = pygame.font.Font('fonts/'+self.config['metatext.fontname'], self.config['metatext.smallfontsize'])
-        self.tinyfont = pygame.font.Font('fonts/'+self.config['metatext.fontname'], self.config['metatext.tinyfontsize'])
-        self.bitratefont = pygame.font.Font('fonts/'+self.config['metatext.bitratefont'], self.config['metatext.bitratefontsize'])
-        self.smallhebfont = pygame.font.Font('fonts/'+self.config['metatext.smallHebfontname'], self.config['metatext.smallfontsize'])
-        self.bighebfont = pygame.font.Font('fonts/'+self.config['metatext.bigHebfontname'], self.config['metatext.bigfontsize'])
-
-        self.durfont = pygame.font.Font('fonts/digital-7 (mono).ttf', self.config['metatext.durfontsize'])
+        fonts = self.get_font_specs(self.config)
+        self.bigfont = util.load_font(*fonts["bigfont"])
+        self.smallfont = util.load_font(*fonts["smallfont"])
+        self.tinyfont = util.load_font(*fonts["tinyfont"])
+        self.bitratefont = util.load_font(*fonts["bitratefont"])
+        self.smallhebfont = util.load_font(*fonts["smallhebfont"])
+        self.bighebfont = util.load_font(*fonts["bighebfont"])
+        self.durfont = util.load_font(*fonts["durfont"])
         self.clockstart = 0
         self.iscenter = self.config['metatext.iscenter']
+        self.render_cache = OrderedDict()
+        self.drawn = {}
+        self.measuring = False
+
+    @staticmethod
+    def get_font_specs(config):
+        """ Get fonts used by the text component. Used also to load the fonts in advance.
+
+        :param config: meter configuration section
+        :return: dictionary where key - font name, value - tuple (font path, font size)
+        """
+        font = 'fonts/' + config['metatext.fontname']
+        return {
+            "bigfont": (font, config['metatext.bigfontsize']),
+            "smallfont": (font, config['metatext.smallfontsize']),
+            "tinyfont": (font, config['metatext.tinyfontsize']),
+            "bitratefont": ('fonts/' + config['metatext.bitratefont'], config['metatext.bitratefontsize']),
+            "smallhebfont": ('fonts/' + config['metatext.smallHebfontname'], config['metatext.smallfontsize']),
+            "bighebfont": ('fonts/' + config['metatext.bigHebfontname'], config['metatext.bigfontsize']),
+            "durfont": ('fonts/digital-7 (mono).ttf', config['metatext.durfontsize'])
+        }
+
     def drawDynamicText(self,text,fonts,trimval,size,color):
         font = fonts[1] if self.hasHeb(text) else fonts[0]
-        textsurface = font.render(self.pyHebText(text)[:trimval], True,color )
-        textsurface.set_colorkey((0, 0, 0))
-        r = textsurface.get_rect(center=size) if  self.iscenter else size
-        self.screen.blit(textsurface,r)
+        key, textsurface = self.render(font, self.pyHebText(text)[:trimval], color)
+        r = textsurface.get_rect(center=size) if  self.iscenter else textsurface.get_rect(topleft=size)
+        self.blitText(size, key, textsurface, r)
     def drawText(self,text,font,size,color):
+        key, textsurface = self.render(font, text, color)
+        self.blitText(size, key, textsurface, textsurface.get_rect(center=size))
+
+    def render(self, font, text, color):
+        """ Render text or take it from the cache. The cache keeps the most recently used texts.
+
+        :param font: font
+        :param text: text
+        :param color: text color
+        :return: tuple (cache key, text surface)
+        """
+        key = (id(font), text, tuple(color))
+        try:
+            textsurface = self.render_cache[key]
+            self.render_cache.move_to_end(key)
+            return (key, textsurface)
+        except KeyError:
+            pass
+
         textsurface = font.render(text, True, color)
         textsurface.set_colorkey((0, 0, 0))
-        self.screen.blit(textsurface, textsurface.get_rect(center=size))
+        self.render_cache[key] = textsurface
+        if len(self.render_cache) > TEXT_CACHE_SIZE:
+            self.render_cache.popitem(last=False)
+        return (key, textsurface)
+
+    def blitText(self, position, key, textsurface, r):
+        """ Draw text and remember its area. Nothing is drawn while measuring.
+
+        :param position: configured text position, identifies the text
+        :param key: render cache key
+        :param textsurface: text surface
+        :param r: text rectangle on the screen
+        """
+        self.drawn[tuple(position)] = (key, r)
+        if not self.measuring:
+            self.screen.blit(textsurface, r)
+
+    def get_area(self):
+        """ Get the area of the last drawn texts
+
+        :return: rectangle or None if nothing was drawn
+        """
+        rects = [r for _, r in self.drawn.values()]
+        if not rects:
+            return None
+        return rects[0].unionall(rects[1:])
+
+    def get_dirty_rects(self):
+        """ Get the areas of the texts which will change on the next drawing
+
+        :return: list of old and new rectangles of the changed texts
+        """
+        previous = self.drawn
+        self.drawn = {}
+        self.measuring = True
+        try:
+            self.draw()
+        finally:
+            self.measuring = False
+        current = self.drawn
+        self.drawn = previous
+
+        rects = []
+        for position, (key, r) in current.items():
+            old = previous.get(position)
+            if old == None:
+                rects.append(r)
+            elif old[0] != key or old[1] != r:
+                rects.extend((old[1], r))
+        for position, (key, r) in previous.items():
+            if position not in current:
+                rects.append(r)
+        return rects
 
     def draw(self):
         self.drawDynamicText(self.title,(self.bigfont, self.bighebfont),  self.config['metatext.trimtitle'],self.config['metatext.title'],self.fontcolor)
@@ -230,7 +326,7 @@ class TextAkaiDeckComponent(TextComponent):
     def __init__(self, util, c=None, x=0, y=0, bb=None, fgr=(0, 0, 0), bgr=(0, 0, 0), v=True):
         super().__init__(util,c,x,y,bb,fgr,bgr,v)
         self.durationtextcolor = (255,255,255)
-        self.tinyfont = pygame.font.Font('fonts/Arial.ttf', self.config['metatext.tinyfontsize'])
+        self.tinyfont = util.load_font('fonts/Arial.ttf', self.config['metatext.tinyfontsize'])
     def draw(self):
 
         self.drawDynamicText(f"{self.album}:{self.title}",(self.bigfont, self.bighebfont),  self.config['metatext.trimtitle'],self.config['metatext.title'],self.fontcolor)
@@ -278,6 +374,8 @@ class ProgressBarComponent(Component):
         self.y = m['progressbar.y']
         self.x = m['progressbar.x']
         self.progress = 0
+    def get_area(self):
+        return pygame.Rect(self.x, self.y, self.width, self.height)
     def draw(self):
      try:
          #,border_radius= self.corner_radius   only > python 3.8
@@ -296,6 +394,13 @@ class ProgressReelComponent(Component):
         self.inff = False
         self.ffprogress=0
         self.prevprog= 0
+    def get_area(self):
+        radius = int(self.radfactor * 100 + self.startwidth) + 1
+        left = pygame.Rect(0, 0, radius * 2, radius * 2)
+        left.center = self.leftcenter
+        right = left.copy()
+        right.center = self.rightcenter
+        return left.union(right)
     def draw(self):
      try:
          progdiff = self.progress - self.prevprog
@@ -38,6 +38,10 @@ OUTPUT_SERIAL = "output.serial"
 OUTPUT_I2C = "output.i2c"
 OUTPUT_PWM = "output.pwm"
 OUTPUT_HTTP = "output.http"
+OUTPUT_WORKER = "output.worker"
+FRAME_PROFILER = "frame.profiler"
+FRAME_PROFILER_PERIOD = "frame.profiler.period"
+FRAME_PROFILER_PORT = "frame.profiler.port"
 
 SERIAL_INTERFACE = "serial.interface"
 DEVICE_NAME = "device.name"
@@ -70,8 +74,16 @@ DOUBLE_BUFFER = "double.buffer"
 NO_FRAME = "no.frame"
 
 SMOOTH_BUFFER_SIZE = "smooth.buffer.size"
+SMOOTH_WINDOW = "smooth.window"
+EMA_TIME_CONSTANT = "ema.time.constant"
+PPM_ATTACK = "ppm.attack"
+PPM_DECAY = "ppm.decay"
+LEVEL_DB_RANGE = "level.db.range"
 USE_LOGGING = "use.logging"
 USE_CACHE = "use.cache"
+SPECTRUM_CACHE_SIZE = "spectrum.cache.size"
+METER_PREFETCH = "meter.prefetch"
+METER_PREFETCH_SIZE = "meter.prefetch.size"
 USAGE = "usage"
 USE_VU_METER = "vu.meter"
 METER = "meter"
@@ -79,6 +91,21 @@ DATA_SOURCE = "data.source"
 TYPE = "type"
 POLLING_INTERVAL = "polling.interval"
 PIPE_NAME = "pipe.name"
+PIPE_READER = "pipe.reader"
+PIPE_MAX_LATENCY = "pipe.max.latency"
+PIPE_MIN_INTERVAL = "pipe.min.interval"
+RECORD_FILE = "record.file"
+REPLAY_FILE = "replay.file"
+REPLAY_SPEED = "replay.speed"
+REPLAY_LOOP = "replay.loop"
+STATISTICS_SIZE = "statistics.size"
+PEAK_HOLD_TIME = "peak.hold.time"
+PEAK_DECAY = "peak.decay"
+CLIP_LEVEL = "clip.level"
+SHM_NAME = "shm.name"
+SHM_SLOTS = "shm.slots"
+SPECTRUM_PIPE_NAME = "spectrum.pipe.name"
+SPECTRUM_SIZE = "spectrum.size"
 VOLUME_CONSTANT = "volume.constant"
 VOLUME_MIN = "volume.min"
 VOLUME_MAX = "volume.max"
@@ -197,10 +224,17 @@ class ConfigFileParser(object):
         self.meter_config[OUTPUT_I2C] = c.getboolean(CURRENT, OUTPUT_I2C)
         self.meter_config[OUTPUT_PWM] = c.getboolean(CURRENT, OUTPUT_PWM)
         self.meter_config[OUTPUT_HTTP] = c.getboolean(CURRENT, OUTPUT_HTTP)
+        self.meter_config[OUTPUT_WORKER] = c[CURRENT].getboolean(OUTPUT_WORKER, False)
         self.meter_config[USE_LOGGING] = c.getboolean(CURRENT, USE_LOGGING)
         self.meter_config['use.loglevel'] = c.get(CURRENT, 'use.loglevel')
         self.meter_config[USE_CACHE] = c.getboolean(CURRENT, USE_CACHE)
+        self.meter_config[SPECTRUM_CACHE_SIZE] = c[CURRENT].getint(SPECTRUM_CACHE_SIZE, 16)
+        self.meter_config[METER_PREFETCH] = c[CURRENT].getboolean(METER_PREFETCH, True)
+        self.meter_config[METER_PREFETCH_SIZE] = c[CURRENT].getint(METER_PREFETCH_SIZE, 16)
         self.meter_config[FRAME_RATE] = c.getint(CURRENT, FRAME_RATE)
+        self.meter_config[FRAME_PROFILER] = c[CURRENT].getboolean(FRAME_PROFILER, False)
+        self.meter_config[FRAME_PROFILER_PERIOD] = c[CURRENT].getfloat(FRAME_PROFILER_PERIOD, 10.0)
+        self.meter_config[FRAME_PROFILER_PORT] = c[CURRENT].getint(FRAME_PROFILER_PORT, 0)
         
         self.meter_config[SERIAL_INTERFACE] = {}
         self.meter_config[SERIAL_INTERFACE][DEVICE_NAME] = c.get(SERIAL_INTERFACE, DEVICE_NAME)
@@ -318,14 +352,34 @@ class ConfigFileParser(object):
         d[TYPE] = config_file.get(section, TYPE)
         d[POLLING_INTERVAL] = config_file.getfloat(section, POLLING_INTERVAL)
         d[PIPE_NAME] = config_file.get(section, PIPE_NAME)
+        d[PIPE_READER] = config_file[section].get(PIPE_READER, "polling")
+        d[PIPE_MAX_LATENCY] = config_file[section].getfloat(PIPE_MAX_LATENCY, 0.1)
+        d[PIPE_MIN_INTERVAL] = config_file[section].getfloat(PIPE_MIN_INTERVAL, d[POLLING_INTERVAL])
+        d[RECORD_FILE] = config_file[section].get(RECORD_FILE, "")
+        d[REPLAY_FILE] = config_file[section].get(REPLAY_FILE, "")
+        d[REPLAY_SPEED] = config_file[section].getfloat(REPLAY_SPEED, 1.0)
+        d[REPLAY_LOOP] = config_file[section].getboolean(REPLAY_LOOP, True)
+        d[STATISTICS_SIZE] = config_file[section].getint(STATISTICS_SIZE, 32)
+        d[PEAK_HOLD_TIME] = config_file[section].getfloat(PEAK_HOLD_TIME, 1.0)
+        d[PEAK_DECAY] = config_file[section].getfloat(PEAK_DECAY, 50.0)
+        d[SHM_NAME] = config_file[section].get(SHM_NAME, "peppymeter")
+        d[SHM_SLOTS] = config_file[section].getint(SHM_SLOTS, 64)
+        d[SPECTRUM_PIPE_NAME] = config_file[section].get(SPECTRUM_PIPE_NAME, "")
+        d[SPECTRUM_SIZE] = config_file[section].getint(SPECTRUM_SIZE, 0)
         d[VOLUME_CONSTANT] = config_file.getfloat(section, VOLUME_CONSTANT)
         d[VOLUME_MIN] = config_file.getfloat(section, VOLUME_MIN)
         d[VOLUME_MAX] = config_file.getfloat(section, VOLUME_MAX)
+        d[CLIP_LEVEL] = config_file[section].getfloat(CLIP_LEVEL, d[VOLUME_MAX])
         d[VOLUME_MAX_IN_PIPE] = config_file.getfloat(section, VOLUME_MAX_IN_PIPE)
         d[MONO_ALGORITHM] = config_file.get(section, MONO_ALGORITHM)
         d[STEREO_ALGORITHM] = config_file.get(section, STEREO_ALGORITHM)
         d[STEP] = config_file.getint(section, STEP)
         d[SMOOTH_BUFFER_SIZE] = config_file.getint(section, SMOOTH_BUFFER_SIZE)
+        d[SMOOTH_WINDOW] = config_file[section].getfloat(SMOOTH_WINDOW, d[SMOOTH_BUFFER_SIZE] * d[POLLING_INTERVAL])
+        d[EMA_TIME_CONSTANT] = config_file[section].getfloat(EMA_TIME_CONSTANT, 0.1)
+        d[PPM_ATTACK] = config_file[section].getfloat(PPM_ATTACK, 0.01)
+        d[PPM_DECAY] = config_file[section].getfloat(PPM_DECAY, 1.7)
+        d[LEVEL_DB_RANGE] = config_file[section].getfloat(LEVEL_DB_RANGE, 40.0)
         return d
 
     def get_mata_section(self, config_file, section, d):
@@ -356,6 +410,7 @@ class ConfigFileParser(object):
         d['icons.usepeak'] = config_file.getboolean(section, 'icons.usepeak')
         d['icons.usesingle'] = config_file.getboolean(section, 'icons.usesingle')
         d['icons.peakthreshold'] = config_file.getint(section, 'icons.peakthreshold')
+        d['icons.peakhold'] = config_file[section].getboolean('icons.peakhold', False)
         d['cover.size'] = config_file.getint(section, 'cover.size')
         d['cover.position'] = make_tuple(config_file.get(section, 'cover.position'))
         d['icons.eth.position'] = make_tuple(config_file.get(section, 'icons.eth.position'))
@@ -0,0 +1,156 @@
+# Copyright 2016-2024 PeppyMeter peppy.player@gmail.com
+#
+# This file is part of PeppyMeter.
+#
+# PeppyMeter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PeppyMeter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PeppyMeter. If not, see <http://www.gnu.org/licenses/>.
+
+import pygame
+
+from threading import Lock
+
+# rectangles closer than this distance in pixels are merge candidates
+MERGE_DISTANCE = 8
+# two rectangles are merged if their union is not bigger than this part of their total area
+MERGE_RATIO = 1.5
+# too many rectangles are merged into one
+MAX_RECTS = 24
+# the whole screen is updated if the damaged area covers this part of the screen
+FULL_SCREEN_RATIO = 0.6
+
+class DamageAccumulator(object):
+    """ Collects the screen areas changed during one frame.
+
+    Meters, animators and spectrum report the changed areas by calling add or add_screen instead of
+    updating the display. At the end of the frame the main loop calls flush which merges the areas
+    and updates the display once. Each display update is a costly copy on the framebuffer driver.
+    """
+
+    def __init__(self):
+        """ Initializer """
+
+        self.rects = []
+        self.full = False
+        self.lock = Lock()
+
+    def add(self, area):
+        """ Add damaged area
+
+        :param area: rectangle, list of rectangles or None
+        """
+        if not area:
+            return
+
+        with self.lock:
+            if self.full:
+                return
+            if isinstance(area, (list, tuple)) and area and not isinstance(area[0], int):
+                for r in area:
+                    if r:
+                        self.rects.append(pygame.Rect(r))
+            else:
+                self.rects.append(pygame.Rect(area))
+
+    def add_screen(self):
+        """ Mark the whole screen as damaged """
+
+        with self.lock:
+            self.full = True
+            self.rects = []
+
+    def clear(self):
+        """ Forget the damaged areas without updating the display """
+
+        with self.lock:
+            self.full = False
+            self.rects = []
+
+    def get_rects(self, damaged, screen_rect):
+        """ Get merged damaged areas
+
+        :param damaged: list of damaged rectangles
+        :param screen_rect: screen rectangle
+        :return: list of rectangles
+        """
+        rects = []
+        for r in damaged:
+            r = r.clip(screen_rect)
+            if r.w > 0 and r.h > 0:
+                rects.append(r)
+
+        if not rects:
+            return rects
+
+        rects = self.merge(rects)
+
+        if len(rects) > MAX_RECTS or sum(r.w * r.h for r in rects) > screen_rect.w * screen_rect.h * FULL_SCREEN_RATIO:
+            union = rects[0].unionall(rects[1:])
+            if union.w * union.h > screen_rect.w * screen_rect.h * FULL_SCREEN_RATIO:
+                return [screen_rect]
+            return [union]
+
+        return rects
+
+    def merge(self, rects):
+        """ Merge overlapping and adjacent rectangles if the union doesn't add too much undamaged area
+
+        :param rects: list of rectangles
+        :return: list of merged rectangles
+        """
+        merged = True
+        while merged:
+            merged = False
+            i = 0
+            while i < len(rects):
+                a = rects[i]
+                near = a.inflate(MERGE_DISTANCE * 2, MERGE_DISTANCE * 2)
+                j = i + 1
+                while j < len(rects):
+                    b = rects[j]
+                    if near.colliderect(b):
+                        u = a.union(b)
+                        if u.w * u.h <= (a.w * a.h + b.w * b.h) * MERGE_RATIO:
+                            rects[i] = a = u
+                            near = a.inflate(MERGE_DISTANCE * 2, MERGE_DISTANCE * 2)
+                            del rects[j]
+                            merged = True
+                            continue
+                    j += 1
+                i += 1
+
+        return rects
+
+    def flush(self):
+        """ Update the damaged areas of the display with one call and clear them """
+
+        with self.lock:
+            full = self.full
+            rects = self.rects
+            self.full = False
+            self.rects = []
+
+        if not full and not rects:
+            return
+
+        screen = pygame.display.get_surface()
+        if screen == None:
+            return
+
+        screen_rect = screen.get_rect()
+        if full:
+            pygame.display.update(screen_rect)
+            return
+
+        rects = self.get_rects(rects, screen_rect)
+        if rects:
+            pygame.display.update(rects)
@@ -18,13 +18,18 @@
 import os
 import math
 import time
-import statistics
 import logging
+import selectors
 
 from random import uniform
-from threading import Thread, RLock
+from threading import Thread
 from configfileparser import *
 from collections import deque
+from framedecoder import FrameDecoder, FRAME
+from levelpublisher import LevelPublisher
+from recorder import Recorder, Replay, STREAM_METER, STREAM_SPECTRUM
+from levelbus import LevelBus, METER_BUS, SPECTRUM_BUS
+from levelstatistics import LevelStatistics
 
 SOURCE_CONSTANT = "constant"
 SOURCE_NOISE = "noise"
@@ -33,6 +38,8 @@ SOURCE_TRIANGLE = "triangle"
 SOURCE_SINE = "sine"
 SOURCE_PIPE = "pipe"
 SOURCE_HTTP = "http"
+SOURCE_REPLAY = "replay"
+SOURCE_SHM = "shm"
 
 MONO_ALGORITHM_MAXIMUM = "maximum"
 MONO_ALGORITHM_AVERAGE = "average"
@@ -40,16 +47,139 @@ MONO_ALGORITHM_AVERAGE = "average"
 STEREO_ALGORITHM_NEW = "new"
 STEREO_ALGORITHM_LOGARITHM = "logarithm"
 STEREO_ALGORITHM_AVERAGE = "average"
+STEREO_ALGORITHM_EMA = "ema"
+STEREO_ALGORITHM_VU = "vu"
+STEREO_ALGORITHM_PPM = "ppm"
+
+PIPE_READER_POLLING = "polling"
+PIPE_READER_EVENT = "event"
+PIPE_READER_REACTOR = "reactor"
+
+# the attached level bus is checked for replacement not more often than this period in seconds
+BUS_CHECK_PERIOD = 1.0
+VU_OMEGA = 22.13 # critically damped response reaching 99% of a step in 300 ms
+PPM_DECAY_DB = 20.0 # PPM decay time is defined for 20 dB fall
+
+class RunningAverage(object):
+    """ Moving average over the time window. Keeps running sums so every update is O(1). """
+
+    def __init__(self, window):
+        """ Initializer
+
+        :param window: window length in seconds
+        """
+        self.window = window
+        self.samples = deque()
+        self.sums = [0.0, 0.0, 0.0]
+
+    def update(self, now, values):
+        """ Add new sample and return the average
+
+        :param now: sample time in seconds
+        :param values: tuple (left, right, mono)
+        :return: averaged tuple (left, right, mono)
+        """
+        self.samples.append((now, values))
+        for n in range(3):
+            self.sums[n] += values[n]
+
+        while now - self.samples[0][0] > self.window:
+            _, old = self.samples.popleft()
+            for n in range(3):
+                self.sums[n] -= old[n]
+
+        size = len(self.samples)
+        return (self.sums[0] / size, self.sums[1] / size, self.sums[2] / size)
+
+class ExponentialBallistics(object):
+    """ Exponential moving average with time constant """
+
+    def __init__(self, time_constant):
+        """ Initializer
+
+        :param time_constant: time constant in seconds
+        """
+        self.time_constant = time_constant
+        self.value = 0.0
+
+    def update(self, value, elapsed):
+        """ Move indicator toward the new value
+
+        :param value: new value
+        :param elapsed: time since the previous update in seconds
+        :return: indicator value
+        """
+        if self.time_constant <= 0:
+            self.value = value
+        else:
+            self.value += (1.0 - math.exp(-elapsed / self.time_constant)) * (value - self.value)
+        return self.value
+
+class VuBallistics(object):
+    """ VU meter movement modelled as critically damped second order system.
+    The indicator reaches 99% of a step in 300 ms. The input is held constant
+    between updates so the exact solution is used and any update interval is stable.
+    """
+
+    def __init__(self):
+        """ Initializer """
+
+        self.value = 0.0
+        self.velocity = 0.0
+
+    def update(self, value, elapsed):
+        """ Move indicator toward the new value
+
+        :param value: new value
+        :param elapsed: time since the previous update in seconds
+        :return: indicator value
+        """
+        e = self.value - value
+        c = self.velocity + VU_OMEGA * e
+        d = math.exp(-VU_OMEGA * elapsed)
+        self.value = value + (e + c * elapsed) * d
+        self.velocity = (self.velocity - VU_OMEGA * c * elapsed) * d
+        return self.value
+
+class PpmBallistics(object):
+    """ Peak programme meter. Fast exponential attack and linear decay in dB. """
+
+    def __init__(self, attack, decay, db_range, max_value):
+        """ Initializer
+
+        :param attack: attack time constant in seconds
+        :param decay: time in seconds for 20 dB fall
+        :param db_range: dB range covered by the UI scale
+        :param max_value: maximum UI value
+        """
+        self.attack = attack
+        self.decay_rate = (PPM_DECAY_DB / db_range) * max_value / decay
+        self.value = 0.0
+
+    def update(self, value, elapsed):
+        """ Move indicator toward the new value
+
+        :param value: new value
+        :param elapsed: time since the previous update in seconds
+        :return: indicator value
+        """
+        if value > self.value:
+            if self.attack <= 0:
+                self.value = value
+            else:
+                self.value += (1.0 - math.exp(-elapsed / self.attack)) * (value - self.value)
+        else:
+            self.value = max(value, self.value - self.decay_rate * elapsed)
+        return self.value
 
 class DataSource(object):
     """ Provides methods to generate different types of audio signal. """
     
-    lock = RLock()
-    
-    def __init__(self, util):
+    def __init__(self, util, reactor=None):
         """ Initializer
         
         :param c: configuration dictionary
+        :param reactor: input reactor which reads the pipe and HTTP data in 'reactor' mode
         """
         self.volume = 1
         self.config = util[DATA_SOURCE]
@@ -58,32 +188,50 @@ class DataSource(object):
         self.ds_type = self.config[TYPE]
         self.const = self.config[VOLUME_CONSTANT]
         self.pipe_name = self.config[PIPE_NAME]
+        self.pipe_reader = self.config[PIPE_READER]
+        self.pipe_max_latency = self.config[PIPE_MAX_LATENCY]
+        self.pipe_min_interval = self.config[PIPE_MIN_INTERVAL]
+        self.reactor = reactor
+        self.use_reactor = reactor != None and self.pipe_reader == PIPE_READER_REACTOR
+        self.pipe_registered = False
+        self.pipe_data_time = 0
         self.min = self.config[VOLUME_MIN]
         self.max_in_ui = self.config[VOLUME_MAX]
         self.max_in_pipe = self.config[VOLUME_MAX_IN_PIPE]
         
         self.v = 0
         self.step = self.config[STEP]
-        self.pipe_size = 4
         self.PIPE_BUFFER_SIZE = 1048576 # as defined for Raspberry OS in /proc/sys/fs/pipe-max-size
+        self.decoder = FrameDecoder(self.max_in_pipe, self.PIPE_BUFFER_SIZE)
         self.rng = list(range(int(self.min), int(self.max_in_ui)))
-        self.double_rng = self.rng
-        self.double_rng.extend(range(int(self.max_in_ui) - 1, int(self.min), -1))
+        self.double_rng = self.rng + list(range(int(self.max_in_ui) - 1, int(self.min), -1))
         self.pipe = None
-        if self.ds_type == SOURCE_PIPE:
+        if self.ds_type == SOURCE_PIPE and not self.use_reactor:
             thread = Thread(target=self.open_pipe)
             thread.start()
         self.previous_left = self.previous_right = self.previous_mono = 0.0
         self.run_flag = True
         self.polling_interval = self.config[POLLING_INTERVAL]
-        self.pipe_polling_inerval = self.polling_interval / 10
         self.prev_time = None
         self.data = ()
         self.http_data = ()
-        self.smooth_buffer_size = self.config[SMOOTH_BUFFER_SIZE]
-        self.smooth_buffer = deque(self.smooth_buffer_size*[0], self.smooth_buffer_size)
-        for _ in range(self.smooth_buffer_size):
-            self.smooth_buffer.append((0,0,0))
+        self.new_frame = True
+        self.publisher = LevelPublisher()
+        self.statistics = LevelStatistics(self.config[STATISTICS_SIZE], self.config[PEAK_HOLD_TIME],
+            self.config[PEAK_DECAY], self.config[CLIP_LEVEL])
+        self.current_statistics = None
+        self.recorder = None
+        self.replay = None
+        self.replay_spectrum = None
+        self.thread = None
+        self.meter_bus = None
+        self.spectrum_bus = None
+        self.bus_check_times = {}
+        self.smooth_window = self.config[SMOOTH_WINDOW]
+        self.smooth_average = None
+        if self.smooth_window > 0:
+            self.smooth_average = RunningAverage(self.smooth_window)
+        self.ballistics = self.get_ballistics()
 
         self.SOURCE_FUNCTIONS = {
             SOURCE_CONSTANT: self.get_constant_value,
@@ -92,9 +240,27 @@ class DataSource(object):
             SOURCE_TRIANGLE: self.get_triangle_value,
             SOURCE_SINE: self.get_sine_value,
             SOURCE_PIPE: self.get_pipe_value,
-            SOURCE_HTTP: self.get_http_value
+            SOURCE_HTTP: self.get_http_value,
+            SOURCE_REPLAY: self.get_replay_value,
+            SOURCE_SHM: self.get_shm_value
         }
     
+    def get_ballistics(self):
+        """ Create indicator models for the left, right and mono channels
+
+        :return: list of models or None if stereo algorithm doesn't use them
+        """
+        if self.stereo_algorithm == STEREO_ALGORITHM_EMA:
+            return [ExponentialBallistics(self.config[EMA_TIME_CONSTANT]) for _ in range(3)]
+        elif self.stereo_algorithm == STEREO_ALGORITHM_VU:
+            return [VuBallistics() for _ in range(3)]
+        elif self.stereo_algorithm == STEREO_ALGORITHM_PPM:
+            attack = self.config[PPM_ATTACK]
+            decay = self.config[PPM_DECAY]
+            db_range = self.config[LEVEL_DB_RANGE]
+            return [PpmBallistics(attack, decay, db_range, self.max_in_ui) for _ in range(3)]
+        return None
+
     def open_pipe(self):
         """ Open named pipe """
 
@@ -116,19 +282,58 @@ class DataSource(object):
         except Exception as e:
             logging.debug(e)
 
+        self.decoder.reset()
         logging.debug("pipe flushed")
 
+    def open_recording(self):
+        """ Open the recording file for writing or for the replay """
+
+        if self.ds_type == SOURCE_PIPE and self.config[RECORD_FILE] and self.recorder == None:
+            try:
+                self.recorder = Recorder(self.config[RECORD_FILE])
+                self.decoder.listener = self.record_meter_frames
+            except Exception as e:
+                logging.debug(e)
+        elif self.ds_type == SOURCE_REPLAY and self.replay == None:
+            try:
+                self.replay = Replay(self.config[REPLAY_FILE], self.config[REPLAY_SPEED], self.config[REPLAY_LOOP])
+            except Exception as e:
+                logging.debug(e)
+
+    def close_recording(self):
+        """ Close the recording file and the replay """
+
+        self.decoder.listener = None
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+        if self.replay:
+            self.replay.close()
+            self.replay = None
+        self.replay_spectrum = None
+
     def start_data_source(self):
         """ Start data source thread. """ 
 
         logging.debug("starting data source...")
+        self.open_recording()
+
+        if self.use_reactor and self.ds_type in (SOURCE_PIPE, SOURCE_HTTP):
+            self.run_flag = True
+            if self.ds_type == SOURCE_PIPE:
+                self.reactor.call_soon(self.start_reactor_pipe)
+            logging.debug("data source started in reactor")
+            return
 
         if self.ds_type == SOURCE_PIPE:
             self.flush_pipe_buffer()
 
         self.run_flag = True
-        thread = Thread(target=self.get_data)
-        thread.start()
+        if self.ds_type == SOURCE_PIPE and self.pipe_reader == PIPE_READER_EVENT:
+            self.thread = Thread(target=self.get_pipe_events)
+        else:
+            self.thread = Thread(target=self.get_data)
+        self.thread.start()
 
         logging.debug("data source started")
         
@@ -136,12 +341,23 @@ class DataSource(object):
         """ Stop data source thread. """ 
                
         self.run_flag = False
+
+        # the reader thread owns the replay cursor, the files are closed when it's finished
+        if self.thread:
+            self.thread.join(max(self.polling_interval, self.pipe_max_latency) + 1)
+            self.thread = None
+        self.close_recording()
     
     def get_current_data(self):
         """ Return current data """
         
         return self.data
         
+    def get_current_statistics(self):
+        """ Return peak, peak hold, RMS and clip statistics for the current data """
+
+        return self.current_statistics
+
     def get_current_left_channel_data(self):
         """ Return current left channel value """
         
@@ -170,10 +386,133 @@ class DataSource(object):
         """ Thread method. """ 
                
         while self.run_flag:
-            with self.lock:
-                self.data = self.get_value()
+            self.new_frame = True
+            data = self.get_value()
+            self.set_data(data, self.new_frame)
             time.sleep(self.polling_interval)
+
+    def set_data(self, data, new_frame=True):
+        """ Replace current data and publish it for the consumers.
+        The data which doesn't come from a new frame is published only if the levels changed.
+
+        :param data: tuple (left, right, mono)
+        :param new_frame: True - the data was calculated from a new frame, False - no new frame arrived
+        """
+        if data:
+            self.current_statistics = self.statistics.update(data[0], data[1], time.monotonic())
+            changed = data != self.data
+            self.data = data
+            if new_frame or changed:
+                self.publisher.publish(data[0], data[1], data[2], self.current_statistics)
+        else:
+            self.data = data
     
+    def get_pipe_events(self):
+        """ Thread method for the event driven pipe reader.
+
+        Blocks on the pipe until data arrives or 'pipe.max.latency' expires,
+        drains the backlog in one read and publishes the newest complete frame.
+        The 'pipe.min.interval' limits how often the thread wakes up.
+        """
+        selector = None
+
+        while self.run_flag:
+            if self.pipe == None:
+                time.sleep(self.pipe_max_latency)
+                continue
+
+            if selector == None:
+                selector = selectors.DefaultSelector()
+                selector.register(self.pipe, selectors.EVENT_READ)
+
+            start = time.monotonic()
+            frame = None
+
+            if selector.select(self.pipe_max_latency):
+                try:
+                    frame = self.decoder.read(self.pipe)
+                except EOFError:
+                    # no writer connected, the pipe reports EOF until it reconnects
+                    time.sleep(self.pipe_max_latency)
+                except Exception as e:
+                    logging.debug(e)
+
+            new_frame = frame != None
+            if frame == None:
+                frame = (0, 0)
+
+            self.set_data(self.get_pipe_levels(frame[0], frame[1]), new_frame)
+
+            wait = self.pipe_min_interval - (time.monotonic() - start)
+            if wait > 0:
+                time.sleep(wait)
+
+        if selector:
+            selector.close()
+
+    def start_reactor_pipe(self):
+        """ Register the pipe in the reactor. Called in the reactor thread. """
+
+        self.decoder.reset()
+        self.pipe_data_time = time.monotonic()
+
+        if self.pipe_registered:
+            return
+
+        self.pipe_registered = True
+        self.reactor.add_pipe(self.pipe_name, self.read_reactor_pipe)
+        self.reactor.call_later(self.pipe_max_latency, self.check_pipe_silence)
+
+    def read_reactor_pipe(self, fd):
+        """ Read the pipe when the reactor reports new data and publish the newest frame
+
+        :param fd: pipe file descriptor
+        :raise EOFError: the pipe writer is disconnected
+        """
+        frame = self.decoder.read(fd)
+        if frame == None or not self.run_flag:
+            return
+
+        self.pipe_data_time = time.monotonic()
+        self.set_data(self.get_pipe_levels(frame[0], frame[1]))
+
+        if self.pipe_min_interval > 0:
+            self.reactor.pause_pipe(self.pipe_name, self.pipe_min_interval)
+
+    def check_pipe_silence(self):
+        """ Publish zero levels if there was no pipe data during 'pipe.max.latency' """
+
+        if self.run_flag and time.monotonic() - self.pipe_data_time >= self.pipe_max_latency:
+            self.set_data(self.get_pipe_levels(0, 0), False)
+
+        self.reactor.call_later(self.pipe_max_latency, self.check_pipe_silence)
+
+    def put_http_data(self, data):
+        """ Set data received by the HTTP handler
+
+        :param data: tuple (left, right, mono)
+        """
+        if self.use_reactor:
+            self.reactor.call_soon(self.set_http_data, data)
+        else:
+            self.http_data = data
+
+    def set_http_data(self, data):
+        """ Set and publish HTTP data. Called in the reactor thread.
+
+        :param data: tuple (left, right, mono)
+        """
+        self.http_data = data
+        if self.run_flag and self.ds_type == SOURCE_HTTP:
+            self.set_data(data)
+
+    def get_pipe_statistics(self):
+        """ Get the meter pipe counters for the last second
+
+        :return: dictionary with frames, coalesced, dropped and resyncs counters
+        """
+        return self.decoder.statistics
+
     def get_value(self):
         """ Get data depending on the data source type. """ 
                
@@ -190,16 +529,7 @@ class DataSource(object):
         new_left =  uniform(self.min, self.max_in_ui) #50
         new_right = uniform(self.min, self.max_in_ui) #50
         new_mono = self.get_mono(new_left, new_right)
-        
-        left = self.get_channel(self.previous_left, new_left)
-        right = self.get_channel(self.previous_right, new_right)
-        mono = self.get_channel(self.previous_mono, new_mono)
-
-        if self.smooth_buffer_size:
-            self.smooth_buffer.append((left, right, mono))
-            left = self.get_smooth_value(0)
-            right = self.get_smooth_value(1)
-            mono = self.get_smooth_value(2)
+        left, right, mono = self.get_levels(new_left, new_right, new_mono)
         
         self.previous_left = new_left
         self.previous_right = new_right
@@ -207,16 +537,34 @@ class DataSource(object):
         #return(50,50,50)
         return (left, right, mono)
     
-    def get_smooth_value(self, index):
-        """ Get smooth value
+    def get_levels(self, new_left, new_right, new_mono):
+        """ Apply stereo algorithm and smoothing to the new values
 
-        :param index: channel index
-        :return: smooth value calculated using buffer
+        :param new_left: new left channel value
+        :param new_right: new right channel value
+        :param new_mono: new mono value
+        :return: tuple (left, right, mono)
         """
-        s = 0
-        for n in range(self.smooth_buffer_size):
-            s += self.smooth_buffer[n][index]
-        return s / self.smooth_buffer_size
+        now = time.monotonic()
+        if self.prev_time == None:
+            elapsed = self.polling_interval
+        else:
+            elapsed = now - self.prev_time
+        self.prev_time = now
+
+        if self.ballistics:
+            left = self.ballistics[0].update(new_left, elapsed)
+            right = self.ballistics[1].update(new_right, elapsed)
+            mono = self.ballistics[2].update(new_mono, elapsed)
+        else:
+            left = self.get_channel(self.previous_left, new_left)
+            right = self.get_channel(self.previous_right, new_right)
+            mono = self.get_channel(self.previous_mono, new_mono)
+
+        if self.smooth_average:
+            left, right, mono = self.smooth_average.update(now, (left, right, mono))
+
+        return (left, right, mono)
 
     def get_saw_value(self):
         """ Generate saw shape signal. """ 
@@ -243,59 +591,189 @@ class DataSource(object):
         return s
 
     def get_latest_pipe_data(self):
-        """ Read from the named pipe until it's empty """
+        """ Read from the named pipe until it's empty
 
-        latest_data = [0, 0, 0, 0]
-        data = None
+        :return: the newest frame as tuple (left, right)
+        """
+        try:
+            frame = self.decoder.read(self.pipe)
+        except EOFError:
+            frame = None
 
-        while True:
-            try:
-                data = os.read(self.pipe, self.pipe_size)
-                if len(data) != 0:
-                    latest_data = [data[0], data[1], data[2], data[3]]
-                time.sleep(self.pipe_polling_inerval)
-            except:
-                break
+        self.new_frame = frame != None
+        if frame == None:
+            return (0, 0)
 
-        return latest_data
+        return frame
+
+    def record_meter_frames(self, data):
+        """ Write meter frames into the recording file. Called by the decoder before the frames are coalesced.
+
+        :param data: complete meter frames as read from the pipe
+        """
+        recorder = self.recorder
+        if recorder:
+            recorder.write(STREAM_METER, data)
+
+    def record_spectrum_frame(self, data):
+        """ Write spectrum frame into the recording file
+
+        :param data: spectrum pipe data
+        """
+        recorder = self.recorder
+        if recorder:
+            recorder.write(STREAM_SPECTRUM, bytes(data))
+
+    def provides_spectrum(self):
+        """ Check if spectrum frames are provided by this data source
+
+        :return: True - replay or shared memory source, False - spectrum reads its own pipe
+        """
+        return self.ds_type in (SOURCE_REPLAY, SOURCE_SHM)
+
+    def get_spectrum_frame(self):
+        """ Get spectrum frame from the recording file or from the shared memory
+
+        :return: spectrum pipe data or None if the spectrum should read its own pipe
+        """
+        if self.ds_type == SOURCE_REPLAY:
+            return self.replay_spectrum or b""
+
+        if self.ds_type == SOURCE_SHM:
+            frame = self.get_bus_frame(self.spectrum_bus)
+            if frame == None:
+                self.spectrum_bus = self.check_bus(self.spectrum_bus, SPECTRUM_BUS)
+                frame = self.get_bus_frame(self.spectrum_bus)
+            if frame != None:
+                return frame
+            if self.spectrum_bus:
+                # silence instead of the stale frame
+                return bytes(self.spectrum_bus.frame_size)
+            return b""
+
+        return None
+
+    def attach_bus(self, suffix):
+        """ Attach to the level bus created by the acquisition daemon
+
+        :param suffix: bus name suffix
+        :return: level bus or None if the daemon didn't create it yet
+        """
+        try:
+            return LevelBus(self.config[SHM_NAME] + suffix)
+        except Exception:
+            return None
+
+    def check_bus(self, bus, suffix):
+        """ Attach to the level bus or check that the attached bus was not replaced.
+        The acquisition daemon creates a new bus when it's restarted and the old one is never updated again.
+        The check opens the bus by name, so it's made not more often than BUS_CHECK_PERIOD.
+
+        :param bus: attached bus or None
+        :param suffix: bus name suffix
+        :return: the current bus or None if the daemon didn't create it yet
+        """
+        now = time.monotonic()
+        last_check = self.bus_check_times.get(suffix, None)
+        if last_check != None and now - last_check < BUS_CHECK_PERIOD:
+            return bus
+        self.bus_check_times[suffix] = now
+
+        new_bus = self.attach_bus(suffix)
+        if new_bus == None:
+            return bus
+        if bus == None:
+            return new_bus
+        if new_bus.generation == bus.generation:
+            new_bus.close()
+            return bus
+
+        logging.debug("level bus " + new_bus.name + " was created again, attaching to the new bus")
+        bus.close()
+        return new_bus
+
+    def get_bus_frame(self, bus):
+        """ Get the newest bus frame if it's not older than 'pipe.max.latency'
+
+        :param bus: level bus or None
+        :return: frame bytes or None if there is no new frame
+        """
+        if bus == None:
+            return None
+
+        latest = bus.get_latest()
+        if latest == None or time.monotonic_ns() - latest[1] > self.pipe_max_latency * 1000000000:
+            return None
+
+        return latest[2]
+
+    def get_shm_value(self):
+        """ Get signal from the shared memory level bus """
+
+        frame = self.get_bus_frame(self.meter_bus)
+        if frame == None:
+            # no new frames, the acquisition daemon could be restarted
+            self.meter_bus = self.check_bus(self.meter_bus, METER_BUS)
+            frame = self.get_bus_frame(self.meter_bus)
+
+        if frame == None:
+            left = right = 0
+        else:
+            left, right = FRAME.unpack_from(frame)
+
+        return self.get_pipe_levels(left, right)
+
+    def get_replay_value(self):
+        """ Get signal from the recording file. Only the reader thread moves the replay cursors,
+        the spectrum frame is kept for the spectrum which reads it in the UI thread.
+        """
+        replay = self.replay
+        if replay == None:
+            return (0.0, 0.0, 0.0)
+
+        self.replay_spectrum = replay.get_latest(STREAM_SPECTRUM)
+        data = replay.get_latest(STREAM_METER)
+        if data == None or len(data) < FRAME.size:
+            left = right = 0
+        else:
+            # the record contains all frames of one pipe read, the newest one is used
+            left, right = FRAME.unpack_from(data, len(data) - FRAME.size)
+
+        return self.get_pipe_levels(left, right)
 
     def get_http_value(self):
         """ Fetch HTTP value """
 
-        with self.lock:
-            return self.http_data
+        return self.http_data
 
     def get_pipe_value(self):
         """ Get signal from the named pipe. """
 
-        data = None
-        left = right = mono = 0.0
-        volume_level = self.volume
-        if volume_level == 0:
-            volume_level = 1
-
         if self.pipe == None:
-            return (left, right, mono)
+            self.new_frame = False
+            return (0.0, 0.0, 0.0)
 
         try:
             data = self.get_latest_pipe_data()
-            length = len(data) 
-            if length == 0:
-                return (0, 0, 0)
-            
-            new_left = int(self.max_in_ui * ((data[length - 4] + (data[length - 3] << 8)) / self.max_in_pipe))
-            new_right = int(self.max_in_ui * ((data[length - 2] + (data[length - 1] << 8)) / self.max_in_pipe))
-            new_mono = self.get_mono(new_left, new_right)
-            
-            left = self.get_channel(self.previous_left, new_left)
-            right = self.get_channel(self.previous_right, new_right)
-            mono = self.get_channel(self.previous_mono, new_mono)
+        except Exception as e:
+            logging.debug(e)
+            self.new_frame = False
+            return (self.previous_left, self.previous_right, self.previous_mono)
+
+        return self.get_pipe_levels(data[0], data[1])
 
-            if self.smooth_buffer_size:
-                self.smooth_buffer.append((left, right, mono))
-                left = self.get_smooth_value(0)
-                right = self.get_smooth_value(1)
-                mono = self.get_smooth_value(2)
+    def get_pipe_levels(self, raw_left, raw_right):
+        """ Convert raw pipe values into UI levels
+
+        :param raw_left: left channel value as written to the pipe
+        :param raw_right: right channel value as written to the pipe
+        :return: tuple (left, right, mono)
+        """
+        try:
+            new_left = int(self.max_in_ui * (raw_left / self.max_in_pipe))
+            new_right = int(self.max_in_ui * (raw_right / self.max_in_pipe))
+            new_mono = self.get_mono(new_left, new_right)
+            left, right, mono = self.get_levels(new_left, new_right, new_mono)
             
             self.previous_left = left
             self.previous_right = right
@@ -315,7 +793,7 @@ class DataSource(object):
         if self.mono_algorithm == MONO_ALGORITHM_MAXIMUM:
             mono = max(left, right)
         elif self.mono_algorithm == MONO_ALGORITHM_AVERAGE:
-            mono = statistics.mean([left, right])
+            mono = (left + right) / 2
         return mono
     
     def get_channel(self, previous_value, new_value):
@@ -334,6 +812,6 @@ class DataSource(object):
                 channel_value = 3
             channel_value = (channel_value + 20) * (100/23)
         elif self.stereo_algorithm == STEREO_ALGORITHM_AVERAGE:
-            channel_value = statistics.mean([previous_value, new_value])
+            channel_value = (previous_value + new_value) / 2
                 
         return channel_value
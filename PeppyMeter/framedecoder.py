@@ -0,0 +1,189 @@
+# Copyright 2016-2024 PeppyMeter peppy.player@gmail.com
+#
+# This file is part of PeppyMeter.
+#
+# PeppyMeter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PeppyMeter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PeppyMeter. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import time
+import struct
+import logging
+
+FRAME = struct.Struct("<HH")
+FRAME_SIZE = FRAME.size
+SYNC_FRAMES = 8
+STATISTICS_PERIOD = 1.0
+
+FRAMES = "frames"
+COALESCED = "coalesced"
+DROPPED = "dropped"
+RESYNCS = "resyncs"
+
+class FrameDecoder(object):
+    """ Decoder for the peppyalsa meter pipe.
+
+    Every frame consists of two little-endian 16-bit values [L_lo, L_hi, R_lo, R_hi].
+    The decoder drains the whole pipe backlog into a reusable buffer and returns
+    the newest complete frame. Incomplete trailing bytes are kept for the next read.
+    If the newest frame has values outside of the pipe range the stream is considered
+    misaligned and the decoder looks for the byte offset which makes the last frames valid.
+    A two bytes shift which only swaps the channels cannot be detected by the values.
+    """
+
+    def __init__(self, max_value, buffer_size):
+        """ Initializer
+
+        :param max_value: the maximum value which can be written to the pipe
+        :param buffer_size: the size of the read buffer
+        """
+        self.max_value = int(max_value)
+        self.buffer = bytearray(buffer_size + FRAME_SIZE)
+        self.view = memoryview(self.buffer)
+        self.remainder = 0
+        self.counters = {FRAMES: 0, COALESCED: 0, DROPPED: 0, RESYNCS: 0}
+        self.statistics = dict(self.counters)
+        self.statistics_time = time.monotonic()
+        # function called with the bytes of the complete frames before they are coalesced
+        self.listener = None
+
+    def reset(self):
+        """ Forget partially received frame """
+
+        self.remainder = 0
+
+    def read(self, fd):
+        """ Read all available data from the pipe
+
+        :param fd: pipe file descriptor
+        :return: the newest complete frame as tuple (left, right) or None
+        :raise EOFError: the pipe writer is disconnected
+        """
+        frame = None
+        eof = True
+
+        while True:
+            try:
+                n = os.readv(fd, [self.view[self.remainder:]])
+            except BlockingIOError:
+                eof = False
+                break
+
+            if n == 0:
+                break
+
+            eof = False
+            length = self.remainder + n
+            f = self.decode(length)
+            if f:
+                frame = f
+
+            if length < len(self.buffer):
+                break
+
+        self.update_statistics()
+
+        if eof and frame == None:
+            raise EOFError()
+
+        return frame
+
+    def decode(self, length):
+        """ Find the newest valid frame in the buffer and keep incomplete bytes
+
+        :param length: the number of valid bytes in the buffer
+        :return: the newest complete frame as tuple (left, right) or None
+        """
+        offset = 0
+        count = length // FRAME_SIZE
+        frame = None
+
+        if count > 0:
+            frame = self.get_frame(offset, count)
+            if frame == None:
+                offset = self.resync(length)
+                if offset == None:
+                    self.counters[DROPPED] += count
+                    self.remainder = 0
+                    return None
+                count = (length - offset) // FRAME_SIZE
+                frame = self.get_frame(offset, count)
+                self.counters[RESYNCS] += 1
+                self.counters[DROPPED] += 1
+
+            self.counters[FRAMES] += count
+            self.counters[COALESCED] += count - 1
+
+        end = offset + count * FRAME_SIZE
+        if self.listener and count > 0:
+            self.listener(bytes(self.buffer[offset : end]))
+        self.remainder = length - end
+        if self.remainder:
+            self.buffer[0 : self.remainder] = self.buffer[end : length]
+
+        return frame
+
+    def get_frame(self, offset, count):
+        """ Unpack the last frame
+
+        :param offset: the offset of the first frame in the buffer
+        :param count: the number of complete frames
+        :return: tuple (left, right) or None if the frame is out of the pipe range
+        """
+        if count == 0:
+            return None
+
+        frame = FRAME.unpack_from(self.buffer, offset + (count - 1) * FRAME_SIZE)
+        if frame[0] > self.max_value or frame[1] > self.max_value:
+            return None
+
+        return frame
+
+    def resync(self, length):
+        """ Find the byte offset which makes the last frames valid
+
+        :param length: the number of valid bytes in the buffer
+        :return: new frame offset or None if there is no valid offset
+        """
+        for offset in range(1, FRAME_SIZE):
+            count = (length - offset) // FRAME_SIZE
+            if count == 0:
+                continue
+
+            valid = True
+            for n in range(max(0, count - SYNC_FRAMES), count):
+                left, right = FRAME.unpack_from(self.buffer, offset + n * FRAME_SIZE)
+                if left > self.max_value or right > self.max_value:
+                    valid = False
+                    break
+
+            if valid:
+                logging.debug("meter pipe resynchronized, offset " + str(offset))
+                return offset
+
+        return None
+
+    def update_statistics(self):
+        """ Publish the counters collected during the last second """
+
+        now = time.monotonic()
+        if now - self.statistics_time < STATISTICS_PERIOD:
+            return
+
+        self.statistics = dict(self.counters)
+        self.statistics_time = now
+        for k in self.counters:
+            self.counters[k] = 0
+
+        if self.statistics[DROPPED] or self.statistics[RESYNCS]:
+            logging.debug("meter pipe: " + str(self.statistics))
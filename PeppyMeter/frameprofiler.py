@@ -0,0 +1,218 @@
+# Copyright 2016-2024 PeppyMeter peppy.player@gmail.com
+#
+# This file is part of PeppyMeter.
+#
+# PeppyMeter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PeppyMeter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PeppyMeter. If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import logging
+
+from time import perf_counter_ns
+from bisect import bisect_left
+from array import array
+from threading import Thread
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STAGE_EVENTS = "events"
+STAGE_REFRESH = "refresh"
+STAGE_RUN = "run"
+STAGE_UPDATE = "update"
+STAGE_PREFETCH = "prefetch"
+STAGE_FRAME = "frame"
+STAGE_WAIT = "wait"
+PERCENTILES = (50, 95, 99)
+
+# bucket upper edges in nanoseconds from 10 us to about 1.4 s, every next bucket is 25% wider
+BUCKETS = [int(10000 * 1.25 ** n) for n in range(54)]
+
+# the report is visible even if the root logger shows only warnings
+logger = logging.getLogger("frameprofiler")
+logger.setLevel(logging.INFO)
+
+class Histogram(object):
+    """ Fixed-size histogram of durations with logarithmic buckets """
+
+    def __init__(self):
+        """ Initializer """
+
+        self.counts = array("L", [0] * (len(BUCKETS) + 1))
+        self.count = 0
+        self.max = 0
+
+    def add(self, duration):
+        """ Add duration
+
+        :param duration: duration in nanoseconds
+        """
+        self.counts[bisect_left(BUCKETS, duration)] += 1
+        self.count += 1
+        if duration > self.max:
+            self.max = duration
+
+    def get_percentile(self, percentile):
+        """ Get percentile. The result is the upper edge of the bucket so it's accurate to 25%.
+
+        :param percentile: percentile 0 - 100
+        :return: duration in nanoseconds
+        """
+        if self.count == 0:
+            return 0
+
+        rank = self.count * percentile / 100.0
+        total = 0
+        for i, c in enumerate(self.counts):
+            total += c
+            if total >= rank and c:
+                if i == len(BUCKETS):
+                    return self.max
+                return min(BUCKETS[i], self.max)
+
+        return self.max
+
+class FrameProfiler(object):
+    """ Measures the duration of the main loop stages per meter.
+
+    The loop calls start_frame, then mark after every stage and end_frame before waiting for the next frame.
+    The time between end_frame and the next start_frame is recorded as the wait stage. The frame which
+    took longer than the frame budget is counted as missed. Every period the percentiles are written
+    to the log and kept for the optional HTTP endpoint on localhost, then the histograms are cleared.
+    """
+
+    def __init__(self, frame_rate, period=10, port=0):
+        """ Initializer
+
+        :param frame_rate: frames per second
+        :param period: report period in seconds
+        :param port: HTTP port on localhost, 0 - no HTTP endpoint
+        """
+        self.budget = int(1000000000 / frame_rate)
+        self.period = int(period * 1000000000)
+        self.histograms = {}
+        self.missed = {}
+        self.frames = {}
+        self.report = {}
+        self.meter = None
+        self.frame_start = None
+        self.stage_start = None
+        self.frame_end = None
+        self.report_time = perf_counter_ns()
+
+        if port:
+            self.start_server(port)
+
+    def get_histogram(self, stage):
+        """ Get histogram of the current meter stage
+
+        :param stage: stage name
+        :return: histogram
+        """
+        key = (self.meter, stage)
+        try:
+            return self.histograms[key]
+        except KeyError:
+            h = self.histograms[key] = Histogram()
+            return h
+
+    def start_frame(self, meter):
+        """ Start measuring new frame
+
+        :param meter: the name of the current meter
+        """
+        now = perf_counter_ns()
+
+        if self.frame_end != None and meter == self.meter:
+            self.get_histogram(STAGE_WAIT).add(now - self.frame_end)
+
+        if now - self.report_time >= self.period:
+            self.create_report()
+            self.report_time = now
+
+        self.meter = meter
+        self.frame_start = self.stage_start = now
+
+    def mark(self, stage):
+        """ Record the duration of the stage which has just finished
+
+        :param stage: stage name
+        """
+        now = perf_counter_ns()
+        self.get_histogram(stage).add(now - self.stage_start)
+        self.stage_start = now
+
+    def get_headroom(self):
+        """ Get the time left in the budget of the current frame
+
+        :return: time in nanoseconds, negative if the frame is over the budget
+        """
+        return self.budget - (perf_counter_ns() - self.frame_start)
+
+    def end_frame(self):
+        """ Record the duration of the whole frame without waiting """
+
+        now = perf_counter_ns()
+        duration = now - self.frame_start
+        self.get_histogram(STAGE_FRAME).add(duration)
+        self.frames[self.meter] = self.frames.get(self.meter, 0) + 1
+        if duration > self.budget:
+            self.missed[self.meter] = self.missed.get(self.meter, 0) + 1
+        self.frame_end = now
+
+    def create_report(self):
+        """ Create report with percentiles in milliseconds, write it to the log and clear histograms """
+
+        report = {}
+        for (meter, stage), h in self.histograms.items():
+            m = report.setdefault(str(meter), {"frames": self.frames.get(meter, 0), "missed": self.missed.get(meter, 0), "stages": {}})
+            s = m["stages"][stage] = {"count": h.count, "max": h.max / 1000000}
+            for p in PERCENTILES:
+                s["p" + str(p)] = h.get_percentile(p) / 1000000
+
+        for meter, m in report.items():
+            logger.info("meter %s frames %d missed %d", meter, m["frames"], m["missed"])
+            for stage, s in m["stages"].items():
+                logger.info("meter %s %s p50 %.2f ms p95 %.2f ms p99 %.2f ms max %.2f ms", meter, stage,
+                    s["p50"], s["p95"], s["p99"], s["max"])
+
+        self.report = report
+        self.histograms = {}
+        self.missed = {}
+        self.frames = {}
+
+    def start_server(self, port):
+        """ Start HTTP server on localhost which returns the last report in JSON format
+
+        :param port: port number
+        """
+        profiler = self
+
+        class ReportHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(profiler.report).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            server = ThreadingHTTPServer(("127.0.0.1", port), ReportHandler)
+        except OSError as e:
+            logging.debug(e)
+            return
+
+        thread = Thread(target=server.serve_forever, daemon=True)
+        thread.start()
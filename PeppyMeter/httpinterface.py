@@ -47,17 +47,24 @@ class HTTPInterface(object):
         thread.start()
 
     def write_data(self):
-        """ Method of the writing thread """
+        """ Method of the writing thread. Sends new data not more often than the update period. """
 
+        sequence = 0
         while self.running:
-            v = self.data_source.get_current_data()
-            if v:
-                d = {"left": v[0], "right": v[1], "mono": v[2]}
-                try:
-                    requests.put(self.url, json=d)
-                except:
-                    pass
-            time.sleep(self.update_period)
+            v = self.data_source.publisher.wait_for_frame(sequence, self.update_period)
+            if v == None:
+                continue
+
+            start = time.monotonic()
+            sequence = v.sequence
+            d = {"left": v.left, "right": v.right, "mono": v.mono}
+            try:
+                requests.put(self.url, json=d)
+            except:
+                pass
+            wait = self.update_period - (time.monotonic() - start)
+            if wait > 0:
+                time.sleep(wait)
 
     def stop_writing(self):
         """ Stop writing thread """
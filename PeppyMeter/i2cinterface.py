@@ -97,21 +97,27 @@ class I2CInterface(object):
         thread.start()
         
     def write_data(self):
-        """ Method of the writing thread """
+        """ Method of the writing thread. Writes new data not more often than the update period. """
         
+        sequence = 0
         while self.running:
-            v = self.data_source.get_current_data()
+            v = self.data_source.publisher.wait_for_frame(sequence, self.update_period)
+            if v == None:
+                continue
 
-            if v:
-                left = self.get_bits(v[0])
-                right = self.get_bits(v[1])
+            start = time.monotonic()
+            sequence = v.sequence
+            left = self.get_bits(v.left)
+            right = self.get_bits(v.right)
 
-                logging.debug(self.logging_template.format(left, right))
+            logging.debug(self.logging_template.format(left, right))
 
-                self.i2c_interface.write_word_data(self.left_channel_address, 0x12, left)
-                self.i2c_interface.write_word_data(self.right_channel_address, 0x12, right)
+            self.i2c_interface.write_word_data(self.left_channel_address, 0x12, left)
+            self.i2c_interface.write_word_data(self.right_channel_address, 0x12, right)
 
-            time.sleep(self.update_period)
+            wait = self.update_period - (time.monotonic() - start)
+            if wait > 0:
+                time.sleep(wait)
     
     def stop_writing(self):
         """ Stop writing thread and nullify values in I2C """
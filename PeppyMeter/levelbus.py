@@ -0,0 +1,147 @@
+# Copyright 2016-2024 PeppyMeter peppy.player@gmail.com
+#
+# This file is part of PeppyMeter.
+#
+# PeppyMeter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PeppyMeter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PeppyMeter. If not, see <http://www.gnu.org/licenses/>.
+
+import time
+import struct
+import logging
+
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:
+    shared_memory = None # Python 3.7 and earlier
+
+MAGIC = b"PPLB"
+VERSION = 2
+HEADER = struct.Struct("<4sHHIQQ")
+HEADER_SIZE = 32
+SEQUENCE = struct.Struct("<Q")
+SEQUENCE_OFFSET = 12
+SLOT_HEADER = struct.Struct("<Qq")
+READ_ATTEMPTS = 4
+
+METER_BUS = "_meter"
+SPECTRUM_BUS = "_spectrum"
+
+class LevelBus(object):
+    """ Ring buffer of frames in the shared memory.
+
+    The header contains [magic, version, slots, frame size, sequence, generation] where the sequence
+    is the number of the last published frame and the generation is the creation time of the bus.
+    The generation lets the readers detect that the writer was restarted and created a new bus.
+    Every slot contains [sequence, timestamp, frame, sequence]. The writer changes the first
+    slot sequence before the frame and the last one after it, so the reader detects a frame which was overwritten while
+    it was reading (seqlock per slot). One writer and any number of readers are supported.
+    """
+
+    def __init__(self, name, frame_size=0, slots=64, create=False):
+        """ Initializer
+
+        :param name: shared memory name
+        :param frame_size: frame size in bytes, used to create the bus
+        :param slots: the number of slots in the ring, used to create the bus
+        :param create: True - create the bus, False - attach to the existing bus
+        """
+        if shared_memory == None:
+            raise RuntimeError("Shared memory requires Python 3.8 or later")
+
+        self.name = name
+        self.owner = create
+
+        if create:
+            self.slot_size = SLOT_HEADER.size + frame_size + SEQUENCE.size
+            size = HEADER_SIZE + slots * self.slot_size
+            try:
+                old = shared_memory.SharedMemory(name=name)
+                old.close()
+                old.unlink()
+            except FileNotFoundError:
+                pass
+            self.memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self.buffer = self.memory.buf
+            self.generation = time.time_ns()
+            HEADER.pack_into(self.buffer, 0, MAGIC, VERSION, slots, frame_size, 0, self.generation)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+            # the reader must not remove the segment when it exits
+            resource_tracker.unregister("/" + self.memory.name, "shared_memory")
+            self.buffer = self.memory.buf
+            magic, version, slots, frame_size, _, self.generation = HEADER.unpack_from(self.buffer, 0)
+            if magic != MAGIC or version != VERSION:
+                self.buffer = None
+                self.memory.close()
+                raise ValueError("Unsupported level bus: " + name)
+            self.slot_size = SLOT_HEADER.size + frame_size + SEQUENCE.size
+
+        self.slots = slots
+        self.frame_size = frame_size
+        self.sequence = SEQUENCE.unpack_from(self.buffer, SEQUENCE_OFFSET)[0]
+
+    def get_slot_offset(self, sequence):
+        """ Get the slot offset for the sequence number
+
+        :param sequence: frame sequence number
+        :return: slot offset in the shared memory
+        """
+        return HEADER_SIZE + (sequence % self.slots) * self.slot_size
+
+    def publish(self, frame):
+        """ Write new frame into the next slot
+
+        :param frame: frame bytes, the length should be equal to the bus frame size
+        """
+        sequence = self.sequence + 1
+        offset = self.get_slot_offset(sequence)
+        SLOT_HEADER.pack_into(self.buffer, offset, sequence, time.monotonic_ns())
+        start = offset + SLOT_HEADER.size
+        size = min(len(frame), self.frame_size)
+        self.buffer[start : start + size] = frame[:size]
+        SEQUENCE.pack_into(self.buffer, start + self.frame_size, sequence)
+        SEQUENCE.pack_into(self.buffer, SEQUENCE_OFFSET, sequence)
+        self.sequence = sequence
+
+    def get_latest(self):
+        """ Get the copy of the newest frame. The last slot sequence is read before the copy
+        and the first one after it, the writer changes them in the opposite order. If both are
+        equal to the frame sequence the slot was not overwritten during the copy.
+
+        :return: tuple (sequence, timestamp in ns, frame bytes) or None if there is no valid frame
+        """
+        for _ in range(READ_ATTEMPTS):
+            sequence = SEQUENCE.unpack_from(self.buffer, SEQUENCE_OFFSET)[0]
+            if sequence == 0:
+                return None
+
+            offset = self.get_slot_offset(sequence)
+            start = offset + SLOT_HEADER.size
+            end = SEQUENCE.unpack_from(self.buffer, start + self.frame_size)[0]
+            frame = bytes(self.buffer[start : start + self.frame_size])
+            begin, timestamp = SLOT_HEADER.unpack_from(self.buffer, offset)
+            if begin == sequence and end == sequence:
+                return (sequence, timestamp, frame)
+
+        return None
+
+    def close(self):
+        """ Detach from the shared memory. The owner removes it. """
+
+        self.buffer = None
+        try:
+            self.memory.close()
+            if self.owner:
+                self.memory.unlink()
+        except Exception as e:
+            logging.debug(e)
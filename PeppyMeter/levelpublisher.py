@@ -0,0 +1,103 @@
+# Copyright 2016-2024 PeppyMeter peppy.player@gmail.com
+#
+# This file is part of PeppyMeter.
+#
+# PeppyMeter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PeppyMeter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PeppyMeter. If not, see <http://www.gnu.org/licenses/>.
+
+import time
+import logging
+
+from threading import Condition
+from collections import namedtuple
+
+LevelFrame = namedtuple("LevelFrame", ["sequence", "timestamp", "left", "right", "mono", "statistics"], defaults=(None,))
+
+class LevelPublisher(object):
+    """ Publishes the newest level frame.
+
+    The producer replaces the immutable frame with a new one which has the next sequence number.
+    Consumers read the current frame without locks, wait until a newer sequence is published
+    or register a callback which is called from the producer thread.
+    """
+
+    def __init__(self):
+        """ Initializer """
+
+        self.frame = LevelFrame(0, 0.0, 0.0, 0.0, 0.0)
+        self.condition = Condition()
+        self.listeners = ()
+
+    def publish(self, left, right, mono, statistics=None):
+        """ Publish new frame
+
+        :param left: left channel value
+        :param right: right channel value
+        :param mono: mono value
+        :param statistics: optional level statistics for the frame
+        :return: published frame
+        """
+        frame = LevelFrame(self.frame.sequence + 1, time.monotonic(), left, right, mono, statistics)
+        self.frame = frame
+
+        with self.condition:
+            self.condition.notify_all()
+
+        for listener in self.listeners:
+            try:
+                listener(frame)
+            except Exception as e:
+                logging.debug(e)
+
+        return frame
+
+    def get_frame(self):
+        """ Get the current frame
+
+        :return: the newest frame
+        """
+        return self.frame
+
+    def wait_for_frame(self, sequence, timeout=None):
+        """ Wait until a frame newer than the provided sequence is published
+
+        :param sequence: the sequence number of the last consumed frame
+        :param timeout: timeout in seconds
+        :return: the newest frame or None if nothing new was published before timeout
+        """
+        frame = self.frame
+        if frame.sequence > sequence:
+            return frame
+
+        with self.condition:
+            self.condition.wait_for(lambda: self.frame.sequence > sequence, timeout)
+
+        frame = self.frame
+        if frame.sequence > sequence:
+            return frame
+
+        return None
+
+    def add_listener(self, listener):
+        """ Add listener which is called for every new frame
+
+        :param listener: function with one parameter - the frame
+        """
+        self.listeners = self.listeners + (listener,)
+
+    def remove_listener(self, listener):
+        """ Remove listener
+
+        :param listener: listener to remove
+        """
+        self.listeners = tuple(l for l in self.listeners if l != listener)
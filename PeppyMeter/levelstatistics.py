@@ -0,0 +1,118 @@
+# Copyright 2016-2024 PeppyMeter peppy.player@gmail.com
+#
+# This file is part of PeppyMeter.
+#
+# PeppyMeter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PeppyMeter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PeppyMeter. If not, see <http://www.gnu.org/licenses/>.
+
+import math
+
+from array import array
+from collections import namedtuple, deque
+
+CHANNELS = 2
+
+# every field is a tuple (left, right)
+Statistics = namedtuple("Statistics", ["peak", "peak_hold", "rms", "clips", "total_clips"])
+
+class LevelStatistics(object):
+    """ Per channel statistics over the ring buffer of the last frames.
+
+    Peak is the maximum in the ring tracked by the queue of decreasing values, peak hold keeps
+    the maximum during the hold time and then decays, RMS uses the running sum of squares and
+    clips is the number of frames in the ring which reached the clip level. Every update is computed once per frame
+    so the consumers only read the fields.
+    """
+
+    def __init__(self, size, hold_time, decay, clip_level):
+        """ Initializer
+
+        :param size: the number of frames in the ring buffer
+        :param hold_time: peak hold time in seconds
+        :param decay: peak hold decay in UI units per second
+        :param clip_level: the level which is counted as clipping
+        """
+        self.size = max(1, size)
+        self.hold_time = hold_time
+        self.decay = decay
+        self.clip_level = clip_level
+        self.rings = [array("f", [0.0] * self.size) for _ in range(CHANNELS)]
+        self.squares = [0.0] * CHANNELS
+        # per channel queue of (frame number, value) with decreasing values, the first one is the peak
+        self.peaks = [deque() for _ in range(CHANNELS)]
+        self.frames = 0
+        self.clips = [0] * CHANNELS
+        self.total_clips = [0] * CHANNELS
+        self.holds = [0.0] * CHANNELS
+        self.hold_times = [0.0] * CHANNELS
+        self.index = 0
+        self.previous_time = None
+
+    def update(self, left, right, now):
+        """ Add new frame
+
+        :param left: left channel value
+        :param right: right channel value
+        :param now: frame time in seconds
+        :return: statistics
+        """
+        if self.previous_time == None:
+            elapsed = 0.0
+        else:
+            elapsed = now - self.previous_time
+        self.previous_time = now
+
+        i = self.index
+        peak = [0.0] * CHANNELS
+        hold = [0.0] * CHANNELS
+        rms = [0.0] * CHANNELS
+
+        for ch, value in enumerate((left, right)):
+            ring = self.rings[ch]
+            old = ring[i]
+            ring[i] = value
+            value = ring[i]
+            self.squares[ch] += value * value - old * old
+
+            if old >= self.clip_level:
+                self.clips[ch] -= 1
+            if value >= self.clip_level:
+                self.clips[ch] += 1
+                self.total_clips[ch] += 1
+
+            if value >= self.holds[ch]:
+                self.holds[ch] = value
+                self.hold_times[ch] = now
+            elif now - self.hold_times[ch] > self.hold_time:
+                self.holds[ch] = max(value, self.holds[ch] - self.decay * elapsed)
+
+            peaks = self.peaks[ch]
+            while peaks and peaks[-1][1] <= value:
+                peaks.pop()
+            peaks.append((self.frames, value))
+            if peaks[0][0] <= self.frames - self.size:
+                peaks.popleft()
+            peak[ch] = peaks[0][1]
+            hold[ch] = self.holds[ch]
+
+        self.frames += 1
+        self.index = (i + 1) % self.size
+        if self.index == 0:
+            # remove accumulated rounding error once per ring cycle
+            for ch in range(CHANNELS):
+                self.squares[ch] = math.fsum(v * v for v in self.rings[ch])
+
+        for ch in range(CHANNELS):
+            rms[ch] = math.sqrt(max(0.0, self.squares[ch]) / self.size)
+
+        return Statistics(tuple(peak), tuple(hold), tuple(rms), tuple(self.clips), tuple(self.total_clips))
@@ -35,6 +35,10 @@ import pygame
 import logging
 
 from peppyspectrum.spectrum import Spectrum
+
+# components which change without redrawing the whole view, they are never cached in the static layer
+DYNAMIC_COMPONENTS = ("cover", "metatext", "progressbar", "leftcomp", "rightcomp", "casseteclear", "turnarm", "tunercomp")
+
 class Meter(Container):
     """ The base class for all meters """
 
@@ -155,6 +159,15 @@ class Meter(Container):
 
         self.max_volume = volume
 
+    def set_screen(self, screen):
+        """ Draw the meter on another surface
+
+        :param screen: new surface
+        """
+        self.screen = screen
+        for comp in self.components:
+            if comp: comp.screen = screen
+
     def draw_bgr_fgr(self, rect, comp):
         """ Draw either background or foreground component """
         if not rect: return
@@ -269,6 +282,8 @@ class MetaMeter(Meter):
         self.metadatasourcedns = util.meter_config['metadatasourcedns']
         self.usepeak = self.config['icons.usepeak']
         self.peakthreshold = self.config['icons.peakthreshold']
+        self.peakhold = self.config['icons.peakhold']
+        self.peakstates = [None, None]
         self.coversize = self.config['cover.size']
         self.usesingle = self.config['icons.usesingle']
         self.musicservices = {}
@@ -279,13 +294,16 @@ class MetaMeter(Meter):
         self.network = None
         self.infadecover = False
         self.coveralpha = 0
+        self.static_layer = None
+        self.static_components = []
+        self.layer_components = []
 
     def fadecover(self):
         if self.infadecover and self.coveralpha<255:
             temp_image = self.newcover[1].copy()
             temp_image.fill((255, 255, 255, self.coveralpha), None, pygame.BLEND_RGBA_MULT)
             self.cover.content = self.cover.content[0],temp_image
-            self.redrawview()
+            self.redraw_area([self.get_component_rect(self.cover)])
             self.coveralpha += 10
             if self.coveralpha>255:
                 self.infadecover = False
@@ -362,7 +380,18 @@ class MetaMeter(Meter):
                     s = rec.sub(r'\1on\3', comp.path)
             else:
                 s = rec.sub(fr'\1{state}\3', comp.path)
-            comp.content = self.load_image(s)
+            self.set_component_image(comp, self.load_image(s))
+    def set_component_image(self, comp, image):
+        """ Set new image of the component. The static layer is recreated if the component is cached there.
+
+        :param comp: image component
+        :param image: tuple (path, image)
+        """
+        if comp.content != None and image != None and comp.content[0] == image[0]:
+            return
+        comp.content = image
+        if comp in self.static_components:
+            self.static_layer = None
     def addTextComponent(self):
         self.metatext = TextComponent(self.util)
         self.components.append(self.metatext)
@@ -377,34 +406,49 @@ class MetaMeter(Meter):
     def switchiconpath(self, comp,prefix,postfix):
         pattern = r'/(.*)(/.*-on.*\.png)'
         s = re.sub(pattern,fr'\1/{prefix}-on{postfix}.png', comp.path)
-        comp.content = self.load_image(s)
+        self.set_component_image(comp, self.load_image(s))
     def run(self):
         r =  super().run()
         if self.usepeak:
-            left = self.data_source.get_current_left_channel_data()
-            right = self.data_source.get_current_right_channel_data()
-            if left and left > self.peakthreshold:
-                self.switchcomponent(self.redleds[0], "on")
+            if self.peakhold:
+                # the leds stay on during the peak hold time
+                statistics = self.data_source.get_current_statistics()
+                levels = statistics.peak_hold if statistics else None
             else:
-                self.switchcomponent(self.redleds[0], "off")
-            if right and right > self.peakthreshold:
-                self.switchcomponent(self.redleds[1], "on")
-            else:
-                self.switchcomponent(self.redleds[1], "off")
-            self.redleds[1].draw()
-            self.redleds[0].draw()
-            pygame.display.update([pygame.Rect(self.redleds[1].content_x, self.redleds[1].content_y, 25, 25),
-                                   pygame.Rect(self.redleds[0].content_x,self.redleds[0].content_y, 25, 25)])
+                levels = (self.data_source.get_current_left_channel_data(), self.data_source.get_current_right_channel_data())
+            if levels:
+                areas = []
+                for i, led in enumerate(self.redleds):
+                    state = bool(levels[i]) and levels[i] > self.peakthreshold
+                    if state != self.peakstates[i]:
+                        self.peakstates[i] = state
+                        self.switchcomponent(led, "on" if state else "off")
+                        led.draw()
+                        areas.append(pygame.Rect(led.content_x, led.content_y, 25, 25))
+                self.util.damage.add(areas)
          #self.redrawview()
         self.fadecover()
         return r
 
+    def start(self):
+        super().start()
+        # the screen background is drawn by the start
+        self.static_layer = None
+
+    def set_screen(self, screen):
+        super().set_screen(screen)
+        # some dynamic components are not in the container
+        for comp in self.get_dynamic_components():
+            comp.screen = screen
+
     def stop(self):
         super().stop()
         self.clean()
+        self.static_layer = None
         self.redrawview()
     def updateview(self,metadata,titletime):
         redrawneeded = False
+        seekchanged = False
 
         osversion = self.getosversion()
         if self.metatext.osversion != osversion:
@@ -425,7 +469,7 @@ class MetaMeter(Meter):
                 self.progressbar.progress = self.metatext.seek / 1000 / self.metatext.duration * 100 if self.metatext.duration != 0 else 0
             if self.progressbar.progress > 100:
                 self.progressbar.progress = 0
-            redrawneeded = True
+            seekchanged = True
         if metadata :
             if 'status' in metadata:
                 self.playing = metadata['status'] == 'play'
@@ -483,6 +527,14 @@ class MetaMeter(Meter):
 
         if redrawneeded:
             self.redrawview()
+        elif seekchanged:
+            self.redraw_area(self.get_seek_areas())
+    def get_seek_areas(self):
+        """ Get the areas which change when only the playing time changes
+
+        :return: list of rectangles
+        """
+        return self.metatext.get_dirty_rects() + [self.get_component_rect(self.progressbar)]
     def isInternet(self):
         try:
             s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -538,12 +590,125 @@ class MetaMeter(Meter):
             return self.loadimagefromurl(albumart)
         return self.cover.content
     def redrawview(self):
+        if self.static_layer == None:
+            self.create_static_layer()
+        self.draw_layers(self.screen.get_rect())
+        self.util.damage.add_screen()
+
+    def redraw_area(self, rects):
+        """ Redraw only the areas of the changed components
+
+        :param rects: list of rectangles, None items are ignored
+        """
+        rects = [pygame.Rect(r) for r in rects if r]
+        if not rects:
+            return
+        if self.static_layer == None:
+            self.redrawview()
+            return
+
+        rects = self.util.damage.merge(rects)
+        for r in rects:
+            self.draw_layers(r)
+        self.util.damage.add(rects)
+
+    def get_indicators(self):
+        """ Get needle or mask components, they follow the background
+
+        :return: list of components
+        """
+        if self.meter_type == TYPE_CIRCULAR and self.channels != 2:
+            return self.components[1:2]
+        return self.components[1:3]
+
+    def get_dynamic_components(self):
+        """ Get components which are redrawn on top of the static layer
+
+        :return: list of components
+        """
+        components = [getattr(self, name, None) for name in DYNAMIC_COMPONENTS]
+        if self.usepeak:
+            components.extend(getattr(self, "redleds", ()))
+        return [c for c in components if c]
+
+    def get_component_rect(self, comp):
+        """ Get the screen area of the component
+
+        :param comp: component
+        :return: rectangle or None if the component doesn't draw anything
+        """
+        if hasattr(comp, "get_area"):
+            return comp.get_area()
+
+        content = comp.content
+        if isinstance(content, pygame.Rect):
+            return content
+        if isinstance(content, tuple):
+            image = content[1]
+        else:
+            image = content
+        if not isinstance(image, pygame.Surface):
+            return None
+
+        if comp.bounding_box and isinstance(content, tuple):
+            r = pygame.Rect(comp.bounding_box).clip(image.get_rect())
+            return pygame.Rect(comp.content_x, comp.content_y, r.w, r.h)
+        elif comp.bounding_box:
+            return pygame.Rect(comp.bounding_box)
+        return image.get_rect(topleft=(comp.content_x, comp.content_y))
+
+    def create_static_layer(self):
+        """ Draw static components and keep the result as the static layer.
+        The static component is cached only if it's not covered by any component below it which is redrawn.
+        """
         self.reset_bgr_fgr(self.bgr)
         if self.fgr:
             self.reset_bgr_fgr(self.fgr)
-        self.draw()
 
-        pygame.display.update()
+        indicators = self.get_indicators()
+        dynamic = self.get_dynamic_components()
+        self.static_components = []
+        self.layer_components = []
+        layer_rects = []
+
+        for comp in self.components:
+            if not comp or comp in indicators:
+                continue
+            r = self.get_component_rect(comp)
+            if comp not in dynamic and (r == None or r.collidelist(layer_rects) == -1):
+                self.static_components.append(comp)
+            else:
+                self.layer_components.append(comp)
+                if r:
+                    layer_rects.append(r)
+
+        for comp in self.static_components:
+            comp.draw()
+        self.static_layer = self.screen.copy()
+
+    def draw_layers(self, area):
+        """ Restore the area from the static layer and draw the other components on top of it.
+        Needles and masks are below the foreground so the areas with them are drawn completely.
+
+        :param area: screen rectangle
+        """
+        self.reset_bgr_fgr(self.bgr)
+        if self.fgr:
+            self.reset_bgr_fgr(self.fgr)
+
+        screen = self.screen
+        screen.set_clip(area)
+        screen.blit(self.static_layer, area, area)
+        for comp in self.layer_components:
+            comp.draw()
+
+        for indicator in self.get_indicators():
+            r = self.get_component_rect(indicator)
+            if r == None or not r.colliderect(area):
+                continue
+            screen.set_clip(r.clip(area))
+            self.draw()
+        screen.set_clip(None)
     def loadimagefromurl(self,imageurl):
         try:
             r = requests.get(imageurl,timeout=4)
@@ -673,7 +838,7 @@ class MetaCasseteMeter(MetaMeter):
         self.leftcomp.draw()
         self.rightcomp.draw()
         self.casseteclear.draw()
-        pygame.display.update([self.area])
+        self.util.damage.add(self.area)
         #pygame.display.update([pygame.Rect(0, 0, 1200, 800)])
 class MetaNadDeckMeter(MetaCasseteMeter):
     def addTextComponent(self):
@@ -724,9 +889,7 @@ class MetaPioReelMeter(MetaCasseteMeter):
         if self.angleleft >= 360:
             self.angleleft = 0
 
-        self.reset_bgr_fgr(self.bgr)
-        self.draw()
-        pygame.display.update([self.image_rectright,self.image_rectleft])
+        self.redraw_area([self.image_rectright,self.image_rectleft])
 
 
     def addpeakicons(self):
@@ -756,11 +919,11 @@ class MetaPioReelMeter(MetaCasseteMeter):
 class MetaSpectrumMeter(MetaMeter):
     def __init__(self, util, meter_type, meter_parameters, data_source):
         super().__init__(util, meter_type, meter_parameters, data_source)
-        self.pm = Spectrum(None, True,self.util,self.config)
+        self.pm = Spectrum(None, True,self.util,self.config,data_source=self.data_source)
 
         #self.pm.callback_start = lambda x: self.pm.clean_draw_update()
         self.pm.start()
-        self.framecount=0
+        self.previous_time = None
 
     def start(self):
         super().start()
@@ -768,13 +931,14 @@ class MetaSpectrumMeter(MetaMeter):
     def stop(self):
         super().stop()
         self.pm.stop()
+    def set_screen(self, screen):
+        super().set_screen(screen)
+        self.pm.set_screen(screen)
     def run(self):
 
-        self.framecount += 1
-        if self.framecount == 3:
-            self.framecount = 0
-            self.pm.get_data()
-            self.pm.clean_draw_update()
+        now = time.monotonic()
+        self.pm.update_values(now)
+        self.pm.dirty_draw_update()
         #self.draw()
 
 
@@ -782,15 +946,18 @@ class MetaSpectrumMeter(MetaMeter):
             self.pm.seconds = 0
             # self.pm.refresh()
         #pygame.display.update()
-        self.pm.seconds += 0.1
+        if self.previous_time != None:
+            self.pm.seconds += now - self.previous_time
+        self.previous_time = now
         self.fadecover()
     def redrawview(self):
-        self.reset_bgr_fgr(self.bgr)
-        if self.fgr:
-            self.reset_bgr_fgr(self.fgr)
-        self.draw()
+        super().redrawview()
         self.pm.clean_draw_update()
-        pygame.display.update()
+
+    def redraw_area(self, rects):
+        super().redraw_area(rects)
+        if self.pm.bounding_box.collidelist([r for r in rects if r]) != -1:
+            self.pm.clean_draw_update()
 
 class MetaMSpectrumWithMeter(MetaSpectrumMeter):
     def run(self):
@@ -836,6 +1003,11 @@ class TunerSpectrumWithMeter(MetaMSpectrumWithMeter):
         self.prevprogress = self.progressbar.progress
         super().updateview(metadata,titletime)
 
+    def get_seek_areas(self):
+        previous = self.get_component_rect(self.tunercomp)
+        self.tunerAnimation()
+        return super().get_seek_areas() + [previous, self.get_component_rect(self.tunercomp)]
+
 
 class MetaAkaiDeckMeter(MetaPioReelMeter,MetaMSpectrumWithMeter):
 
@@ -966,10 +1138,7 @@ class MetaPhonoMeter(MetaMeter):
         self.rotatecomp(self.cover, self.rotateangle, self.cover_rect,self.newcover[1],(0,0))
         if self.frames % 20 == 0:
             self.rotatecomp(self.turnarm, steps, self.turnarm_rect, self.turnarmorig, (-36+steps/2, 35+steps/2))
-        self.reset_bgr_fgr(self.fgr)
-        self.reset_bgr_fgr(self.bgr)
-        self.draw()
-        pygame.display.update([self.cover_rect,self.turnarm_rect])
+        self.redraw_area([self.cover_rect,self.turnarm_rect])
 
     def rotatecomp(self, comp, angle, rect,image,pivot=(0,0)):
         rotated_image = pygame.transform.rotate(image, angle)
@@ -0,0 +1,246 @@
+# Copyright 2016-2024 PeppyMeter peppy.player@gmail.com
+#
+# This file is part of PeppyMeter.
+#
+# PeppyMeter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PeppyMeter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PeppyMeter. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import logging
+
+from time import perf_counter_ns
+from component import TextComponent
+from needlefactory import NeedleFactory
+from peppyspectrum.spectrum import Spectrum
+from configfileparser import *
+
+STEP_IMAGE = "image"
+STEP_FONT = "font"
+STEP_SPECTRUM = "spectrum"
+STEP_NEEDLE = "needle"
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+NEEDLE_TYPES = (TYPE_CIRCULAR, TYPE_METACIRCULAR, TYPE_METACASSETECIRCLE, TYPE_METACIRCLESSPECTRUM,
+    TYPE_METACASSETECIRCLEWITHSPECTRUM, TYPE_TUNERCIRCLESSPECTRUM)
+# the part of the frame budget which is never used by the prefetcher
+RESERVE = 0.25
+# the step which doesn't fit into the headroom during this number of frames is made anyway
+MAX_DEFERRED_FRAMES = 60
+
+class MeterPrefetcher(object):
+    """ Loads the assets of the next meter in the list while the frame loop has spare time.
+
+    The assets are loaded by small steps: the images of the meter section, the fonts of the text component,
+    the spectrum configuration and the needle sprites one by one. The loaded assets are put into the same
+    caches which are used by the meter factory so the next meter is created faster. At the end of every
+    frame the loop passes the time left in the frame budget. The step is made only if its expected duration
+    fits into that time. The duration is estimated by the average speed of the previous steps of the same kind. The images and
+    sprites loaded for one meter don't exceed the memory budget, the rest is loaded on demand.
+    """
+
+    def __init__(self, util, vumeter, frame_rate, size):
+        """ Initializer
+
+        :param util: utility object
+        :param vumeter: VU Meter which keeps the needle caches
+        :param frame_rate: frames per second
+        :param size: memory budget in bytes
+        """
+        self.util = util
+        self.vumeter = vumeter
+        self.budget = int(1000000000 / frame_rate)
+        self.size = size
+        self.durations = {}
+        self.needles = set()
+        self.name = None
+        self.steps = None
+        self.step = None
+        self.used = 0
+        self.deferred = 0
+
+    def set_meter(self, name):
+        """ Start prefetching the assets of the meter. The assets of the current meter are loaded already.
+
+        :param name: meter name
+        """
+        if name == self.name:
+            return
+
+        self.name = name
+        self.used = 0
+        self.deferred = 0
+        if not self.util.meter_config[USE_CACHE]:
+            self.evict((name, self.util.meter_config[METER]))
+        self.steps = self.get_steps(name)
+        self.step = next(self.steps, None)
+
+    def run(self, headroom):
+        """ Make prefetch steps which fit into the time left in the frame
+
+        :param headroom: time left in the frame budget in nanoseconds
+        """
+        if self.step == None:
+            return
+
+        reserve = self.budget * RESERVE
+        start = perf_counter_ns()
+        deadline = start + headroom - reserve
+
+        while self.step != None:
+            kind, units = self.step
+            try:
+                total_time, total_units = self.durations[kind]
+                expected = total_time * units / total_units
+            except KeyError:
+                expected = self.budget / 2
+
+            if start + expected > deadline:
+                self.deferred += 1
+                if self.deferred < MAX_DEFERRED_FRAMES or headroom < self.budget / 2:
+                    return
+
+            self.deferred = 0
+            try:
+                self.step = next(self.steps, None)
+            except Exception as e:
+                logging.debug("failed to prefetch the meter " + str(self.name) + ": " + str(e))
+                self.step = None
+                return
+            now = perf_counter_ns()
+            total_time, total_units = self.durations.get(kind, (0, 0))
+            self.durations[kind] = (total_time + now - start, total_units + max(units, 1))
+            start = now
+
+    def get_steps(self, name):
+        """ Generator of the prefetch steps. Every step is announced by the tuple (kind, units) where units
+        are used to estimate the step duration. The step is made when the generator is resumed.
+
+        :param name: meter name
+        :return: generator
+        """
+        try:
+            config = self.util.meter_config[name]
+        except KeyError:
+            return
+
+        for path in self.get_image_paths(config):
+            if path in self.util.image_cache:
+                continue
+            try:
+                units = os.path.getsize(path)
+            except OSError:
+                continue
+            if self.used >= self.size:
+                logging.debug("the assets of the meter " + name + " don't fit into the prefetch budget")
+                return
+            yield (STEP_IMAGE, units)
+            image = self.util.load_pygame_image(path)
+            if image:
+                self.used += self.get_surface_size(image[1])
+
+        if "metatext.fontname" in config:
+            for path, size in TextComponent.get_font_specs(config).values():
+                if (path, size) in self.util.font_cache:
+                    continue
+                yield (STEP_FONT, 1)
+                try:
+                    self.util.load_font(path, size)
+                except OSError as e:
+                    logging.debug(e)
+
+        if config.get("spectrum.type"):
+            yield (STEP_SPECTRUM, 1)
+            Spectrum.get_config_parser(config["spectrum.type"], True)
+
+        if config[METER_TYPE] in NEEDLE_TYPES:
+            yield from self.get_needle_steps(name, config)
+
+    def get_needle_steps(self, name, config):
+        """ Generator of the steps which create needle sprites. The sprites are put into the needle caches
+        only if all of them fit into the memory budget.
+
+        :param name: meter name
+        :param config: meter configuration section
+        :return: generator
+        """
+        v = self.vumeter
+        if name in v.mono_needle_cache or name in v.left_needle_cache:
+            return
+
+        try:
+            image = self.util.image_cache[self.get_image_path(config[INDICATOR_FILENAME])]
+        except KeyError:
+            return
+
+        factory = NeedleFactory(name, image, config, v.mono_needle_cache, v.mono_rect_cache, v.left_needle_cache,
+            v.left_rect_cache, v.right_needle_cache, v.right_rect_cache, lazy=True)
+        sprites = factory.create()
+
+        while True:
+            yield (STEP_NEEDLE, 1)
+            size = next(sprites, None)
+            if size == None:
+                break
+            self.used += size
+            if self.used > self.size:
+                logging.debug("the needle sprites of the meter " + name + " don't fit into the prefetch budget")
+                return
+
+        self.needles.add(name)
+
+    def get_image_paths(self, config):
+        """ Get paths of the images defined in the meter section
+
+        :param config: meter configuration section
+        :return: list of paths
+        """
+        paths = []
+        for value in config.values():
+            if isinstance(value, str) and value.lower().endswith(IMAGE_EXTENSIONS):
+                path = self.get_image_path(value)
+                if path not in paths:
+                    paths.append(path)
+        return paths
+
+    def get_image_path(self, filename):
+        """ Get image path in the same way as the meter does
+
+        :param filename: image filename from the meter section
+        :return: image path
+        """
+        base_path = self.util.meter_config[BASE_PATH]
+        folder = self.util.meter_config[SCREEN_INFO][METER_FOLDER]
+        return os.path.join(base_path, folder, filename)
+
+    def get_surface_size(self, surface):
+        """ Calculate memory used by the surface
+
+        :param surface: surface
+        :return: size in bytes
+        """
+        w, h = surface.get_size()
+        return w * h * surface.get_bytesize()
+
+    def evict(self, names):
+        """ Remove the prefetched needle sprites of all meters except the provided ones
+
+        :param names: meter names which sprites should be kept
+        """
+        v = self.vumeter
+        caches = (v.mono_needle_cache, v.mono_rect_cache, v.left_needle_cache, v.left_rect_cache,
+            v.right_needle_cache, v.right_rect_cache)
+        for name in list(self.needles):
+            if name in names:
+                continue
+            for cache in caches:
+                cache.pop(name, None)
+            self.needles.discard(name)
@@ -0,0 +1,174 @@
+# Copyright 2016-2024 PeppyMeter peppy.player@gmail.com
+#
+# This file is part of PeppyMeter.
+#
+# PeppyMeter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PeppyMeter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PeppyMeter. If not, see <http://www.gnu.org/licenses/>.
+
+import copy
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+from damageaccumulator import DamageAccumulator
+from configfileparser import METER
+
+DEFAULT_FADE_TIME = 0.5
+
+class MeterSwitcher(object):
+    """ Switches meters without blocking the frame loop.
+
+    The next meter is created and started by the worker thread. It draws on the copy of the screen
+    while the current meter keeps running. When the new meter is ready the frame loop stops the current
+    meter, moves the new meter to the screen and crossfades from the last frame of the current meter
+    to the first frame of the new one. The loop doesn't run the meter during the crossfade frames.
+    The new meter reports the damaged areas of the screen copy into its own accumulator, so they
+    don't cause display updates. The worker thread doesn't touch the caches used by the frame loop.
+    It gets copies of the image and needle caches and its own font cache, the new entries are merged
+    into the shared caches by the frame loop.
+    """
+
+    def __init__(self, util, vumeter, fade_time=DEFAULT_FADE_TIME, callback=None):
+        """ Initializer
+
+        :param util: utility object
+        :param vumeter: VU Meter which creates and runs the meters
+        :param fade_time: crossfade time in seconds
+        :param callback: function called with the meter name when the new meter is on the screen
+        """
+        self.util = util
+        self.vumeter = vumeter
+        self.callback = callback
+        self.fade_time = fade_time
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.name = None
+        self.build_util = None
+        self.build_caches = None
+        self.future = None
+        self.old_surface = None
+        self.new_surface = None
+        self.fade_start = None
+
+    def is_switching(self):
+        """ Check if the switch is in progress
+
+        :return: True - the meter is being created or faded in
+        """
+        return self.future != None or self.fade_start != None
+
+    def switch(self, name):
+        """ Start creating the meter in the worker thread
+
+        :param name: meter name
+        """
+        if self.is_switching():
+            return
+
+        screen = self.util.PYGAME_SCREEN
+        util = copy.copy(self.util)
+        util.meter_config = dict(self.util.meter_config)
+        util.meter_config[METER] = name
+        util.PYGAME_SCREEN = screen.copy()
+        util.damage = DamageAccumulator()
+        util.image_cache = dict(self.util.image_cache)
+        # fonts are not shared between the threads
+        util.font_cache = {}
+
+        self.name = name
+        self.build_util = util
+        self.build_caches = [dict(c) for c in self.vumeter.get_needle_caches()]
+        self.future = self.executor.submit(self.vumeter.create_meter, util, self.build_caches)
+
+    def update(self, now):
+        """ Make the next step of the switch. Called by the frame loop before running the meter.
+
+        :param now: current time in seconds
+        :return: True - crossfade frame, the meter should not run, False - run the meter
+        """
+        if self.fade_start != None:
+            return self.fade(now)
+
+        if self.future == None or not self.future.done():
+            return False
+
+        future = self.future
+        self.future = None
+        try:
+            meter = future.result()
+        except Exception as e:
+            logging.error("failed to create meter " + str(self.name) + ": " + str(e))
+            self.build_util = None
+            self.build_caches = None
+            return False
+
+        self.merge_caches()
+
+        screen = self.util.PYGAME_SCREEN
+        self.old_surface = screen.copy()
+        self.new_surface = self.build_util.PYGAME_SCREEN
+        # components created later by the meter should draw on the screen and report damage to the frame loop
+        self.build_util.PYGAME_SCREEN = screen
+        self.build_util.damage = self.util.damage
+        meter.set_screen(screen)
+        self.build_util = None
+
+        self.util.meter_config[METER] = self.name
+        self.vumeter.set_meter(meter)
+        if self.callback:
+            self.callback(self.name)
+        self.fade_start = now
+        return self.fade(now)
+
+    def merge_caches(self):
+        """ Add the images, fonts and needle sprites loaded by the worker thread to the shared caches """
+
+        for key, image in self.build_util.image_cache.items():
+            self.util.image_cache.setdefault(key, image)
+        for key, font in self.build_util.font_cache.items():
+            self.util.font_cache.setdefault(key, font)
+        for cache, build_cache in zip(self.vumeter.get_needle_caches(), self.build_caches):
+            for key, value in build_cache.items():
+                cache.setdefault(key, value)
+        # the new meter keeps using the caches of the build utility object
+        self.build_util.image_cache = self.util.image_cache
+        self.build_util.font_cache = self.util.font_cache
+        self.build_caches = None
+
+    def fade(self, now):
+        """ Draw the crossfade frame
+
+        :param now: current time in seconds
+        :return: True - crossfade is in progress
+        """
+        screen = self.util.PYGAME_SCREEN
+        if self.fade_time > 0:
+            alpha = int(255 * (now - self.fade_start) / self.fade_time)
+        else:
+            alpha = 255
+
+        if alpha >= 255:
+            screen.blit(self.new_surface, (0, 0))
+            self.old_surface = None
+            self.new_surface = None
+            self.fade_start = None
+        else:
+            self.new_surface.set_alpha(alpha)
+            screen.blit(self.old_surface, (0, 0))
+            screen.blit(self.new_surface, (0, 0))
+
+        self.util.damage.add_screen()
+        return True
+
+    def stop(self):
+        """ Stop the worker thread """
+
+        self.executor.shutdown(wait=False)
@@ -17,6 +17,8 @@
 
 import pygame
 
+from damageaccumulator import DamageAccumulator
+
 class MeterUtil(object):
     """ Utility class """
     
@@ -24,6 +26,8 @@ class MeterUtil(object):
         """ Initializer """
 
         self.image_cache = {}
+        self.font_cache = {}
+        self.damage = DamageAccumulator()
     
     def load_pygame_image(self, path):
         """ Check if image is in the cache.
@@ -52,4 +56,26 @@ class MeterUtil(object):
             return (path, image)
         else:
             return None
-        
+
+    def load_font(self, path, size):
+        """ Check if font is in the cache.
+
+        If yes, return the font from the cache.
+        If not load font file and place it in the cache.
+
+        :param path: font path
+        :param size: font size
+
+        :return: pygame font
+        """
+        key = (path, size)
+        try:
+            return self.font_cache[key]
+        except KeyError:
+            pass
+
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = pygame.font.Font(path, size)
+        self.font_cache[key] = font
+        return font
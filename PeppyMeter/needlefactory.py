@@ -21,7 +21,7 @@ from configfileparser import *
 class NeedleFactory(object):
     """ Factory to prepare needle sprites for circular animator """
     
-    def __init__(self, name, image, config, mono_needle_cache, mono_rect_cache, left_needle_cache, left_rect_cache, right_needle_cache, right_rect_cache):
+    def __init__(self, name, image, config, mono_needle_cache, mono_rect_cache, left_needle_cache, left_rect_cache, right_needle_cache, right_rect_cache, lazy=False):
         """ Initializer
         
         :param name: meter name
@@ -33,44 +33,64 @@ class NeedleFactory(object):
         :param left_rect_cache: dictionary where key - meter name, value - list of left channel needle sprite rectangles
         :param right_needle_cache: dictionary where key - meter name, value - list of right channel needle sprites
         :param right_rect_cache: dictionary where key - meter name, value - list of right channel needle sprite rectangles
+        :param lazy: True - don't create sprites, the caller runs the generator returned by create
         """
+        self.name = name
         self.image = image
         self.config = config
-        
+        self.mono_needle_cache = mono_needle_cache
+        self.mono_rect_cache = mono_rect_cache
+        self.left_needle_cache = left_needle_cache
+        self.left_rect_cache = left_rect_cache
+        self.right_needle_cache = right_needle_cache
+        self.right_rect_cache = right_rect_cache
+
+        if not lazy:
+            for _ in self.create():
+                pass
+
+    def create(self):
+        """ Create sprites step by step. The sprites are put into the caches when all of them are ready.
+
+        :return: generator which yields the size of every sprite in bytes
+        """
+        name = self.name
+        config = self.config
+
         if config[CHANNELS] == 1:
-            self.mono_needle_sprites = self.get_cached_object(name, mono_needle_cache)
-            self.mono_needle_rects = self.get_cached_object(name, mono_rect_cache)
+            self.mono_needle_sprites = self.get_cached_object(name, self.mono_needle_cache)
+            self.mono_needle_rects = self.get_cached_object(name, self.mono_rect_cache)
 
             if len(self.mono_needle_sprites) != 0:
                 return
 
-            self.create_needle_sprites(self.mono_needle_sprites, self.mono_needle_rects, self.config[DISTANCE],
-                self.config[START_ANGLE], self.config[STOP_ANGLE], False)
-            mono_needle_cache[name] = self.mono_needle_sprites
-            mono_rect_cache[name] = self.mono_needle_rects
+            yield from self.create_needle_sprites(self.mono_needle_sprites, self.mono_needle_rects, config[DISTANCE],
+                config[START_ANGLE], config[STOP_ANGLE], False)
+            self.mono_needle_cache[name] = self.mono_needle_sprites
+            self.mono_rect_cache[name] = self.mono_needle_rects
         elif config[CHANNELS] == 2:
-            self.left_needle_sprites = self.get_cached_object(name, left_needle_cache)
-            self.right_needle_sprites = self.get_cached_object(name, right_needle_cache)
-            self.left_needle_rects = self.get_cached_object(name, left_rect_cache)
-            self.right_needle_rects = self.get_cached_object(name, right_rect_cache)
+            self.left_needle_sprites = self.get_cached_object(name, self.left_needle_cache)
+            self.right_needle_sprites = self.get_cached_object(name, self.right_needle_cache)
+            self.left_needle_rects = self.get_cached_object(name, self.left_rect_cache)
+            self.right_needle_rects = self.get_cached_object(name, self.right_rect_cache)
 
             if len(self.left_needle_sprites) != 0:
                 return
 
-            self.create_needle_sprites(self.left_needle_sprites, self.left_needle_rects, self.config[DISTANCE],
-                self.config[LEFT_START_ANGLE], self.config[LEFT_STOP_ANGLE], self.config[LEFT_NEEDLE_FLIP])
+            yield from self.create_needle_sprites(self.left_needle_sprites, self.left_needle_rects, config[DISTANCE],
+                config[LEFT_START_ANGLE], config[LEFT_STOP_ANGLE], config[LEFT_NEEDLE_FLIP])
 
             if config[LEFT_START_ANGLE] == config[RIGHT_START_ANGLE] and config[LEFT_STOP_ANGLE] == config[RIGHT_STOP_ANGLE]:
                 self.right_needle_sprites = self.left_needle_sprites
                 self.right_needle_rects = self.left_needle_rects
             else:
-                self.create_needle_sprites(self.right_needle_sprites, self.right_needle_rects, self.config[DISTANCE],
-                    self.config[RIGHT_START_ANGLE], self.config[RIGHT_STOP_ANGLE], self.config[RIGHT_NEEDLE_FLIP])
+                yield from self.create_needle_sprites(self.right_needle_sprites, self.right_needle_rects, config[DISTANCE],
+                    config[RIGHT_START_ANGLE], config[RIGHT_STOP_ANGLE], config[RIGHT_NEEDLE_FLIP])
 
-            left_needle_cache[name] = self.left_needle_sprites
-            right_needle_cache[name] = self.right_needle_sprites
-            left_rect_cache[name] = self.left_needle_rects
-            right_rect_cache[name] = self.right_needle_rects
+            self.left_needle_cache[name] = self.left_needle_sprites
+            self.right_needle_cache[name] = self.right_needle_sprites
+            self.left_rect_cache[name] = self.left_needle_rects
+            self.right_rect_cache[name] = self.right_needle_rects
 
     def get_cached_object(self, name, cache):
         """ Get cached object
@@ -119,6 +139,7 @@ class NeedleFactory(object):
         :param start_angle: start angle
         :param stop_angle: stop angle
         :param flip: True - flip indicator image across X axis
+        :return: generator which yields the size of every sprite in bytes
         """
         images = []
         rects = []
@@ -135,7 +156,7 @@ class NeedleFactory(object):
             i, r = self.rotate_image(image, distance, a)
             images.append(i)
             rects.append(r)
+            yield i.get_width() * i.get_height() * i.get_bytesize()
 
-        sprites = (images, rects)
-        needle_sprites.extend(sprites[0])
-        needle_rects.extend(sprites[1])
+        needle_sprites.extend(images)
+        needle_rects.extend(rects)
@@ -0,0 +1,274 @@
+# Copyright 2016-2024 PeppyMeter peppy.player@gmail.com
+#
+# This file is part of PeppyMeter.
+#
+# PeppyMeter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PeppyMeter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PeppyMeter. If not, see <http://www.gnu.org/licenses/>.
+
+import time
+import logging
+import multiprocessing
+
+from threading import Thread
+from configfileparser import OUTPUT_SERIAL, OUTPUT_I2C, OUTPUT_PWM, OUTPUT_HTTP, SERIAL_INTERFACE, \
+    I2C_INTERFACE, PWM_INTERFACE, HTTP_INTERFACE
+from levelpublisher import LevelPublisher
+
+HEARTBEAT_PERIOD = 1.0
+HEARTBEAT_TIMEOUT = 5.0
+STOP_TIMEOUT = 2.0
+# the restart delay is doubled after every consecutive failure up to the maximum
+RESTART_DELAY = 1.0
+MAX_RESTART_DELAY = 60.0
+# the worker is disabled after this number of consecutive failures
+MAX_FAILURES = 5
+
+MESSAGE_FRAME = "frame"
+MESSAGE_HEARTBEAT = "heartbeat"
+MESSAGE_STOP = "stop"
+
+OUTPUT_KEYS = [OUTPUT_SERIAL, OUTPUT_I2C, OUTPUT_PWM, OUTPUT_HTTP, SERIAL_INTERFACE, I2C_INTERFACE,
+    PWM_INTERFACE, HTTP_INTERFACE]
+
+class WorkerDataSource(object):
+    """ Data source of the worker process. Contains frames received from the main process. """
+
+    def __init__(self):
+        """ Initializer """
+
+        self.data = ()
+        self.publisher = LevelPublisher()
+
+    def get_current_data(self):
+        """ Return current data """
+
+        return self.data
+
+    def set_data(self, left, right, mono):
+        """ Set and publish new data
+
+        :param left: left channel value
+        :param right: right channel value
+        :param mono: mono value
+        """
+        self.data = (left, right, mono)
+        self.publisher.publish(left, right, mono)
+
+def get_outputs(config, data_source):
+    """ Create enabled outputs
+
+    :param config: output configuration
+    :param data_source: data source
+    :return: dictionary of outputs
+    """
+    outputs = {}
+
+    if config[OUTPUT_SERIAL]:
+        from serialinterface import SerialInterface
+        outputs[OUTPUT_SERIAL] = SerialInterface(config, data_source)
+
+    if config[OUTPUT_I2C]:
+        from i2cinterface import I2CInterface
+        outputs[OUTPUT_I2C] = I2CInterface(config, data_source)
+
+    if config[OUTPUT_PWM]:
+        from pwminterface import PWMInterface
+        outputs[OUTPUT_PWM] = PWMInterface(config, data_source)
+
+    if config[OUTPUT_HTTP]:
+        from httpinterface import HTTPInterface
+        outputs[OUTPUT_HTTP] = HTTPInterface(config, data_source)
+
+    return outputs
+
+def run_worker(config, connection):
+    """ Worker process method. Runs outputs and sends heartbeats to the main process.
+
+    :param config: output configuration
+    :param connection: connection to the main process
+    """
+    data_source = WorkerDataSource()
+    outputs = get_outputs(config, data_source)
+    for v in outputs.values():
+        v.start_writing()
+
+    frames = 0
+    heartbeat_time = time.monotonic()
+
+    try:
+        while True:
+            if connection.poll(HEARTBEAT_PERIOD):
+                message = connection.recv()
+                if message[0] == MESSAGE_STOP:
+                    break
+                data_source.set_data(message[1], message[2], message[3])
+                frames += 1
+
+            now = time.monotonic()
+            if now - heartbeat_time >= HEARTBEAT_PERIOD:
+                connection.send((MESSAGE_HEARTBEAT, frames))
+                frames = 0
+                heartbeat_time = now
+    except (EOFError, OSError):
+        pass
+
+    for v in outputs.values():
+        v.stop_writing()
+
+class OutputWorker(object):
+    """ Runs serial, I2C, PWM and HTTP outputs in a separate process so they don't
+    compete with the display for the interpreter lock. Level frames are forwarded
+    through the pipe. The worker is restarted when it exits or stops sending heartbeats.
+    The restarts are delayed by the exponential backoff. The worker which fails MAX_FAILURES
+    times in a row without sending a heartbeat is disabled. Provides the same start_writing/stop_writing methods as the outputs.
+    """
+
+    def __init__(self, config, data_source):
+        """ Initializer
+
+        :param config: configuration settings
+        :param data_source: data source
+        """
+        self.config = {k: config[k] for k in OUTPUT_KEYS}
+        self.data_source = data_source
+        self.context = multiprocessing.get_context("spawn")
+        self.process = None
+        self.connection = None
+        self.running = False
+        self.restarts = 0
+        self.failures = 0
+        self.restart_time = 0
+        self.frames = 0
+        self.heartbeat_time = 0
+
+    def start_writing(self):
+        """ Start worker process and forwarding thread """
+
+        if self.running:
+            return
+
+        self.running = True
+        self.failures = 0
+        self.start_process()
+        thread = Thread(target=self.forward_frames, daemon=True)
+        thread.start()
+
+    def start_process(self):
+        """ Start worker process """
+
+        self.connection, child_connection = self.context.Pipe()
+        self.process = self.context.Process(target=run_worker, args=(self.config, child_connection), daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.heartbeat_time = time.monotonic()
+        logging.debug("output worker started, pid " + str(self.process.pid))
+
+    def forward_frames(self):
+        """ Forwarding thread method. Sends new frames to the worker and checks its health. """
+
+        sequence = 0
+        while self.running:
+            frame = self.data_source.publisher.wait_for_frame(sequence, HEARTBEAT_PERIOD)
+            if not self.running:
+                break
+
+            if frame != None:
+                sequence = frame.sequence
+                self.send((MESSAGE_FRAME, frame.left, frame.right, frame.mono))
+
+            self.check_health()
+
+    def send(self, message):
+        """ Send message to the worker
+
+        :param message: message tuple
+        """
+        if self.process == None:
+            return
+
+        try:
+            self.connection.send(message)
+        except (EOFError, OSError) as e:
+            logging.debug(e)
+            self.restart("connection error")
+
+    def check_health(self):
+        """ Read heartbeats and restart the worker if it's not alive """
+
+        process = self.process
+        if process == None:
+            if self.running and time.monotonic() >= self.restart_time:
+                self.restarts += 1
+                self.start_process()
+            return
+
+        try:
+            while self.connection.poll():
+                message = self.connection.recv()
+                if message[0] == MESSAGE_HEARTBEAT:
+                    self.heartbeat_time = time.monotonic()
+                    self.frames = message[1]
+                    self.failures = 0
+        except (EOFError, OSError):
+            pass
+
+        if not process.is_alive():
+            self.restart("process exited with code " + str(process.exitcode))
+        elif time.monotonic() - self.heartbeat_time > HEARTBEAT_TIMEOUT:
+            self.restart("no heartbeat")
+
+    def restart(self, reason):
+        """ Stop failed worker process and schedule its restart. The worker is disabled
+        after MAX_FAILURES consecutive failures.
+
+        :param reason: failure reason for the log
+        """
+        if not self.running or self.process == None:
+            return
+
+        self.terminate_process()
+        self.failures += 1
+        if self.failures >= MAX_FAILURES:
+            logging.error("output worker disabled after " + str(self.failures) + " failures: " + reason)
+            self.running = False
+            return
+
+        delay = min(RESTART_DELAY * 2 ** (self.failures - 1), MAX_RESTART_DELAY)
+        self.restart_time = time.monotonic() + delay
+        logging.debug("output worker failed: " + reason + ", restarting in " + str(delay) + " s")
+
+    def terminate_process(self):
+        """ Stop worker process """
+
+        if self.process == None:
+            return
+
+        self.process.join(STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(STOP_TIMEOUT)
+        self.connection.close()
+        self.process = None
+
+    def stop_writing(self):
+        """ Stop worker process. The outputs nullify their values before exit. """
+
+        if not self.running:
+            return
+
+        self.running = False
+        try:
+            self.connection.send((MESSAGE_STOP,))
+        except (EOFError, OSError):
+            pass
+        self.terminate_process()
@@ -29,6 +29,11 @@ from serialinterface import SerialInterface
 from i2cinterface import I2CInterface
 from pwminterface import PWMInterface
 from httpinterface import HTTPInterface
+from reactor import InputReactor
+from outputworker import OutputWorker
+from frameprofiler import FrameProfiler, STAGE_EVENTS, STAGE_REFRESH, STAGE_RUN, STAGE_UPDATE, STAGE_PREFETCH
+from meterswitcher import MeterSwitcher
+from meterprefetcher import MeterPrefetcher
 from screensavermeter import ScreensaverMeter
 from configfileparser import *
 import time
@@ -113,25 +118,44 @@ class Peppymeter(ScreensaverMeter):
         if "win" in sys.platform and self.util.meter_config[DATA_SOURCE][TYPE] == SOURCE_PIPE:
             self.util.meter_config[DATA_SOURCE][TYPE] = SOURCE_NOISE
         
-        self.data_source = DataSource(self.util.meter_config)
+        self.reactor = None
+        if "win" not in sys.platform:
+            self.reactor = InputReactor()
+            self.reactor.start()
+        self.data_source = DataSource(self.util.meter_config, self.reactor)
+        self.profiler = None
+        if self.util.meter_config[FRAME_PROFILER]:
+            self.profiler = FrameProfiler(self.util.meter_config[FRAME_RATE], self.util.meter_config[FRAME_PROFILER_PERIOD],
+                self.util.meter_config[FRAME_PROFILER_PORT])
         if self.util.meter_config[DATA_SOURCE][TYPE] or self.use_vu_meter == True:
             self.data_source.start_data_source()
         
+        self.switch_requested = False
+        self.prefetcher = None
         if self.util.meter_config[OUTPUT_DISPLAY]:
             self.meter = self.output_display(self.data_source)
             self.meter.meterlist = self.meterlist
-
-        if self.util.meter_config[OUTPUT_SERIAL]:
-            self.outputs[OUTPUT_SERIAL] = SerialInterface(self.util.meter_config, self.data_source)
-            
-        if self.util.meter_config[OUTPUT_I2C]:
-            self.outputs[OUTPUT_I2C] = I2CInterface(self.util.meter_config, self.data_source)
-            
-        if self.util.meter_config[OUTPUT_PWM]:
-            self.outputs[OUTPUT_PWM] = PWMInterface(self.util.meter_config, self.data_source)
-
-        if self.util.meter_config[OUTPUT_HTTP]:
-            self.outputs[OUTPUT_HTTP] = HTTPInterface(self.util.meter_config, self.data_source)
+            self.switcher = MeterSwitcher(self.util, self.meter, callback=self.next_meter)
+            if self.util.meter_config[METER_PREFETCH]:
+                self.prefetcher = MeterPrefetcher(self.util, self.meter, self.util.meter_config[FRAME_RATE],
+                    self.util.meter_config[METER_PREFETCH_SIZE] * 1024 * 1024)
+
+        if self.util.meter_config[OUTPUT_WORKER]:
+            if self.util.meter_config[OUTPUT_SERIAL] or self.util.meter_config[OUTPUT_I2C] or \
+                self.util.meter_config[OUTPUT_PWM] or self.util.meter_config[OUTPUT_HTTP]:
+                self.outputs[OUTPUT_WORKER] = OutputWorker(self.util.meter_config, self.data_source)
+        else:
+            if self.util.meter_config[OUTPUT_SERIAL]:
+                self.outputs[OUTPUT_SERIAL] = SerialInterface(self.util.meter_config, self.data_source)
+                
+            if self.util.meter_config[OUTPUT_I2C]:
+                self.outputs[OUTPUT_I2C] = I2CInterface(self.util.meter_config, self.data_source)
+                
+            if self.util.meter_config[OUTPUT_PWM]:
+                self.outputs[OUTPUT_PWM] = PWMInterface(self.util.meter_config, self.data_source)
+
+            if self.util.meter_config[OUTPUT_HTTP]:
+                self.outputs[OUTPUT_HTTP] = HTTPInterface(self.util.meter_config, self.data_source)
 
         self.start_interface_outputs()
 
@@ -235,8 +259,18 @@ class Peppymeter(ScreensaverMeter):
         self.meter.start()
         pygame.display.update(self.util.meter_config[SCREEN_RECT])
         self.running  = True
+        profiler = self.profiler
+        prefetcher = self.prefetcher
+        budget = int(1000000000 / self.util.meter_config[FRAME_RATE])
+        damage = self.util.damage
+        damage.clear()
 
         while self.running:
+            if self.switch_requested and not self.switcher.is_switching():
+                self.switch_requested = False
+                self.switcher.switch(self.get_next_meter())
+            frame_start = time.perf_counter_ns()
+            if profiler: profiler.start_frame(self.util.meter_config[METER])
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.running = False
@@ -259,16 +293,35 @@ class Peppymeter(ScreensaverMeter):
                             self.running = False
                     except Exception as ex:
                         self.switchmeter()
-            if self.meter.playerstatus == PLAYING or self.meter.playerstatus==STOPPING:
-                self.refresh()
-            elif self.meter.playerstatus == STOPPED and self.meter.meter:
-                self.meter.meter.playing = False
-            #elif self.meter.playerstatus == STARTPLAYING:
-                #self.restart()
-            areas = self.meter.run()
-            pygame.display.update(areas)
+            if profiler: profiler.mark(STAGE_EVENTS)
+            if self.switcher.update(time.monotonic()):
+                # crossfade frame, the new meter starts running after it
+                if profiler: profiler.mark(STAGE_RUN)
+            else:
+                if self.meter.playerstatus == PLAYING or self.meter.playerstatus==STOPPING:
+                    self.refresh()
+                elif self.meter.playerstatus == STOPPED and self.meter.meter:
+                    self.meter.meter.playing = False
+                #elif self.meter.playerstatus == STARTPLAYING:
+                    #self.restart()
+                if profiler: profiler.mark(STAGE_REFRESH)
+                areas = self.meter.run()
+                if profiler: profiler.mark(STAGE_RUN)
+                damage.add(areas)
+            damage.flush()
+            if profiler: profiler.mark(STAGE_UPDATE)
+            if prefetcher and not self.switcher.is_switching():
+                # the assets of the next meter are loaded in the rest of the frame budget
+                prefetcher.set_meter(self.get_next_meter())
+                if profiler:
+                    prefetcher.run(profiler.get_headroom())
+                    profiler.mark(STAGE_PREFETCH)
+                else:
+                    prefetcher.run(budget - (time.perf_counter_ns() - frame_start))
+            if profiler: profiler.end_frame()
 
             clock.tick(self.util.meter_config[FRAME_RATE])
+        self.switcher.stop()
         if self.util.meter_config[STOP_DISPLAY_ON_TOUCH]:
             self.meter.stop()
             pygame.quit()
@@ -280,40 +333,27 @@ class Peppymeter(ScreensaverMeter):
             self.exit()
 
     def switchmeter(self,a=None,b=None):
+        """ Request switching to the next meter. Can be called from the signal handler,
+        the switch itself is made by the frame loop.
+        """
+        self.switch_requested = True
+
+    def get_next_meter(self):
+        """ Get the name of the meter which follows the current one in the list
+
+        :return: the name of the next meter
+        """
+        return self.meterlist[(self.persiststate["meter.index"] + 1) % len(self.meterlist)]
+
+    def next_meter(self, name):
+        """ Advance to the next meter in the list and save the state.
+        Called by the meter switcher when the next meter was created and shown.
+
+        :param name: the name of the next meter
+        """
         self.persiststate["meter.index"] = (self.persiststate["meter.index"] + 1) % len(self.meterlist)
         self.savepersiststate()
-        self.util.meter_config[METER] = self.meterlist[self.persiststate["meter.index"]]  # self.meterlist[3]#
-        self.meter.stop()
-        time.sleep(0.2)
-        current = self.meter.util.PYGAME_SCREEN
-        self.meter.util.PYGAME_SCREEN = self.meter.util.PYGAME_SCREEN.copy()
-        self.meter.meter = None
-        self.meter.start()
-        time.sleep(0.2)
-        next = self.meter.util.PYGAME_SCREEN.copy()
-        self.meter.util.PYGAME_SCREEN = current
-        self.fadein(current, next)
-        #switch again to get all the component in the surface copy
-        self.meter.meter = None
-        self.meter.start()
-        time.sleep(0.2)
-        pygame.display.flip()
-
-    def fadein(self,surface1, surface2, steps=20):
-        screen = self.meter.util.PYGAME_SCREEN
-        for alpha in range(0, 255, steps):
-            # Set the alpha of the second surface
-            surface2.set_alpha(alpha)
-            # Draw the first surface
-            screen.blit(surface1, (0, 0))
-            # Draw the second surface on top with increasing alpha
-            screen.blit(surface2, (0, 0))
-            # Update the display
-            pygame.display.flip()
-            pygame.time.delay(60)
-        screen.blit(surface2, (0, 0))
-        pygame.display.flip()
-    # Function to create a fade in effect
+
     def savepersiststate(self):
         with open("state.p", "wb") as f:
             pickle.dump(self.persiststate, f)
@@ -350,6 +390,8 @@ class Peppymeter(ScreensaverMeter):
         
         for v in self.outputs.values():
             v.stop_writing()
+        if self.reactor:
+            self.reactor.stop()
         pygame.quit()
 
         if hasattr(self, "malloc_trim"):
@@ -29,15 +29,25 @@ from itertools import cycle
 from screensaverspectrum import ScreensaverSpectrum
 from spectrumutil import SpectrumUtil
 from spectrumconfigparser import *
+from spectrumcache import spectrum_cache
+from spectrumscheduler import SpectrumScheduler
+from spectrumrebinner import SpectrumRebinner
+from spectrumtestpattern import SpectrumTestPattern
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 class Spectrum(SpectrumContainer, ScreensaverSpectrum):
     """ Spectrum Analyzer screensaver plug-in. """
         
-    def __init__(self, util=None, standalone=False,meterutil=None,meterconfig=None):
+    def __init__(self, util=None, standalone=False,meterutil=None,meterconfig=None,data_source=None):
         """ Initializer
         
         :param util: the utility functions
         :param standalone: True - run as a standalone program, False - run as a plugin
+        :param data_source: meter data source used for recording and replay of the spectrum frames
         """
         self.name = "spectrum"
         self.standalone = standalone
@@ -46,6 +56,7 @@ class Spectrum(SpectrumContainer, ScreensaverSpectrum):
         ScreensaverSpectrum.__init__(self, self.name, util, plugin_folder)
         self.meterutil = meterutil
         self.meterconfig=meterconfig
+        self.data_source = data_source
         if util:
             self.util = util
             self.image_util = util.image_util
@@ -55,13 +66,21 @@ class Spectrum(SpectrumContainer, ScreensaverSpectrum):
         
         self.run_flag = False
         self.run_datasource = False
-        self.config_parser = SpectrumConfigParser(self.standalone,self.meterconfig['spectrum.type'])
+        self.section = self.meterconfig['spectrum.type']
+        if self.meterutil:
+            self.set_cache_size(self.meterutil.meter_config)
+        self.config_parser = self.get_config_parser(self.section, self.standalone)
         self.config = self.config_parser.config
+        if not util:
+            self.util.scaling = self.config[IMAGE_SCALING]
 
         #self.config/////
 
         self.update_period = self.config[UPDATE_PERIOD]
         self.addfactor = self.config[ADD_FACTOR]
+        self.scheduler = SpectrumScheduler(self.config[SIZE], self.config[READ_INTERVAL], self.config[BAR_ATTACK], self.config[BAR_DECAY])
+        self.bins = self.config[PIPE_BINS]
+        self.rebinner = self.get_rebinner(self.bins)
 
         if self.standalone:
             screen_rect = pygame.Rect(self.config[SPECTRUM_POS_X], self.config[SPECTRUM_POS_Y], self.config[SPECTRUM_WIDTH], self.config[SPECTRUM_HEIGHT])
@@ -69,24 +88,69 @@ class Spectrum(SpectrumContainer, ScreensaverSpectrum):
             SpectrumContainer.__init__(self, self.util, bounding_box=screen_rect)
         else:
             SpectrumContainer.__init__(self, util, bounding_box=util.screen_rect, background=self.bg[1], content=self.bg[2], image_filename=self.bg[3])
+        # the damaged areas are collected by the meter and updated once per frame
+        self.damage = getattr(meterutil, "damage", None)
 
         self.pipe = None
+        self.frame_reader = None
         self.spectrum_configs = self.config_parser.spectrum_configs
         self.indexes = cycle(range(len(self.spectrum_configs)))
         self.seconds = 0
         self.test_iterator = 0
+        self.background_cache = None
+        self.background_area = None
+        self.column_states = None
+        self.reset_toppings()
         self.init_spectrums()
         self.init_container()
 
+        self.test_pattern = self.get_test_pattern()
+
         if "win" in sys.platform:
             self.windows = True
             self.config[UPDATE_UI_INTERVAL] = 0.1
         else:
             self.windows = False
-            self.open_pipe()
+            if self.test_pattern:
+                logging.debug("spectrum frames are provided by the test pattern " + self.config[USE_TEST_DATA])
+            elif self.data_source and self.data_source.provides_spectrum():
+                logging.debug("spectrum frames are provided by the data source")
+            elif self.data_source and self.data_source.reactor:
+                self.open_frame_reader()
+            else:
+                self.open_pipe()
             #thread = Thread(target=self.open_pipe)
             #thread.start()
 
+    def get_rebinner(self, bins):
+        """ Create rebinner if the frame bins don't match the bars one to one
+
+        :param bins: the number of bins in the spectrum frame
+        :return: rebinner or None
+        """
+        bars = self.config[SIZE]
+        layout = self.config[BIN_LAYOUT]
+
+        if bins == bars and layout == "linear":
+            return None
+
+        return SpectrumRebinner(bins, bars, layout, self.config[BIN_MAX_FREQUENCY])
+
+    def get_test_pattern(self):
+        """ Create test pattern if it's defined in the configuration
+
+        :return: test pattern or None
+        """
+        name = self.config[USE_TEST_DATA]
+        if not name:
+            return None
+
+        try:
+            return SpectrumTestPattern(name.strip(), self.config[PIPE_BINS], self.config[MAX_VALUE])
+        except ValueError as e:
+            logging.debug(e)
+            return None
+
     def init_display(self):
         """ Initialize Pygame display """
         self.util.pygame_screen = self.meterutil.PYGAME_SCREEN
@@ -142,14 +206,44 @@ class Spectrum(SpectrumContainer, ScreensaverSpectrum):
         c = SpectrumComponent(self.util) # fgr
         self.add_component(c)
     
+    def set_cache_size(self, meter_config):
+        """ Set the memory budget of the spectrum asset cache
+
+        :param meter_config: meter configuration
+        """
+        if meter_config.get(USE_CACHE, True):
+            spectrum_cache.set_size(meter_config.get(SPECTRUM_CACHE_SIZE, 16) * 1024 * 1024)
+        else:
+            spectrum_cache.set_size(0)
+
+    @staticmethod
+    def get_config_parser(section, standalone):
+        """ Get parsed configuration of the spectrum section from the spectrum cache
+
+        :param section: spectrum section name
+        :param standalone: True - standalone spectrum, False - plugin
+        :return: configuration parser
+        """
+        return spectrum_cache.get_config_parser(section, lambda: SpectrumConfigParser(standalone, section))
+
     def init_spectrums(self):
-        """ Initialize lists of images """
-        
+        """ Initialize lists of images. The images are taken from the spectrum cache if they were prepared before. """
+
+        key = (self.section, tuple(self.bounding_box))
+        assets = spectrum_cache.get_assets(key)
+        if assets:
+            self.bgr, self.bar, self.reflection, self.toppings, self.fgr, self.atlas = assets
+            return
+
         self.bgr = self.get_backgrounds()
         self.bar = self.get_bars()
         self.reflection = self.get_reflections()
         self.toppings = self.get_toppings()
         self.fgr = self.get_foregrounds()
+        self.atlas = self.get_atlas()
+
+        assets = (self.bgr, self.bar, self.reflection, self.toppings, self.fgr, self.atlas)
+        spectrum_cache.put_assets(key, assets, self.bgr + self.bar + self.reflection + self.fgr)
 
     def get_color_surface(self, bounding_box, color):
         """ Create surface filled by solid color
@@ -178,7 +272,8 @@ class Spectrum(SpectrumContainer, ScreensaverSpectrum):
         if not bounding_box or not gradient:
             return None
         size = len(gradient)
-        gradient.reverse()
+        # the gradient list belongs to the cached configuration, it shouldn't be reversed in place
+        gradient = list(reversed(gradient))
         base_rect = pygame.Surface((2, size), pygame.SRCALPHA, 32)
 
         for index in range(size):
@@ -334,6 +429,82 @@ class Spectrum(SpectrumContainer, ScreensaverSpectrum):
         return foregrounds
 
 
+    def get_atlas(self):
+        """ Prepare the images of bars, reflections and toppings for all quantised steps.
+        The key is the tuple (surface, area) where the area is the component bounding box.
+
+        :return: the dictionary of atlas images
+        """
+        self.atlas = {}
+
+        for i, config in enumerate(self.spectrum_configs):
+            width = config[BAR_WIDTH]
+            height = config[BAR_HEIGHT]
+            step = int(height / config[STEPS])
+
+            for n in range(config[STEPS] + 1):
+                h = n * step * self.addfactor
+                area = pygame.Rect(0, 0, width, height)
+                area.h = h
+                area.y = height - h
+                self.get_atlas_image(self.bar[i], area)
+
+                if self.reflection[i] != None:
+                    area = pygame.Rect(0, 0, width, 0)
+                    area.h = h
+                    self.get_atlas_image(self.reflection[i], area)
+
+            topping_height = config.get(TOPPING_HEIGHT, None)
+            if self.toppings[i] == None or not topping_height:
+                continue
+
+            for y in range(height - topping_height + 2):
+                self.get_atlas_image(self.toppings[i], pygame.Rect(0, y, width, topping_height))
+
+        return self.atlas
+
+    def get_atlas_image(self, surface, area):
+        """ Get atlas image. The image is created and added to the atlas if it's not there yet.
+
+        :param surface: the bar, reflection or topping surface
+        :param area: the part of the surface
+        :return: tuple (image, offset) or None if the area is outside of the surface
+        """
+        key = (surface, tuple(area))
+        try:
+            return self.atlas[key]
+        except KeyError:
+            pass
+
+        a = area.clip(surface.get_rect())
+        if a.w == 0 or a.h == 0:
+            image = None
+        else:
+            image = (surface.subsurface(a), (a.x - area.x, a.y - area.y))
+
+        self.atlas[key] = image
+        return image
+
+    def get_column_blits(self, indexes):
+        """ Get blit sequence for the bar columns using atlas images
+
+        :param indexes: bar indexes starting from 0
+        :return: list of tuples (image, position)
+        """
+        blits = []
+
+        for i in indexes:
+            for comp in self.get_column_components(i):
+                if not comp.visible or not comp.content or comp.content[1] == None:
+                    continue
+                image = self.get_atlas_image(comp.content[1], comp.bounding_box)
+                if image == None:
+                    continue
+                offset = image[1]
+                blits.append((image[0], (comp.content_x + offset[0], comp.content_y + offset[1])))
+
+        return blits
+
     def open_pipe(self):
         """ Open named pipe  """
         
@@ -343,9 +514,21 @@ class Spectrum(SpectrumContainer, ScreensaverSpectrum):
             logging.debug("Cannot open named pipe: " + self.config[PIPE_NAME])
             logging.debug(e)
 
+    def open_frame_reader(self):
+        """ Get reader of the spectrum pipe from the input reactor. The pipe is opened only once. """
+
+        reactor = self.data_source.reactor
+        self.frame_reader = reactor.get_frame_reader(self.config[PIPE_NAME], self.config[PIPE_SIZE], self.config[PIPE_BUFFER_SIZE])
+        if self.data_source.recorder:
+            self.frame_reader.listener = self.data_source.record_spectrum_frame
+
     def flush_pipe_buffer(self):
         """ Flush data from the pipe """
 
+        if self.frame_reader:
+            self.data_source.reactor.call_soon(self.frame_reader.flush)
+            return
+
         if not self.pipe:
             return
 
@@ -358,6 +541,10 @@ class Spectrum(SpectrumContainer, ScreensaverSpectrum):
         """ Start spectrum thread. """ 
         
         self.index = 0
+        self.background_cache = None
+        self.scheduler.reset()
+        if self.test_pattern:
+            self.test_pattern.reset()
         self.set_background()
         self.set_bars()
         self.reflection_gap = self.spectrum_configs[self.index].get(REFLECTION_GAP, 0)
@@ -456,7 +643,8 @@ class Spectrum(SpectrumContainer, ScreensaverSpectrum):
             c.content = ("", self.toppings[self.index])
             c.bounding_box = pygame.Rect(0, 0, width, height)
             c.visible = False
-            c.initialized = False
+
+        self.reset_toppings()
 
     def set_foreground(self):
         """ Set foreground image """
@@ -482,6 +670,7 @@ class Spectrum(SpectrumContainer, ScreensaverSpectrum):
         
         self.test_iterator = 0
         self.index = next(self.indexes)
+        self.background_cache = None
         self.init_variables()
         self.set_background()
         self.set_bars()
@@ -499,6 +688,11 @@ class Spectrum(SpectrumContainer, ScreensaverSpectrum):
         self.unit = self.height / self.config[MAX_VALUE]
         self.topping_height = self.spectrum_configs[self.index][TOPPING_HEIGHT]
         self.topping_step = self.spectrum_configs[self.index][TOPPING_STEP]
+        self.topping_hold_time = self.spectrum_configs[self.index][TOPPING_HOLD]
+        self.topping_decay = self.spectrum_configs[self.index][TOPPING_DECAY]
+        if self.topping_decay == None and self.topping_step != None:
+            # the topping was moved by one step 10 times per second
+            self.topping_decay = self.topping_step * 10
             
     def stop(self):
         """ Stop spectrum thread. """ 
@@ -529,15 +723,47 @@ class Spectrum(SpectrumContainer, ScreensaverSpectrum):
             self.set_values(self.addfactor)
            # time.sleep(self.config[UPDATE_UI_INTERVAL])
     
+    def update_values(self, now):
+        """ Read new values when the scheduler decides so and move the bars and toppings towards them
+
+        :param now: current time in seconds
+        """
+        if not self.run_datasource:
+            return
+
+        scheduler = self.scheduler
+        if scheduler.is_read_time(now):
+            values = self.read_values()
+            if values is None:
+                scheduler.set_targets(scheduler.targets, now)
+            else:
+                if np != None:
+                    values = values.tolist()
+                scheduler.set_targets(values, now)
+
+        heights = self.get_step_heights(scheduler.interpolate(now), self.addfactor)
+        self.set_bar_heights(heights)
+        self.set_topping_heights(heights, now)
+
     def get_latest_pipe_data(self):
         """ Read from the named pipe until it's empty """
 
         data = [0] * self.config[PIPE_SIZE]
+
+        if self.frame_reader:
+            # the bars fall when the writer stops or disconnects
+            frame = self.frame_reader.get_latest(self.data_source.pipe_max_latency)
+            if frame != None:
+                data = frame
+            return data
+
         while True:
             try:
                 tmp_data = os.read(self.pipe, self.config[PIPE_SIZE])
                 if len(tmp_data) == self.config[PIPE_SIZE]:
                     data = tmp_data
+                    if self.data_source:
+                        self.data_source.record_spectrum_frame(data)
                 time.sleep(self.config[PIPE_POLLING_INTERVAL])
             except:
                 break
@@ -556,7 +782,7 @@ class Spectrum(SpectrumContainer, ScreensaverSpectrum):
         if self.config[USE_TEST_DATA]:
             test_data = TEST_DATA[self.config[USE_TEST_DATA]]
 
-        for n in range(self.config[SIZE]):
+        for n in range(self.config[PIPE_BINS]):
             if test_data == None:
                 v = int((randrange(0, int(self.config[MAX_VALUE]))))
             else:
@@ -581,43 +807,271 @@ class Spectrum(SpectrumContainer, ScreensaverSpectrum):
     def set_values(self,addfactor=1):
         """ Get signal from the named pipe and update spectrum bars. """ 
 
-        data = []
+        values = self.read_values()
+        if values is None:
+            return
+
+        heights = self.get_step_heights(values, addfactor)
+        self.set_bar_heights(heights)
+        self.set_topping_heights(heights)
 
-        if self.windows:
+    def read_data(self):
+        """ Read the newest spectrum frame from the test pattern, data source or the named pipe
+
+        :return: spectrum frame or None if there is no frame
+        """
+        if self.test_pattern:
+            data = self.test_pattern.get_frame()
+        elif self.data_source and self.data_source.provides_spectrum():
+            data = self.data_source.get_spectrum_frame()
+        elif self.windows:
             data = self.get_test_data()
         else:
             try:
-                if self.pipe == None:
-                    return
+                if self.pipe == None and self.frame_reader == None:
+                    return None
     			
                 data = self.get_latest_pipe_data()
             except Exception as e:
                 logging.debug(e)
-                return
+                return None
 
-        length = len(data)
-        if length == 0:
-            return
-            
-        words = int(length / 4)
+        if len(data) < 4:
+            return None
+
+        return data
+
+    def read_values(self):
+        """ Read spectrum frame and convert it to the bar values in pixels
+
+        :return: list or array of values, None if there is no frame
+        """
+        data = self.read_data()
+        if data == None:
+            return None
+
+        words = int(len(data) / 4)
+        if words != self.bins:
+            # the data source frames are defined by the acquisition daemon and can have any number of bins
+            self.bins = words
+            self.rebinner = self.get_rebinner(words)
+
+        if np != None:
+            return self.get_values_vectorised(data, words)
+        else:
+            return self.get_values_python(data, words)
+
+    def get_step_heights(self, values, addfactor):
+        """ Quantise bar values to the spectrum steps
+
+        :param values: bar values in pixels
+        :param addfactor: height multiplier
+        :return: list or array of bar heights
+        """
+        if np != None:
+            return self.get_step_heights_vectorised(np.asarray(values, dtype=float), addfactor)
+        else:
+            return self.get_step_heights_python(values, addfactor)
+
+    def set_bar_heights(self, heights):
+        """ Apply heights to the bars and reflections
+
+        :param heights: list or array of bar heights
+        """
+        if np != None:
+            self.set_bar_heights_vectorised(np.asarray(heights, dtype=float))
+        else:
+            self.set_bar_heights_python(heights)
+
+    def set_topping_heights(self, heights, now=None):
+        """ Move toppings according to the bar heights
+
+        :param heights: list or array of bar heights
+        :param now: current time in seconds
+        """
+        if np != None:
+            self.set_topping_heights_vectorised(np.asarray(heights, dtype=float), now)
+        else:
+            self.set_topping_heights_python(heights, now)
 
+    def get_values_python(self, data, words):
+        """ Decode pipe data
+
+        :param data: pipe data
+        :param words: the number of bins
+        :return: list of bar values in pixels
+        """
+        values = []
         for m in range(words):
             v = data[4 * m] + (data[4 * m + 1] << 8) + (data[4 * m + 2] << 16) + (data[4 * m + 3] << 24)
-            v = v * self.unit
+            values.append(v)
+
+        if self.rebinner:
+            values = self.rebinner.rebin_python(values)
+
+        return [v * self.unit for v in values]
 
+    def get_step_heights_python(self, values, addfactor):
+        """ Quantise bar values to the spectrum steps
+
+        :param values: list of bar values in pixels
+        :param addfactor: height multiplier
+        :return: list of bar heights
+        """
+        heights = []
+        for v in values:
             if v <= 0:
                 steps = 0
             elif v % self.step == 0:
                 steps = int(v / self.step)
             else:
                 steps = int(v / self.step) + 1
-            
-            new_height = steps * self.step*addfactor
-            i = m + 1
-            
-            self.set_bar_y(i, new_height)
-            self.set_reflection_y(i, new_height)
-            self.set_topping_y(i, new_height)
+            heights.append(steps * self.step*addfactor)
+        return heights
+
+    def set_bar_heights_python(self, heights):
+        """ Apply heights to the bars and reflections one by one
+
+        :param heights: list of bar heights
+        """
+        for m, new_height in enumerate(heights):
+            self.set_bar_y(m + 1, new_height)
+            self.set_reflection_y(m + 1, new_height)
+
+    def set_topping_heights_python(self, heights, now=None):
+        """ Move toppings one by one
+
+        :param heights: list of bar heights
+        :param now: current time in seconds
+        """
+        if self.topping_height == None or self.topping_step == None:
+            return
+
+        if now == None:
+            now = time.monotonic()
+
+        words = len(heights)
+        if self.topping_y is None or len(self.topping_y) != words:
+            y_0 = self.spectrum_y + self.origin_y
+            self.topping_y = [min(int(y_0 - h), y_0) for h in heights]
+            self.topping_hold = [now] * words
+            self.topping_time = now
+            for i, comp in enumerate(self.get_topping_components(words)):
+                comp.content_y = self.topping_y[i]
+                comp.bounding_box.h = self.topping_height
+            return
+
+        elapsed = max(0.0, now - self.topping_time)
+        self.topping_time = now
+
+        for m, new_height in enumerate(heights):
+            self.set_topping_y(m + 1, new_height, now, elapsed)
+
+    def get_values_vectorised(self, data, words):
+        """ Decode pipe data
+
+        :param data: pipe data
+        :param words: the number of bins
+        :return: float array of bar values in pixels
+        """
+        if isinstance(data, list):
+            data = bytes(data)
+
+        values = np.frombuffer(data, dtype="<u4", count=words)
+
+        if self.rebinner:
+            values = self.rebinner.rebin(values)
+
+        return values * self.unit
+
+    def get_step_heights_vectorised(self, values, addfactor):
+        """ Quantise bar values to the spectrum steps
+
+        :param values: float array of bar values in pixels
+        :param addfactor: height multiplier
+        :return: float array of bar heights
+        """
+        steps = np.ceil(values / self.step)
+        steps[values <= 0] = 0
+        return steps * self.step * addfactor
+
+    def set_bar_heights_vectorised(self, heights):
+        """ Apply heights to all bars and reflections at once
+
+        :param heights: float array of bar heights
+        """
+        words = len(heights)
+        y_0 = self.spectrum_y + self.origin_y
+        size = self.config[SIZE]
+
+        bar_h = heights.tolist()
+        bar_y = (self.height - heights).tolist()
+        bar_content_y = (y_0 - heights).astype(int).tolist()
+
+        for i in range(words):
+            comp = self.components[i + 1]
+            comp.bounding_box.h = bar_h[i]
+            comp.bounding_box.y = bar_y[i]
+            comp.content_y = bar_content_y[i]
+            comp.visible = True
+
+        if self.reflection != [None]:
+            reflection_y = int(y_0 + self.reflection_gap)
+            for i in range(words):
+                comp = self.components[i + 1 + size]
+                comp.bounding_box.h = bar_h[i]
+                comp.bounding_box.y = 0
+                comp.content_y = reflection_y
+                comp.visible = True
+
+    def set_topping_heights_vectorised(self, heights, now=None):
+        """ Move all toppings at once. The topping is pushed up by the bar, holds its position
+        for the hold time and then falls with the constant speed in pixels per second.
+
+        :param heights: float array of bar heights
+        :param now: current time in seconds
+        """
+        if self.topping_height == None or self.topping_step == None:
+            return
+
+        if now == None:
+            now = time.monotonic()
+
+        words = len(heights)
+        y_0 = self.spectrum_y + self.origin_y
+        toppings = self.get_topping_components(words)
+        c_y = np.minimum(np.trunc(y_0 - heights), y_0)
+
+        if self.topping_y is None or len(self.topping_y) != words:
+            self.topping_y = c_y
+            self.topping_hold = np.full(words, now)
+            self.topping_time = now
+            for i, y in enumerate(c_y.astype(int).tolist()):
+                toppings[i].content_y = y
+                toppings[i].bounding_box.h = self.topping_height
+            return
+
+        elapsed = max(0.0, now - self.topping_time)
+        self.topping_time = now
+
+        gap = self.topping_step + self.topping_height
+        top_y = c_y - gap
+        falling = c_y > self.topping_y + gap
+        moving = falling & (now >= self.topping_hold)
+        fallen_y = np.minimum(self.topping_y + self.topping_decay * elapsed, top_y)
+        self.topping_y = np.where(falling, np.where(moving, fallen_y, self.topping_y), top_y)
+        self.topping_hold = np.where(falling, self.topping_hold, now + self.topping_hold_time)
+        box_y = self.height - (y_0 - self.topping_y) + 1
+
+        new_y = self.topping_y.astype(int).tolist()
+        box_y = box_y.astype(int).tolist()
+        falling = falling.tolist()
+
+        for i, comp in enumerate(toppings):
+            comp.content_y = new_y[i]
+            if falling[i]:
+                comp.bounding_box.y = box_y[i]
+            comp.visible = falling[i]
 
     def set_bar_y(self, index, new_height):
         """ Set bar Y coordinate
@@ -646,40 +1100,192 @@ class Spectrum(SpectrumContainer, ScreensaverSpectrum):
         comp.content_y = int(self.spectrum_y + self.origin_y + self.reflection_gap)
         comp.visible = True
 
-    def set_topping_y(self, index, new_height):
+    def set_topping_y(self, index, new_height, now, elapsed):
         """ Set topping Y coordinate
 
         :param index: element index
         :param new_height: element new height
+        :param now: current time in seconds
+        :param elapsed: time since the previous topping update in seconds
         """
-        if self.topping_height == None or self.topping_step == None:
-            return
-
-        n = 1
-        if self.reflection != [None]:
-            n = 2
-
-        m = index + self.config[SIZE] * n
-        comp = self.components[m]
-        comp.bounding_box.h = self.topping_height
+        m = index - 1
+        comp = self.get_topping_components(m + 1)[m]
         y_0 = self.spectrum_y + self.origin_y
         c_y = int(y_0 - new_height)
         if c_y >= y_0:
             c_y = y_0
 
-        if not comp.initialized:
-            comp.content_y = c_y
-            comp.initialized = True
-            return
+        gap = self.topping_step + self.topping_height
+        y = self.topping_y[m]
 
-        if c_y > comp.content_y + self.topping_step + self.topping_height:
-            comp.content_y += self.topping_step
-            comp.bounding_box.y = self.height - (y_0 - comp.content_y) + 1
+        if c_y > y + gap:
+            if now >= self.topping_hold[m]:
+                y = min(y + self.topping_decay * elapsed, c_y - gap)
+            comp.bounding_box.y = int(self.height - (y_0 - y) + 1)
             comp.visible = True
         else:
-            comp.content_y = c_y - self.topping_height - self.topping_step
+            y = c_y - gap
+            self.topping_hold[m] = now + self.topping_hold_time
             comp.visible = False
 
+        self.topping_y[m] = y
+        comp.content_y = int(y)
+
+    def get_topping_components(self, words):
+        """ Get topping components
+
+        :param words: the number of toppings
+        :return: list of topping components
+        """
+        size = self.config[SIZE]
+        n = 1
+        if self.reflection != [None]:
+            n = 2
+
+        return self.components[1 + size * n : 1 + size * n + words]
+
+    def reset_toppings(self):
+        """ Reset topping positions and timing """
+
+        self.topping_y = None
+        self.topping_hold = None
+        self.topping_time = None
+
+    def clean_draw_update(self):
+        """ Clean, draw and update the whole spectrum area. The background is cached for the column updates. """
+
+        if not self.visible:
+            return
+
+        self.clean()
+        SpectrumComponent.draw(self)
+        self.components[0].draw()
+        self.cache_background()
+
+        self.screen.blits(self.get_column_blits(range(self.config[SIZE])), doreturn=False)
+        self.components[-1].draw()
+
+        self.column_states = [self.get_column_state(i) for i in range(self.config[SIZE])]
+        self.update()
+
+    def cache_background(self):
+        """ Copy the spectrum area with background only from the screen """
+
+        self.background_cache = None
+        if not self.screen:
+            return
+
+        area = self.bounding_box.clip(self.screen.get_rect())
+        if area.w == 0 or area.h == 0:
+            return
+
+        self.background_area = area
+        self.background_cache = self.screen.subsurface(area).copy()
+
+    def get_column_components(self, index):
+        """ Get components drawn in the bar column
+
+        :param index: bar index starting from 0
+        :return: list of bar, reflection and topping components
+        """
+        size = self.config[SIZE]
+        i = index + 1
+        components = [self.components[i]]
+
+        if self.reflection != [None]:
+            components.append(self.components[i + size])
+            n = 2
+        else:
+            n = 1
+
+        if self.topping_height != None and self.topping_step != None:
+            components.append(self.components[i + size * n])
+
+        return components
+
+    def get_column_state(self, index):
+        """ Get screen rectangles of the visible components in the bar column
+
+        :param index: bar index starting from 0
+        :return: tuple of rectangles
+        """
+        state = []
+        for comp in self.get_column_components(index):
+            if not comp.visible or not comp.content or comp.content[1] == None:
+                continue
+            b = comp.bounding_box
+            state.append(pygame.Rect(comp.content_x, comp.content_y, b.w, b.h))
+
+        return tuple(state)
+
+    def dirty_draw_update(self):
+        """ Redraw and update only the bar columns which changed since the last drawing.
+        The column is restored from the cached background, then the bar, reflection, topping
+        and foreground are drawn inside the column. Adjacent changed columns are updated as one rectangle.
+        """
+        if not self.visible:
+            return
+
+        if self.background_cache == None or self.column_states == None:
+            self.clean_draw_update()
+            return
+
+        area = self.background_area
+        fgr = self.components[-1]
+        columns = []
+        backgrounds = []
+        foregrounds = []
+        dirty = []
+        previous_index = None
+
+        for i in range(self.config[SIZE]):
+            state = self.get_column_state(i)
+            previous = self.column_states[i]
+            if state == previous:
+                continue
+
+            self.column_states[i] = state
+            rects = state + previous
+            if not rects:
+                continue
+
+            r = rects[0].unionall(rects[1:]).clip(area)
+            if r.w == 0 or r.h == 0:
+                continue
+
+            columns.append(i)
+            backgrounds.append((self.background_cache, r, r.move(-area.x, -area.y)))
+            if fgr.content:
+                foregrounds.append((fgr.content[1], r, r.move(-fgr.content_x, -fgr.content_y)))
+
+            if previous_index == i - 1:
+                dirty[-1].union_ip(r)
+            else:
+                dirty.append(pygame.Rect(r))
+            previous_index = i
+
+        if not dirty:
+            return
+
+        # columns don't overlap so all backgrounds, bars and foregrounds are drawn in one batch
+        self.screen.blits(backgrounds + self.get_column_blits(columns) + foregrounds, doreturn=False)
+        self.update_rectangle(dirty)
+
+    def set_screen(self, screen):
+        """ Draw the spectrum on another surface
+
+        :param screen: new surface
+        """
+        self.screen = screen
+        self.util.pygame_screen = screen
+        # the meter utility object can get another accumulator with the new screen
+        self.damage = getattr(self.meterutil, "damage", None)
+        self.reset_drawn()
+        for c in self.components:
+            if c:
+                c.screen = screen
+                c.damage = self.damage
+
     def update_ui(self):
         """ Update UI Thread method. """ 
 
@@ -0,0 +1,192 @@
+# Copyright 2018-2024 Peppy Player peppy.player@gmail.com
+#
+# This file is part of Peppy Player.
+#
+# Peppy Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Peppy Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Peppy Player. If not, see <http://www.gnu.org/licenses/>.
+
+import sys
+import time
+import pygame
+
+from random import Random
+from spectrum import Spectrum
+from spectrumcomponent import SpectrumComponent
+from spectrumconfigparser import SIZE
+from spectrumtestpattern import SpectrumTestPattern, PATTERN_PINK
+from spectrumutil import SpectrumUtil, SCALING_SMOOTH, SCALING_FAST, SCALING_PIL, Image
+
+BAR_SIZES = [30, 64]
+TICKS = 2000
+TICK_TIME = 0.1
+HEIGHT = 180
+STEPS = 30
+MAX_VALUE = 100
+SCALING_MODES = [SCALING_SMOOTH, SCALING_FAST, SCALING_PIL]
+SCALING_SIZES = [((1280, 400), (667, 180)), ((40, 300), (30, 180))]
+SCALING_COUNT = 50
+
+class BenchmarkUtil(object):
+    """ Utility object without screen, only the bar calculation is measured """
+
+    pygame_screen = None
+
+def create_spectrum(size):
+    """ Create spectrum with the bars, reflections and toppings but without configuration files
+
+    :param size: the number of bars
+    :return: spectrum object
+    """
+    util = BenchmarkUtil()
+    spectrum = Spectrum.__new__(Spectrum)
+    spectrum.config = {SIZE: size}
+    spectrum.rebinner = None
+    spectrum.components = [SpectrumComponent(util)]
+    for _ in range(3 * size):
+        c = SpectrumComponent(util)
+        c.bounding_box = pygame.Rect(0, 0, 10, HEIGHT)
+        spectrum.components.append(c)
+    spectrum.components.append(SpectrumComponent(util))
+
+    spectrum.reflection = [True]
+    spectrum.reflection_gap = 2
+    spectrum.height = HEIGHT
+    spectrum.step = int(HEIGHT / STEPS)
+    spectrum.origin_y = 200
+    spectrum.spectrum_y = 0
+    spectrum.unit = HEIGHT / MAX_VALUE
+    spectrum.topping_height = 2
+    spectrum.topping_step = 1
+    spectrum.topping_hold_time = 0.2
+    spectrum.topping_decay = 10
+    spectrum.reset_toppings()
+    return spectrum
+
+def create_frames(size, count, seed=1):
+    """ Create pink noise spectrum pipe frames
+
+    :param size: the number of bars
+    :param count: the number of frames
+    :param seed: random seed
+    :return: list of frames
+    """
+    return SpectrumTestPattern(PATTERN_PINK, size, MAX_VALUE, count, seed).frames
+
+def set_values_python(spectrum, frame, words, addfactor, now):
+    """ Calculate and apply bar positions one by one
+
+    :param spectrum: spectrum object
+    :param frame: pipe frame
+    :param words: the number of bins
+    :param addfactor: height multiplier
+    :param now: current time in seconds
+    """
+    heights = spectrum.get_step_heights_python(spectrum.get_values_python(frame, words), addfactor)
+    spectrum.set_bar_heights_python(heights)
+    spectrum.set_topping_heights_python(heights, now)
+
+def set_values_vectorised(spectrum, frame, words, addfactor, now):
+    """ Calculate and apply bar positions for all bars at once
+
+    :param spectrum: spectrum object
+    :param frame: pipe frame
+    :param words: the number of bins
+    :param addfactor: height multiplier
+    :param now: current time in seconds
+    """
+    heights = spectrum.get_step_heights_vectorised(spectrum.get_values_vectorised(frame, words), addfactor)
+    spectrum.set_bar_heights_vectorised(heights)
+    spectrum.set_topping_heights_vectorised(heights, now)
+
+def get_state(spectrum):
+    """ Get component positions for comparison
+
+    :param spectrum: spectrum object
+    :return: list of component positions
+    """
+    return [(c.bounding_box.h, c.bounding_box.y, c.content_y, c.visible) for c in spectrum.components[1:-1]]
+
+def measure(size, vectorised):
+    """ Measure the average time of one spectrum tick
+
+    :param size: the number of bars
+    :param vectorised: True - NumPy path, False - Python path
+    :return: tuple (microseconds per tick, final component state)
+    """
+    spectrum = create_spectrum(size)
+    frames = create_frames(size, TICKS)
+    method = set_values_vectorised if vectorised else set_values_python
+
+    start = time.perf_counter()
+    for n, frame in enumerate(frames):
+        method(spectrum, frame, size, 1.4, n * TICK_TIME)
+    elapsed = time.perf_counter() - start
+
+    return (elapsed * 1000000 / TICKS, get_state(spectrum))
+
+def create_image(size, seed=1):
+    """ Create image with random pixels and alpha channel
+
+    :param size: image size
+    :param seed: random seed
+    :return: the image
+    """
+    r = Random(seed)
+    image = pygame.Surface(size, pygame.SRCALPHA, 32)
+    w, h = size
+    for _ in range(200):
+        color = (r.randrange(256), r.randrange(256), r.randrange(256), r.randrange(256))
+        image.fill(color, pygame.Rect(r.randrange(w), r.randrange(h), r.randrange(1, w), r.randrange(1, h)))
+    return image
+
+def measure_scaling(mode, source_size, target_size):
+    """ Measure the average time of one image scaling
+
+    :param mode: scaling mode
+    :param source_size: source image size
+    :param target_size: scaled image size
+    :return: milliseconds per scaling
+    """
+    util = SpectrumUtil(mode)
+    image = create_image(source_size)
+
+    start = time.perf_counter()
+    for _ in range(SCALING_COUNT):
+        util.scale_image(image, target_size)
+    elapsed = time.perf_counter() - start
+
+    return elapsed * 1000 / SCALING_COUNT
+
+if __name__ == "__main__":
+    """ Compare per-tick cost of the Python and NumPy bar calculation and the cost of the image scaling modes """
+
+    for size in BAR_SIZES:
+        python_time, python_state = measure(size, False)
+        line = "bars: %d python: %.1f us" % (size, python_time)
+        try:
+            numpy_time, numpy_state = measure(size, True)
+            line += " numpy: %.1f us same result: %s" % (numpy_time, numpy_state == python_state)
+        except Exception as e:
+            line += " numpy: not available (%s)" % e
+        print(line)
+
+    for source_size, target_size in SCALING_SIZES:
+        line = "scaling %dx%d to %dx%d:" % (source_size + target_size)
+        for mode in SCALING_MODES:
+            if mode == SCALING_PIL and Image == None:
+                line += " %s: not available" % mode
+            else:
+                line += " %s: %.2f ms" % (mode, measure_scaling(mode, source_size, target_size))
+        print(line)
+
+    sys.exit(0)
@@ -0,0 +1,145 @@
+# Copyright 2018-2024 Peppy Player peppy.player@gmail.com
+#
+# This file is part of Peppy Player.
+#
+# Peppy Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Peppy Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Peppy Player. If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+
+from collections import OrderedDict
+from threading import RLock
+
+DEFAULT_CACHE_SIZE = 16 * 1024 * 1024
+
+class SpectrumCache(object):
+    """ Process-wide cache of the spectrum assets which survives meter switches.
+
+    Parsed configurations are kept by the spectrum section. Surfaces are kept by the tuple
+    (section, bounding box) in the least recently used order. When the total size of the
+    surfaces exceeds the budget the least recently used assets are evicted.
+    """
+
+    def __init__(self, size=DEFAULT_CACHE_SIZE):
+        """ Initializer
+
+        :param size: memory budget in bytes
+        """
+        self.size = size
+        self.used = 0
+        self.configs = {}
+        self.assets = OrderedDict()
+        self.lock = RLock()
+
+    def set_size(self, size):
+        """ Set memory budget. Assets are evicted if they don't fit into the new budget.
+
+        :param size: memory budget in bytes, 0 - don't cache
+        """
+        with self.lock:
+            self.size = max(0, size)
+            self.evict()
+
+    def get_config_parser(self, section, create):
+        """ Get parsed configuration of the spectrum section
+
+        :param section: spectrum section name
+        :param create: function which parses configuration if it's not in the cache
+        :return: configuration parser
+        """
+        with self.lock:
+            try:
+                return self.configs[section]
+            except KeyError:
+                pass
+
+            parser = create()
+            if self.size > 0:
+                self.configs[section] = parser
+            return parser
+
+    def get_assets(self, key):
+        """ Get assets and mark them as recently used
+
+        :param key: tuple (section, bounding box)
+        :return: assets or None if they are not in the cache
+        """
+        with self.lock:
+            try:
+                entry = self.assets[key]
+            except KeyError:
+                return None
+
+            self.assets.move_to_end(key)
+            return entry[0]
+
+    def put_assets(self, key, assets, surfaces):
+        """ Add assets to the cache
+
+        :param key: tuple (section, bounding box)
+        :param assets: the assets to keep
+        :param surfaces: the list of surfaces used by the assets, used to calculate the size
+        """
+        size = self.get_surfaces_size(surfaces)
+
+        with self.lock:
+            if key in self.assets:
+                self.used -= self.assets.pop(key)[1]
+
+            if size > self.size:
+                logging.debug("spectrum assets " + str(key) + " don't fit into the cache")
+                return
+
+            self.assets[key] = (assets, size)
+            self.used += size
+            self.evict()
+
+    def evict(self):
+        """ Remove the least recently used assets until the cache fits into the budget """
+
+        with self.lock:
+            while self.assets and self.used > self.size:
+                key, entry = self.assets.popitem(last=False)
+                self.used -= entry[1]
+                logging.debug("evicted spectrum assets " + str(key))
+
+            if self.size == 0:
+                self.configs.clear()
+
+    def clear(self):
+        """ Remove all assets and configurations """
+
+        with self.lock:
+            self.assets.clear()
+            self.configs.clear()
+            self.used = 0
+
+    def get_surfaces_size(self, surfaces):
+        """ Calculate memory used by the surfaces. Shared surfaces are counted once.
+
+        :param surfaces: the list of surfaces, None items are ignored
+        :return: size in bytes
+        """
+        size = 0
+        counted = set()
+
+        for s in surfaces:
+            if s == None or id(s) in counted:
+                continue
+            counted.add(id(s))
+            w, h = s.get_size()
+            size += w * h * s.get_bytesize()
+
+        return size
+
+spectrum_cache = SpectrumCache()
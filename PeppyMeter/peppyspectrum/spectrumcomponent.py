@@ -51,6 +51,10 @@ class SpectrumComponent(object):
         self.image_filename = None
         self.parent_screen = None
         self.border_thickness = t
+        # blit parameters of the last batch drawing, the unchanged component is not drawn again
+        self.drawn = None
+        # the damaged areas are collected by the meter and updated once per frame
+        self.damage = getattr(util, "damage", None)
 
     def clean(self):
         """ Clean component by filling its bounding box by background color """
@@ -146,17 +150,46 @@ class SpectrumComponent(object):
             except:
                 pass
  
+    def get_blit(self):
+        """ Get blit parameters of the image component for the batch drawing
+
+        :return: tuple (image, position, area) or (image, position), None if there is nothing to draw
+        """
+        if not self.visible or not hasattr(self, "content"):
+            return None
+
+        image = self.content
+        if isinstance(image, tuple):
+            image = image[1]
+
+        if not isinstance(image, pygame.Surface):
+            return None
+
+        if self.bounding_box == None:
+            return (image, (self.content_x, self.content_y))
+
+        if self.bounding_box.w <= 0 or self.bounding_box.h <= 0:
+            return None
+
+        return (image, (self.content_x, self.content_y), self.bounding_box)
+
     def update(self):
         """ Update Pygame Screen """
         
-        if not self.visible: return
-        pygame.display.update(self.bounding_box)
+        self.update_rectangle(self.bounding_box)
         
     def update_rectangle(self, r):
-        """ Update Pygame Screen """
-        
+        """ Update rectangle or list of rectangles. The update is postponed till the end of the frame
+        if the meter collects the damaged areas.
+
+        :param r: rectangle or list of rectangles
+        """
         if not self.visible: return
-        pygame.display.update(r)      
+
+        if self.damage:
+            self.damage.add(r)
+        else:
+            pygame.display.update(r)
         
     def set_visible(self, flag):
         """ Set component visibility 
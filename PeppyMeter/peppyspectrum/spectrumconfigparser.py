@@ -45,6 +45,17 @@ MAX_VALUE = "max.value"
 PIPE_NAME = "pipe.name"
 SIZE = "size"
 UPDATE_UI_INTERVAL = "update.ui.interval"
+IMAGE_SCALING = "image.scaling"
+READ_INTERVAL = "read.interval"
+BAR_ATTACK = "bar.attack"
+BAR_DECAY = "bar.decay"
+PIPE_BINS = "pipe.bins"
+BIN_LAYOUT = "bin.layout"
+BIN_MAX_FREQUENCY = "bin.max.frequency"
+
+# meter configuration keys used by the spectrum
+USE_CACHE = "use.cache"
+SPECTRUM_CACHE_SIZE = "spectrum.cache.size"
 
 SDL_ENV = "sdl.env"
 FRAMEBUFFER_DEVICE = "framebuffer.device"
@@ -80,6 +91,8 @@ BAR_GAP = "bar.gap"
 STEPS = "steps"
 TOPPING_HEIGHT = "topping.height"
 TOPPING_STEP = "topping.step"
+TOPPING_HOLD = "topping.hold"
+TOPPING_DECAY = "topping.decay"
 
 AVAILABLE_SPECTRUM_NAMES = "available.spectrum.names"
 BASE_FOLDER = "base.folder"
@@ -152,12 +165,19 @@ class SpectrumConfigParser(object):
         config[UPDATE_UI_INTERVAL] = c.getfloat(CURRENT, UPDATE_UI_INTERVAL)
         config[ADD_FACTOR] = c.getfloat(CURRENT, ADD_FACTOR)
         config[PIPE_POLLING_INTERVAL] = config[UPDATE_UI_INTERVAL] / 10
-        config[PIPE_SIZE] = 4 * config[SIZE]
+        config[PIPE_BINS] = c.getint(CURRENT, PIPE_BINS, fallback=config[SIZE])
+        config[PIPE_SIZE] = 4 * config[PIPE_BINS]
+        config[BIN_LAYOUT] = c.get(CURRENT, BIN_LAYOUT, fallback="linear")
+        config[BIN_MAX_FREQUENCY] = c.getfloat(CURRENT, BIN_MAX_FREQUENCY, fallback=22050.0)
         config[FRAME_RATE] = c.getint(CURRENT, FRAME_RATE)
         config[DEPTH] = c.getint(CURRENT, DEPTH)
         config[EXIT_ON_TOUCH] = c.getboolean(CURRENT, EXIT_ON_TOUCH)
         config[USE_LOGGING] = c.getboolean(CURRENT, USE_LOGGING)
         config[USE_TEST_DATA] = c.get(CURRENT, USE_TEST_DATA)
+        config[IMAGE_SCALING] = c.get(CURRENT, IMAGE_SCALING, fallback="smooth")
+        config[READ_INTERVAL] = c.getfloat(CURRENT, READ_INTERVAL, fallback=0.1)
+        config[BAR_ATTACK] = self.get_float_list(c.get(CURRENT, BAR_ATTACK, fallback=None))
+        config[BAR_DECAY] = self.get_float_list(c.get(CURRENT, BAR_DECAY, fallback=None))
 
         config[FRAMEBUFFER_DEVICE] = c.get(SDL_ENV, FRAMEBUFFER_DEVICE)
         config[MOUSE_DEVICE] = c.get(SDL_ENV, MOUSE_DEVICE)
@@ -262,6 +282,8 @@ class SpectrumConfigParser(object):
             spectrum[BAR_GAP] = c.getint(section, BAR_GAP)
             spectrum[TOPPING_HEIGHT] = self.get_int(c.get(section, TOPPING_HEIGHT))
             spectrum[TOPPING_STEP] = self.get_int(c.get(section, TOPPING_STEP))
+            spectrum[TOPPING_HOLD] = c.getfloat(section, TOPPING_HOLD, fallback=0.0)
+            spectrum[TOPPING_DECAY] = c.getfloat(section, TOPPING_DECAY, fallback=None)
             spectrum[FGR_FILENAME] = c.get(section, FGR_FILENAME, fallback=None)
             spectrum[STEPS] = c.getint(section, STEPS)
 
@@ -281,6 +303,18 @@ class SpectrumConfigParser(object):
 
         return int(str)
 
+    def get_float_list(self, str):
+        """ Parse comma separated list of float numbers
+
+        :param str: string e.g. 0.05, 0.1
+
+        :return: list of float numbers, empty list if the string is empty
+        """
+        if str == None or len(str.strip()) == 0:
+            return []
+
+        return [float(e) for e in str.split(",")]
+
     def get_color(self, str):
         """ Parse single color section of the configuration file
         
@@ -15,6 +15,9 @@
 # You should have received a copy of the GNU General Public License
 # along with Peppy Player. If not, see <http://www.gnu.org/licenses/>.
 
+import pygame
+import logging
+
 from spectrumcomponent import SpectrumComponent
 
 class SpectrumContainer(SpectrumComponent):
@@ -45,6 +48,8 @@ class SpectrumContainer(SpectrumComponent):
         
         :param component: component to add
         """
+        if component and component.damage == None:
+            component.damage = self.damage
         self.components.append(component)
 
     def set_parent_screen(self, scr):
@@ -59,17 +64,82 @@ class SpectrumContainer(SpectrumComponent):
             if c: 
                 c.parent_screen = scr
         
+    def clean(self):
+        """ Clean container, all components will be drawn again """
+
+        SpectrumComponent.clean(self)
+        self.reset_drawn()
+
+    def reset_drawn(self):
+        """ Forget the last drawing so all components are drawn by the next draw call """
+
+        if self.is_empty(): return
+
+        for c in self.components:
+            if c: c.drawn = None
+
     def draw(self):
-        """ Draw all components in container. Doesn't draw invisible container. """
+        """ Draw all components in container. Doesn't draw invisible container.
+        Image components are drawn in batches by one Surface.blits call. Invisible and empty components are skipped.
+        The image component which image, position and area didn't change since the last batch is skipped
+        unless it overlaps the area drawn before it in this call.
+        """
         
         if not self.visible: return
 
+        if SpectrumComponent.get_blit(self) or (isinstance(self.content, pygame.Rect) and self.bgr):
+            # the container background covers the components
+            self.reset_drawn()
         SpectrumComponent.draw(self)
 
         if self.is_empty(): return
 
+        blits = []
+        areas = []
+        covered = False
         for comp in self.components:
-            if comp: comp.draw()
+            if not comp: continue
+
+            if isinstance(comp, SpectrumContainer) or isinstance(getattr(comp, "content", None), pygame.Rect) or comp.screen is not self.screen:
+                # keep the drawing order for the components which can't be batched
+                self.draw_blits(blits)
+                blits = []
+                comp.draw()
+                covered = True
+                continue
+
+            b = comp.get_blit()
+            if not b:
+                comp.drawn = None
+                continue
+
+            if len(b) == 3:
+                area = pygame.Rect(b[1], b[2].size)
+                drawn = (b[0], b[1], tuple(b[2]))
+            else:
+                area = pygame.Rect(b[1], b[0].get_size())
+                drawn = (b[0], b[1], None)
+
+            if drawn == comp.drawn and not covered and area.collidelist(areas) == -1:
+                continue
+
+            comp.drawn = drawn
+            areas.append(area)
+            blits.append(b)
+
+        self.draw_blits(blits)
+
+    def draw_blits(self, blits):
+        """ Draw images by one call
+
+        :param blits: list of tuples (image, position, area)
+        """
+        if not blits or not self.screen: return
+
+        try:
+            self.screen.blits(blits, doreturn=False)
+        except Exception as e:
+            logging.debug(e)
     
     def draw_area(self, bb):
         if not self.visible: return
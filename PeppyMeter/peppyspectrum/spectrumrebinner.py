@@ -0,0 +1,135 @@
+# Copyright 2018-2024 Peppy Player peppy.player@gmail.com
+#
+# This file is part of Peppy Player.
+#
+# Peppy Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Peppy Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Peppy Player. If not, see <http://www.gnu.org/licenses/>.
+
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+LAYOUT_LINEAR = "linear"
+LAYOUT_LOG = "log"
+LAYOUT_MEL = "mel"
+
+class SpectrumRebinner(object):
+    """ Maps any number of pipe bins to any number of bars.
+
+    The pipe bins are expected to be linear in frequency from 0 to the maximum frequency.
+    Every bar covers the frequency range defined by the layout. The bar value is the average
+    of the bins in its range weighted by the part of the bin which is inside of the range.
+    The index and weight matrices are prepared once so one rebinning is a gather, multiplication and sum.
+    """
+
+    def __init__(self, bins, bars, layout=LAYOUT_LINEAR, max_frequency=22050.0):
+        """ Initializer
+
+        :param bins: the number of pipe bins
+        :param bars: the number of bars
+        :param layout: bar frequency layout - linear, log or mel
+        :param max_frequency: the frequency of the upper edge of the last bin in Hz, used by the mel layout
+        """
+        self.bins = bins
+        self.bars = bars
+        self.layout = layout
+        self.max_frequency = max_frequency
+        self.edges = self.get_edges()
+        self.indexes, self.weights = self.get_matrices(self.edges)
+
+        if np != None:
+            self.index_matrix = np.array(self.indexes, dtype=np.intp)
+            self.weight_matrix = np.array(self.weights, dtype=float)
+
+    def get_edges(self):
+        """ Get bar edges in bin units
+
+        :return: list of bars + 1 edges
+        """
+        n = self.bars
+        if self.layout == LAYOUT_LOG and self.bins > 1:
+            # the first bin contains DC and is skipped
+            return [self.bins ** (i / n) for i in range(n + 1)]
+        elif self.layout == LAYOUT_MEL:
+            bin_width = self.max_frequency / self.bins
+            mel_max = 2595.0 * math.log10(1.0 + self.max_frequency / 700.0)
+            edges = []
+            for i in range(n + 1):
+                frequency = 700.0 * (10.0 ** (mel_max * i / n / 2595.0) - 1.0)
+                edges.append(frequency / bin_width)
+            return edges
+        else:
+            return [self.bins * i / n for i in range(n + 1)]
+
+    def get_matrices(self, edges):
+        """ Prepare index and weight matrices. Rows are padded by the bin 0 with weight 0.
+
+        :param edges: bar edges in bin units
+        :return: tuple (indexes, weights), both are lists of rows of the same length
+        """
+        indexes = []
+        weights = []
+
+        for i in range(self.bars):
+            start = edges[i]
+            end = min(edges[i + 1], self.bins)
+            row_indexes = []
+            row_weights = []
+
+            for j in range(int(math.floor(start)), int(math.ceil(end))):
+                overlap = min(end, j + 1) - max(start, j)
+                if overlap > 0:
+                    row_indexes.append(j)
+                    row_weights.append(overlap)
+
+            total = sum(row_weights)
+            indexes.append(row_indexes)
+            weights.append([w / total for w in row_weights])
+
+        width = max(1, max(len(row) for row in indexes))
+        for row_indexes, row_weights in zip(indexes, weights):
+            padding = width - len(row_indexes)
+            row_indexes.extend([0] * padding)
+            row_weights.extend([0.0] * padding)
+
+        return indexes, weights
+
+    def rebin(self, values):
+        """ Map bin values to bar values
+
+        :param values: float array of bin values, missing bins are treated as 0
+        :return: float array of bar values
+        """
+        values = np.asarray(values, dtype=float)
+        if values.shape[0] < self.bins:
+            values = np.concatenate((values, np.zeros(self.bins - values.shape[0])))
+
+        return (values[self.index_matrix] * self.weight_matrix).sum(axis=1)
+
+    def rebin_python(self, values):
+        """ Map bin values to bar values without NumPy
+
+        :param values: list of bin values, missing bins are treated as 0
+        :return: list of bar values
+        """
+        if len(values) < self.bins:
+            values = list(values) + [0] * (self.bins - len(values))
+
+        bars = []
+        for row_indexes, row_weights in zip(self.indexes, self.weights):
+            bars.append(sum(values[j] * w for j, w in zip(row_indexes, row_weights)))
+
+        return bars
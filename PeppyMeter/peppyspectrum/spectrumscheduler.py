@@ -0,0 +1,120 @@
+# Copyright 2018-2024 Peppy Player peppy.player@gmail.com
+#
+# This file is part of Peppy Player.
+#
+# Peppy Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Peppy Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Peppy Player. If not, see <http://www.gnu.org/licenses/>.
+
+import math
+
+SNAP_DISTANCE = 0.5
+
+class SpectrumScheduler(object):
+    """ Decides when the new spectrum values should be read and interpolates bar values between readings.
+
+    The reading period doesn't depend on the frame rate. Between readings every bar moves to the last read
+    value using the exponential attack time constant when it rises and the decay time constant when it falls.
+    The time constants are in seconds, 0 - the bar jumps to the value immediately.
+    """
+
+    def __init__(self, size, read_interval, attack, decay):
+        """ Initializer
+
+        :param size: the number of bars
+        :param read_interval: reading period in seconds
+        :param attack: list of attack time constants, the last one is used for the rest of the bars
+        :param decay: list of decay time constants, the last one is used for the rest of the bars
+        """
+        self.size = size
+        self.read_interval = read_interval
+        self.attack = self.get_bar_constants(attack)
+        self.decay = self.get_bar_constants(decay)
+        self.targets = [0.0] * size
+        self.values = [0.0] * size
+        self.read_time = None
+        self.time = None
+
+    def get_bar_constants(self, constants):
+        """ Expand time constants to all bars
+
+        :param constants: list of time constants
+        :return: list with time constant per bar
+        """
+        if not constants:
+            constants = [0.0]
+        constants = list(constants[: self.size])
+        return constants + [constants[-1]] * (self.size - len(constants))
+
+    def reset(self):
+        """ Reset bar values and timing """
+
+        self.targets = [0.0] * self.size
+        self.values = [0.0] * self.size
+        self.read_time = None
+        self.time = None
+
+    def is_read_time(self, now):
+        """ Check if the new values should be read
+
+        :param now: current time in seconds
+        :return: True - read new values, False - keep interpolating
+        """
+        return self.read_time == None or now - self.read_time >= self.read_interval
+
+    def set_targets(self, values, now):
+        """ Set the newest read values
+
+        :param values: bar values
+        :param now: reading time in seconds
+        """
+        targets = list(values[: self.size])
+        self.targets = targets + [0.0] * (self.size - len(targets))
+
+        if self.read_time == None or now - self.read_time >= 2 * self.read_interval:
+            # the reading was late, start the new period from now
+            self.read_time = now
+        else:
+            self.read_time += self.read_interval
+
+    def interpolate(self, now):
+        """ Move bar values to the targets using the real time elapsed since the previous call
+
+        :param now: current time in seconds
+        :return: list of bar values
+        """
+        if self.time == None:
+            elapsed = 0.0
+        else:
+            elapsed = max(0.0, now - self.time)
+        self.time = now
+
+        values = self.values
+        for i, target in enumerate(self.targets):
+            value = values[i]
+            if value == target:
+                continue
+
+            if target > value:
+                constant = self.attack[i]
+            else:
+                constant = self.decay[i]
+
+            if constant <= 0:
+                value = target
+            else:
+                value += (target - value) * (1.0 - math.exp(-elapsed / constant))
+                if abs(target - value) < SNAP_DISTANCE:
+                    value = target
+            values[i] = value
+
+        return values
@@ -0,0 +1,161 @@
+#! /usr/bin/python3
+# Copyright 2018-2024 Peppy Player peppy.player@gmail.com
+#
+# This file is part of Peppy Player.
+#
+# Peppy Player is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Peppy Player is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Peppy Player. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import struct
+import argparse
+
+from spectrumconfigparser import TEST_DATA
+
+# the signal generator is in the PeppyMeter folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from signalgenerator import SignalGenerator, PipeWriter, pack_bins, SIGNAL_PINK, SIGNAL_SWEEP
+except ImportError:
+    SignalGenerator = PipeWriter = None
+    SIGNAL_PINK = "pink"
+    SIGNAL_SWEEP = "sweep"
+
+PATTERN_SWEEP = SIGNAL_SWEEP
+PATTERN_PINK = SIGNAL_PINK
+PATTERN_IMPULSE = "impulse"
+
+DEFAULT_FRAMES = 120
+DEFAULT_SEED = 1
+IMPULSE_PERIOD = 30
+IMPULSE_DECAY = 0.7
+
+class SpectrumTestPattern(object):
+    """ Deterministic source of spectrum frames for headless testing and benchmarking.
+
+    All frames are generated and packed into the pipe format once, then they are returned in the loop.
+    Supported patterns: sweep, pink, impulse and the names of the static test data (test1, test2 etc.).
+    The sweep and pink noise are made by the signal generator which requires NumPy.
+    """
+
+    def __init__(self, pattern, bins, max_value, frames=DEFAULT_FRAMES, seed=DEFAULT_SEED):
+        """ Initializer
+
+        :param pattern: pattern name
+        :param bins: the number of bins in one frame
+        :param max_value: maximum bin value
+        :param frames: the number of frames in the loop
+        :param seed: random seed of the pink noise
+        """
+        self.pattern = pattern
+        self.bins = bins
+        self.max_value = max_value
+        self.seed = seed
+        self.frame_format = struct.Struct("<%dI" % bins)
+
+        if pattern in (PATTERN_SWEEP, PATTERN_PINK):
+            self.frames = self.get_generated_frames(pattern, frames)
+        elif pattern == PATTERN_IMPULSE:
+            self.frames = [self.pack(v) for v in self.get_impulses(frames)]
+        elif pattern in TEST_DATA:
+            self.frames = [self.pack(v) for v in self.get_test_data(TEST_DATA[pattern])]
+        else:
+            raise ValueError("Unknown test pattern: " + str(pattern))
+
+        self.index = 0
+
+    def get_generated_frames(self, signal, frames):
+        """ Generate frames by the signal generator
+
+        :param signal: signal name
+        :param frames: the number of frames
+        :return: list of packed frames
+        """
+        if SignalGenerator == None:
+            raise ValueError("Test pattern requires NumPy: " + signal)
+
+        generator = SignalGenerator(1.0, self.bins, self.max_value, self.seed)
+        data = pack_bins(generator.functions[signal](frames)[1])
+        size = self.frame_format.size
+        return [data[n * size : (n + 1) * size] for n in range(frames)]
+
+    def get_impulses(self, frames):
+        """ Impulses in all bins followed by exponential decay
+
+        :param frames: the number of frames
+        :return: list of frames
+        """
+        values = []
+        for n in range(frames):
+            level = self.max_value * IMPULSE_DECAY ** (n % IMPULSE_PERIOD)
+            values.append([level] * self.bins)
+        return values
+
+    def get_test_data(self, test_data):
+        """ Static test data, the data is repeated if there are more bins than values
+
+        :param test_data: list of values or list of frames
+        :return: list of frames
+        """
+        if not isinstance(test_data[0], list):
+            test_data = [test_data]
+
+        return [[frame[i % len(frame)] for i in range(self.bins)] for frame in test_data]
+
+    def pack(self, values):
+        """ Pack values into the pipe format
+
+        :param values: list of values
+        :return: bytes with little-endian 32-bit value per bin
+        """
+        return self.frame_format.pack(*[int(round(min(max(v, 0), self.max_value))) for v in values])
+
+    def get_frame(self):
+        """ Get the next frame
+
+        :return: packed frame
+        """
+        frame = self.frames[self.index]
+        self.index = (self.index + 1) % len(self.frames)
+        return frame
+
+    def reset(self):
+        """ Start from the first frame """
+
+        self.index = 0
+
+if __name__ == "__main__":
+    """ Write the test pattern into the spectrum pipe """
+
+    parser = argparse.ArgumentParser(description="Write spectrum test pattern into the pipe")
+    parser.add_argument("--pipe", default="/home/volumio/myfifosa")
+    parser.add_argument("--pattern", default=PATTERN_SWEEP)
+    parser.add_argument("--bins", type=int, default=20)
+    parser.add_argument("--max-value", type=int, default=100)
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES)
+    parser.add_argument("--rate", type=float, default=30.0, help="frames per second")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = parser.parse_args()
+
+    if PipeWriter == None:
+        parser.error("the pipe writer requires NumPy")
+
+    pattern = SpectrumTestPattern(args.pattern, args.bins, args.max_value, args.frames, args.seed)
+    writer = PipeWriter(SignalGenerator(args.rate, args.bins, args.max_value), spectrum_pipe=args.pipe)
+    try:
+        while True:
+            writer.write_frames((None, frame) for frame in pattern.frames)
+    except KeyboardInterrupt:
+        pass
+    writer.close()
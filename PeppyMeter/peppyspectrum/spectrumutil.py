@@ -16,15 +16,26 @@
 # along with PeppyMeter. If not, see <http://www.gnu.org/licenses/>.
 
 import pygame
-from PIL import Image
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+SCALING_SMOOTH = "smooth"
+SCALING_FAST = "fast"
+SCALING_PIL = "pil"
 
 class SpectrumUtil(object):
     """ Utility class """
     
-    def __init__(self):
-        """ Initializer """
+    def __init__(self, scaling=SCALING_SMOOTH):
+        """ Initializer
 
+        :param scaling: image scaling mode - smooth, fast or pil
+        """
         self.image_cache = {}
+        self.scaling = scaling
     
     def load_pygame_image(self, path):
         """ Check if image is in the cache.
@@ -55,7 +66,8 @@ class SpectrumUtil(object):
             return None
 
     def scale_image(self, image, ratio):
-        """ Scale image using specified ratio
+        """ Scale image using the scaling mode. Smooth and fast modes scale the surface by Pygame
+        without copying pixels to another library. PIL mode is used only if it was selected and PIL is installed.
         
         :param image: image to scale
         :param ratio: scaling ratio
@@ -64,10 +76,30 @@ class SpectrumUtil(object):
         """
         if image == None:
             return None
-        s = pygame.Surface(ratio, flags=pygame.SRCALPHA)
         if isinstance(image, tuple):
             image = image[1]
 
+        if self.scaling == SCALING_PIL and Image != None:
+            return self.scale_image_pil(image, ratio)
+
+        if self.scaling == SCALING_FAST:
+            return pygame.transform.scale(image, ratio)
+
+        try:
+            return pygame.transform.smoothscale(image, ratio)
+        except ValueError:
+            # smoothscale supports only 24 and 32 bit surfaces
+            return pygame.transform.scale(image, ratio)
+
+    def scale_image_pil(self, image, ratio):
+        """ Scale image by PIL
+
+        :param image: image to scale
+        :param ratio: scaling ratio
+
+        :return: scaled image
+        """
+        s = pygame.Surface(ratio, flags=pygame.SRCALPHA)
         d = pygame.image.tostring(image, "RGBA", False)
         img = Image.frombytes("RGBA", image.get_size(), d)
         i = img.resize(ratio)
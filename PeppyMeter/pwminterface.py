@@ -84,27 +84,31 @@ class PWMInterface(object):
         thread.start()
         
     def write_data(self):
-        """ Method of the writing thread """
+        """ Method of the writing thread. Changes duty cycle on new data not more often than the update period. """
         
         self.left.start(0)
         self.right.start(0)
         
+        sequence = 0
         while self.running:
-            time.sleep(self.update_period)
-            
-            v = self.data_source.get_current_data()
-            
-            if v == 0:
+            v = self.data_source.publisher.wait_for_frame(sequence, self.update_period)
+            if v == None:
                 continue
             
+            start = time.monotonic()
+            sequence = v.sequence
             logging.debug(v)
-            left = float(int(v[0]))
-            right = float(int(v[1]))
+            left = float(int(v.left))
+            right = float(int(v.right))
             
             logging.debug(self.logging_template.format(left, right))
 
             self.left.ChangeDutyCycle(left)
             self.right.ChangeDutyCycle(right)
+
+            wait = self.update_period - (time.monotonic() - start)
+            if wait > 0:
+                time.sleep(wait)
                 
     def stop_writing(self):
         """ Stop writing thread and stop PWM """
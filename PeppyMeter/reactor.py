@@ -0,0 +1,357 @@
+# Copyright 2016-2024 PeppyMeter peppy.player@gmail.com
+#
+# This file is part of PeppyMeter.
+#
+# PeppyMeter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PeppyMeter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PeppyMeter. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import time
+import heapq
+import logging
+import selectors
+
+from threading import Thread, Lock
+from collections import deque
+
+REOPEN_PERIOD = 1.0
+
+class PipeInput(object):
+    """ Named pipe registered in the reactor """
+
+    def __init__(self, name, handler):
+        """ Initializer
+
+        :param name: pipe name
+        :param handler: function called with the pipe file descriptor when data is available
+        """
+        self.name = name
+        self.handler = handler
+        self.fd = None
+        self.paused = False
+
+class FrameReader(object):
+    """ Keeps the newest complete frame of the fixed size read from the pipe.
+    The frame and its arrival time are replaced by a new tuple so the readers don't need locks.
+    The frame is forgotten when the writer disconnects.
+    """
+
+    def __init__(self, frame_size, buffer_size, listener=None):
+        """ Initializer
+
+        :param frame_size: frame size in bytes
+        :param buffer_size: read buffer size
+        :param listener: optional function called with every new frame
+        """
+        self.frame_size = frame_size
+        self.buffer = bytearray(buffer_size + frame_size)
+        self.view = memoryview(self.buffer)
+        self.remainder = 0
+        # tuple (arrival time in nanoseconds, frame bytes) or None
+        self.latest = None
+        self.listener = listener
+
+    def read(self, fd):
+        """ Drain the pipe and keep the newest frame
+
+        :param fd: pipe file descriptor
+        :raise EOFError: the pipe writer is disconnected
+        """
+        eof = True
+        frame = None
+
+        while True:
+            try:
+                n = os.readv(fd, [self.view[self.remainder:]])
+            except BlockingIOError:
+                eof = False
+                break
+
+            if n == 0:
+                break
+
+            eof = False
+            length = self.remainder + n
+            end = length - length % self.frame_size
+            if end:
+                frame = bytes(self.view[end - self.frame_size : end])
+            self.remainder = length - end
+            if self.remainder:
+                self.buffer[0 : self.remainder] = self.buffer[end : length]
+
+            if length < len(self.buffer):
+                break
+
+        if frame != None:
+            self.latest = (time.monotonic_ns(), frame)
+            if self.listener:
+                self.listener(frame)
+
+        if eof:
+            self.flush()
+            raise EOFError()
+
+    def get_latest(self, max_age=None):
+        """ Get the newest frame
+
+        :param max_age: maximum frame age in seconds, None - any age
+        :return: frame bytes or None if nothing new was received
+        """
+        latest = self.latest
+        if latest == None:
+            return None
+        if max_age != None and time.monotonic_ns() - latest[0] > max_age * 1000000000:
+            return None
+        return latest[1]
+
+    def flush(self):
+        """ Forget received data """
+
+        self.latest = None
+        self.remainder = 0
+
+class InputReactor(object):
+    """ Single thread which owns all input file descriptors.
+
+    The thread waits in the selector for pipe data, callbacks posted from other threads
+    and timers. Named pipes are opened by name only once and reopened when the writer
+    disconnects, so the consumers never perform pipe system calls.
+    """
+
+    def __init__(self):
+        """ Initializer """
+
+        self.selector = selectors.DefaultSelector()
+        self.wake_read, self.wake_write = os.pipe()
+        os.set_blocking(self.wake_read, False)
+        os.set_blocking(self.wake_write, False)
+        self.selector.register(self.wake_read, selectors.EVENT_READ, None)
+        self.lock = Lock()
+        self.callbacks = deque()
+        self.timers = []
+        self.timer_count = 0
+        self.pipes = {}
+        self.frame_readers = {}
+        self.thread = None
+        self.run_flag = False
+
+    def start(self):
+        """ Start reactor thread """
+
+        if self.thread:
+            return
+
+        self.run_flag = True
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+        logging.debug("reactor started")
+
+    def stop(self):
+        """ Stop reactor thread """
+
+        self.run_flag = False
+        self.wake()
+
+    def wake(self):
+        """ Interrupt waiting in the selector """
+
+        try:
+            os.write(self.wake_write, b"\0")
+        except BlockingIOError:
+            pass
+
+    def call_soon(self, callback, *args):
+        """ Run callback in the reactor thread. Can be called from any thread.
+
+        :param callback: function to call
+        :param args: function arguments
+        """
+        self.callbacks.append((callback, args))
+        self.wake()
+
+    def call_later(self, delay, callback, *args):
+        """ Run callback in the reactor thread after delay. Can be called from any thread.
+
+        :param delay: delay in seconds
+        :param callback: function to call
+        :param args: function arguments
+        """
+        with self.lock:
+            self.timer_count += 1
+            heapq.heappush(self.timers, (time.monotonic() + delay, self.timer_count, callback, args))
+        self.wake()
+
+    def add_pipe(self, name, handler):
+        """ Open named pipe and call handler when data is available.
+        The handler reads the data and raises EOFError when the writer is disconnected.
+
+        :param name: pipe name
+        :param handler: function with the pipe file descriptor as parameter
+        """
+        pipe = PipeInput(name, handler)
+        old_pipe = self.pipes.get(name, None)
+        self.pipes[name] = pipe
+        if old_pipe:
+            # the replaced pipe would keep reading the same FIFO and steal the frames
+            self.call_soon(self.close_pipe, old_pipe)
+        self.call_soon(self.open_pipe, pipe)
+
+    def get_frame_reader(self, name, frame_size, buffer_size):
+        """ Get reader keeping the newest frame from the named pipe. The pipe is opened once per name.
+
+        :param name: pipe name
+        :param frame_size: frame size in bytes
+        :param buffer_size: read buffer size
+        :return: frame reader
+        """
+        reader = self.frame_readers.get(name, None)
+        if reader != None and reader.frame_size == frame_size:
+            return reader
+
+        reader = FrameReader(frame_size, buffer_size)
+        self.frame_readers[name] = reader
+        pipe = self.pipes.get(name, None)
+        if pipe:
+            # the frame size changed, the opened pipe is kept and only its handler is replaced
+            pipe.handler = reader.read
+        else:
+            self.add_pipe(name, reader.read)
+        return reader
+
+    def pause_pipe(self, name, delay):
+        """ Stop waiting for the pipe data for some time. Used to limit the reading frequency.
+
+        :param name: pipe name
+        :param delay: pause in seconds
+        """
+        pipe = self.pipes.get(name, None)
+        if pipe == None or pipe.fd == None or pipe.paused:
+            return
+
+        self.selector.unregister(pipe.fd)
+        pipe.paused = True
+        self.call_later(delay, self.resume_pipe, pipe)
+
+    def resume_pipe(self, pipe):
+        """ Continue waiting for the pipe data
+
+        :param pipe: pipe input
+        """
+        if not pipe.paused:
+            return
+
+        pipe.paused = False
+        if pipe.fd != None:
+            self.selector.register(pipe.fd, selectors.EVENT_READ, pipe)
+
+    def open_pipe(self, pipe):
+        """ Open named pipe and register it in the selector. Retry later if the pipe doesn't exist.
+
+        :param pipe: pipe input
+        """
+        if self.pipes.get(pipe.name, None) != pipe:
+            return
+
+        try:
+            pipe.fd = os.open(pipe.name, os.O_RDONLY | os.O_NONBLOCK)
+        except Exception as e:
+            logging.debug("Cannot open named pipe: " + pipe.name)
+            logging.debug(e)
+            self.call_later(REOPEN_PERIOD, self.open_pipe, pipe)
+            return
+
+        self.selector.register(pipe.fd, selectors.EVENT_READ, pipe)
+        logging.debug("pipe opened: " + pipe.name)
+
+    def close_pipe(self, pipe):
+        """ Close named pipe
+
+        :param pipe: pipe input
+        """
+        if pipe.fd == None:
+            return
+
+        if not pipe.paused:
+            self.selector.unregister(pipe.fd)
+        pipe.paused = False
+        os.close(pipe.fd)
+        pipe.fd = None
+
+    def run(self):
+        """ Reactor thread method """
+
+        while self.run_flag:
+            timeout = None
+            if self.callbacks:
+                timeout = 0
+            else:
+                with self.lock:
+                    if self.timers:
+                        timeout = max(0, self.timers[0][0] - time.monotonic())
+
+            for key, _ in self.selector.select(timeout):
+                if key.data == None:
+                    self.drain_wake_pipe()
+                else:
+                    self.handle_pipe(key.data)
+
+            while self.callbacks:
+                callback, args = self.callbacks.popleft()
+                self.run_callback(callback, args)
+
+            now = time.monotonic()
+            while True:
+                with self.lock:
+                    if not self.timers or self.timers[0][0] > now:
+                        break
+                    _, _, callback, args = heapq.heappop(self.timers)
+                self.run_callback(callback, args)
+
+        for pipe in self.pipes.values():
+            self.close_pipe(pipe)
+        self.thread = None
+        logging.debug("reactor stopped")
+
+    def handle_pipe(self, pipe):
+        """ Call pipe handler. Reopen the pipe when the writer is disconnected.
+
+        :param pipe: pipe input
+        """
+        try:
+            pipe.handler(pipe.fd)
+        except EOFError:
+            # a closed pipe stays readable until it's reopened and a new writer connects
+            self.close_pipe(pipe)
+            self.open_pipe(pipe)
+        except Exception as e:
+            logging.debug(e)
+
+    def drain_wake_pipe(self):
+        """ Read all wake up bytes """
+
+        try:
+            while os.read(self.wake_read, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def run_callback(self, callback, args):
+        """ Run callback and log the errors
+
+        :param callback: function to call
+        :param args: function arguments
+        """
+        try:
+            callback(*args)
+        except Exception as e:
+            logging.debug(e)
@@ -0,0 +1,166 @@
+# Copyright 2016-2024 PeppyMeter peppy.player@gmail.com
+#
+# This file is part of PeppyMeter.
+#
+# PeppyMeter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PeppyMeter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PeppyMeter. If not, see <http://www.gnu.org/licenses/>.
+
+import mmap
+import time
+import struct
+import logging
+
+from array import array
+from threading import Lock
+
+STREAM_METER = 0
+STREAM_SPECTRUM = 1
+STREAMS = 2
+
+MAGIC = b"PPMR"
+VERSION = 2
+HEADER = struct.Struct("<4sHH")
+RECORD = struct.Struct("<qBI")
+
+class Recorder(object):
+    """ Writes raw pipe frames into the binary file.
+
+    The file starts with the header [magic, version, reserved]. Every record consists of
+    the monotonic time in nanoseconds since the recording start, the stream number,
+    the payload length and the payload bytes exactly as they were read from the pipe.
+    """
+
+    def __init__(self, path):
+        """ Initializer
+
+        :param path: recording file path
+        """
+        self.path = path
+        self.lock = Lock()
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0))
+        self.start = time.monotonic_ns()
+        logging.debug("recording to " + path)
+
+    def write(self, stream, payload):
+        """ Write one frame
+
+        :param stream: stream number
+        :param payload: raw frame bytes
+        """
+        with self.lock:
+            if self.file == None:
+                return
+            self.file.write(RECORD.pack(time.monotonic_ns() - self.start, stream, len(payload)))
+            self.file.write(payload)
+
+    def flush(self):
+        """ Flush buffered records to the file """
+
+        with self.lock:
+            if self.file:
+                self.file.flush()
+
+    def close(self):
+        """ Flush and close the file """
+
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+class Replay(object):
+    """ Reads the file created by Recorder and returns frames according to the elapsed time.
+
+    The file is memory mapped, the record times and offsets are indexed per stream
+    in arrays so the lookup doesn't create objects for the frames which are skipped.
+    """
+
+    def __init__(self, path, speed=1.0, loop=True):
+        """ Initializer
+
+        :param path: recording file path
+        :param speed: replay speed, 2.0 replays two times faster than the original
+        :param loop: True - start from the beginning at the end of the file
+        """
+        self.speed = speed
+        self.loop = loop
+
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _ = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Unsupported recording file: " + path)
+
+        self.times = [array("q") for _ in range(STREAMS)]
+        self.offsets = [array("Q") for _ in range(STREAMS)]
+        self.lengths = [array("I") for _ in range(STREAMS)]
+        self.cursors = [0] * STREAMS
+
+        offset = HEADER.size
+        end = len(self.data) - RECORD.size
+        self.duration = 0
+        while offset <= end:
+            t, stream, length = RECORD.unpack_from(self.data, offset)
+            offset += RECORD.size
+            if offset + length > len(self.data):
+                break
+            if stream < STREAMS:
+                self.times[stream].append(t)
+                self.offsets[stream].append(offset)
+                self.lengths[stream].append(length)
+            self.duration = t
+            offset += length
+
+        self.start = time.monotonic_ns()
+        logging.debug("replaying " + path)
+
+    def get_position(self):
+        """ Get the current replay position
+
+        :return: position in nanoseconds since the recording start
+        """
+        position = int((time.monotonic_ns() - self.start) * self.speed)
+        if position > self.duration and self.loop and self.duration > 0:
+            position %= self.duration
+            self.start = time.monotonic_ns() - int(position / self.speed)
+            self.cursors = [0] * STREAMS
+        return position
+
+    def get_latest(self, stream):
+        """ Get the newest frame which is not in the future
+
+        :param stream: stream number
+        :return: frame bytes or None if there is no frame yet
+        """
+        times = self.times[stream]
+        if not times:
+            return None
+
+        position = self.get_position()
+        cursor = self.cursors[stream]
+        if cursor < len(times) and times[cursor] > position:
+            return None
+
+        while cursor + 1 < len(times) and times[cursor + 1] <= position:
+            cursor += 1
+        self.cursors[stream] = cursor
+
+        offset = self.offsets[stream][cursor]
+        return self.data[offset : offset + self.lengths[stream][cursor]]
+
+    def close(self):
+        """ Release the file """
+
+        self.data.close()
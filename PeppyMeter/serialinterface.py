@@ -72,16 +72,25 @@ class SerialInterface():
         thread.start()
         
     def write_data(self):
-        """ Write data into serial interface """
+        """ Write data into serial interface when new data is published.
+        The update period defines the minimum time between writes.
+        """
         
+        sequence = 0
         while self.running:
-            v = self.data_source.get_current_data()
-            if v:
-                data = self.get_data(v[0], v[1])
-                logging.debug("Serial output: " + data.rstrip())
+            v = self.data_source.publisher.wait_for_frame(sequence, self.update_period)
+            if v == None:
+                continue
+
+            start = time.monotonic()
+            sequence = v.sequence
+            data = self.get_data(v.left, v.right)
+            logging.debug("Serial output: " + data.rstrip())
 
-                self.serial_interface.write(data.encode("utf-8"))
-            time.sleep(self.update_period)
+            self.serial_interface.write(data.encode("utf-8"))
+            wait = self.update_period - (time.monotonic() - start)
+            if wait > 0:
+                time.sleep(wait)
     
     def get_data(self, left, right):
         """ Prepare data for writing. Include time if enabled.
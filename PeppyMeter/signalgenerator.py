@@ -0,0 +1,335 @@
+#! /usr/bin/python3
+# Copyright 2016-2024 PeppyMeter peppy.player@gmail.com
+#
+# This file is part of PeppyMeter.
+#
+# PeppyMeter is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PeppyMeter is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PeppyMeter. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import time
+import errno
+import argparse
+import numpy as np
+
+SIGNAL_PINK = "pink"
+SIGNAL_SWEEP = "sweep"
+SIGNAL_BURST = "burst"
+SIGNAL_SILENCE = "silence"
+SIGNAL_CLIP = "clip"
+
+DEFAULT_PROGRAM = "pink:10,sweep:5,burst:5,silence:2,clip:1"
+# the pipes without reader are opened again after this period in seconds
+OPEN_RETRY_PERIOD = 1.0
+
+class SignalGenerator(object):
+    """ Generates blocks of stereo levels and spectrum bins for load and soak testing.
+
+    Every generator method returns a tuple (levels, bins) where levels is the float32 array
+    with shape (frames, 2) and bins is the float32 array with shape (frames, bins).
+    The values are in the range 0 - max value as they are written by peppyalsa.
+    """
+
+    def __init__(self, rate, bins=20, max_value=100.0, seed=None):
+        """ Initializer
+
+        :param rate: frames per second
+        :param bins: the number of spectrum bins
+        :param max_value: maximum level and bin value
+        :param seed: random seed for reproducible blocks
+        """
+        self.rate = rate
+        self.bins = bins
+        self.max_value = max_value
+        self.random = np.random.RandomState(seed)
+        # pink noise has equal energy per octave, higher bins get less level
+        self.tilt = (1.0 / np.sqrt(np.arange(1, bins + 1))).astype(np.float32)
+        self.functions = {
+            SIGNAL_PINK: self.get_pink_noise,
+            SIGNAL_SWEEP: self.get_sweep,
+            SIGNAL_BURST: self.get_burst,
+            SIGNAL_SILENCE: self.get_silence,
+            SIGNAL_CLIP: self.get_clip
+        }
+
+    def get_frames(self, seconds):
+        """ Get the number of frames for the duration
+
+        :param seconds: duration in seconds
+        :return: the number of frames
+        """
+        return max(1, int(round(seconds * self.rate)))
+
+    def get_block(self, signal, seconds):
+        """ Generate block of the signal
+
+        :param signal: signal name
+        :param seconds: duration in seconds
+        :return: tuple (levels, bins)
+        """
+        return self.functions[signal](self.get_frames(seconds))
+
+    def get_pink_process(self, frames):
+        """ Generate normalized 1/f noise using spectral shaping of white noise
+
+        :param frames: the number of frames
+        :return: float array with zero mean and unit deviation
+        """
+        white = self.random.standard_normal(frames)
+        spectrum = np.fft.rfft(white)
+        f = np.arange(spectrum.shape[0])
+        spectrum[1:] /= np.sqrt(f[1:])
+        spectrum[0] = 0
+        pink = np.fft.irfft(spectrum, frames)
+        deviation = pink.std()
+        if deviation > 0:
+            pink /= deviation
+        return pink
+
+    def get_pink_noise(self, frames):
+        """ Music-like levels: slow 1/f fluctuations with partially correlated channels
+
+        :param frames: the number of frames
+        :return: tuple (levels, bins)
+        """
+        common = self.get_pink_process(frames)
+        levels = np.empty((frames, 2), dtype=np.float32)
+        levels[:, 0] = common + 0.3 * self.get_pink_process(frames)
+        levels[:, 1] = common + 0.3 * self.get_pink_process(frames)
+        levels = self.max_value * (0.6 + 0.15 * levels)
+
+        mono = levels.mean(axis=1)
+        noise = self.random.uniform(0.7, 1.3, (frames, self.bins))
+        bins = mono[:, None] * self.tilt[None, :] * noise
+        return self.limit(levels), self.limit(bins)
+
+    def get_sweep(self, frames):
+        """ Level ramp from zero to the maximum with the spectrum peak moving from the lowest to the highest bin
+
+        :param frames: the number of frames
+        :return: tuple (levels, bins)
+        """
+        ramp = np.linspace(0.0, 1.0, frames, dtype=np.float32)
+        levels = np.repeat((ramp * self.max_value)[:, None], 2, axis=1)
+
+        centers = ramp * (self.bins - 1)
+        positions = np.arange(self.bins, dtype=np.float32)
+        bins = self.max_value * np.exp(-0.5 * ((positions[None, :] - centers[:, None]) / 1.5) ** 2)
+        return self.limit(levels), self.limit(bins)
+
+    def get_burst(self, frames, frequency=4.0, duty=0.5):
+        """ Tone bursts switching between 80% of the maximum and silence
+
+        :param frames: the number of frames
+        :param frequency: bursts per second
+        :param duty: the part of the period when the burst is on
+        :return: tuple (levels, bins)
+        """
+        phase = (np.arange(frames) * frequency / self.rate) % 1.0
+        on = (phase < duty).astype(np.float32)
+        levels = np.repeat((on * 0.8 * self.max_value)[:, None], 2, axis=1)
+        bins = on[:, None] * 0.8 * self.max_value * self.tilt[None, :]
+        return self.limit(levels), self.limit(bins)
+
+    def get_silence(self, frames):
+        """ Silence gap
+
+        :param frames: the number of frames
+        :return: tuple (levels, bins)
+        """
+        return np.zeros((frames, 2), dtype=np.float32), np.zeros((frames, self.bins), dtype=np.float32)
+
+    def get_clip(self, frames):
+        """ Clipping burst at the maximum level in all bins
+
+        :param frames: the number of frames
+        :return: tuple (levels, bins)
+        """
+        levels = np.full((frames, 2), self.max_value, dtype=np.float32)
+        bins = np.full((frames, self.bins), self.max_value, dtype=np.float32)
+        return levels, bins
+
+    def limit(self, values):
+        """ Limit values to the valid range
+
+        :param values: array of values
+        :return: float32 array
+        """
+        return np.clip(values, 0.0, self.max_value).astype(np.float32)
+
+    def get_program(self, program):
+        """ Parse program definition
+
+        :param program: comma separated list of signal:seconds e.g. pink:10,silence:2
+        :return: list of tuples (signal, seconds)
+        """
+        steps = []
+        for step in program.split(","):
+            name, seconds = step.split(":")
+            name = name.strip()
+            if name not in self.functions:
+                raise ValueError("Unknown signal: " + name)
+            steps.append((name, float(seconds)))
+        return steps
+
+def pack_levels(levels):
+    """ Pack levels into the meter pipe format
+
+    :param levels: array with shape (frames, 2)
+    :return: bytes with little-endian 16-bit left and right values per frame
+    """
+    return np.rint(levels).astype("<u2").tobytes()
+
+def pack_bins(bins):
+    """ Pack spectrum bins into the spectrum pipe format
+
+    :param bins: array with shape (frames, bins)
+    :return: bytes with little-endian 32-bit value per bin
+    """
+    return np.rint(bins).astype("<u4").tobytes()
+
+class PipeWriter(object):
+    """ Writes generated blocks into the meter and spectrum pipes at the generator rate.
+    The pipes are written independently and never block the writer. The pipe without reader
+    is opened again every OPEN_RETRY_PERIOD, the frame which doesn't fit into the full pipe is dropped.
+    """
+
+    def __init__(self, generator, meter_pipe=None, spectrum_pipe=None):
+        """ Initializer
+
+        :param generator: signal generator
+        :param meter_pipe: meter pipe name
+        :param spectrum_pipe: spectrum pipe name
+        """
+        self.generator = generator
+        self.meter_pipe = meter_pipe
+        self.spectrum_pipe = spectrum_pipe
+        # pipe name -> file descriptor, None while the pipe has no reader
+        self.pipes = {}
+        self.dropped = {}
+        for name in (meter_pipe, spectrum_pipe):
+            if name:
+                self.pipes[name] = None
+                self.dropped[name] = 0
+        self.open_time = 0
+        self.open_pipes()
+
+    def open_pipes(self):
+        """ Open the pipes which have reader. The non-blocking open fails with ENXIO while there is no reader. """
+
+        self.open_time = time.monotonic()
+        for name, fd in self.pipes.items():
+            if fd != None:
+                continue
+            try:
+                self.pipes[name] = os.open(name, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError as e:
+                if e.errno != errno.ENXIO:
+                    raise
+
+    def write_frame(self, name, data):
+        """ Write frame into the pipe if it has reader and space for the frame
+
+        :param name: pipe name
+        :param data: frame bytes
+        """
+        fd = self.pipes.get(name)
+        if fd == None or data == None:
+            return
+
+        try:
+            os.write(fd, data)
+        except BlockingIOError:
+            self.dropped[name] += 1
+        except BrokenPipeError:
+            # the reader closed the pipe, wait for the next one
+            os.close(fd)
+            self.pipes[name] = None
+
+    def write_block(self, levels, bins):
+        """ Write block frame by frame keeping the frame rate
+
+        :param levels: array with shape (frames, 2)
+        :param bins: array with shape (frames, bins)
+        """
+        meter_data = memoryview(pack_levels(levels))
+        spectrum_data = memoryview(pack_bins(bins))
+        meter_size = 4
+        spectrum_size = 4 * self.generator.bins
+        frames = levels.shape[0]
+        self.write_frames((meter_data[n * meter_size : (n + 1) * meter_size],
+            spectrum_data[n * spectrum_size : (n + 1) * spectrum_size]) for n in range(frames))
+
+    def write_frames(self, frames):
+        """ Write packed frames keeping the frame rate
+
+        :param frames: iterable of tuples (meter frame, spectrum frame), None - the pipe is not written
+        """
+        period = 1.0 / self.generator.rate
+        next_time = time.monotonic()
+
+        for meter_frame, spectrum_frame in frames:
+            if None in self.pipes.values() and time.monotonic() - self.open_time >= OPEN_RETRY_PERIOD:
+                self.open_pipes()
+            self.write_frame(self.meter_pipe, meter_frame)
+            self.write_frame(self.spectrum_pipe, spectrum_frame)
+
+            next_time += period
+            wait = next_time - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            else:
+                next_time = time.monotonic()
+
+    def run(self, program, loop=False):
+        """ Write program into the pipes
+
+        :param program: list of tuples (signal, seconds)
+        :param loop: True - repeat the program forever
+        """
+        while True:
+            for signal, seconds in program:
+                levels, bins = self.generator.get_block(signal, seconds)
+                self.write_block(levels, bins)
+            if not loop:
+                break
+
+    def close(self):
+        """ Close pipes """
+
+        for fd in self.pipes.values():
+            if fd != None:
+                os.close(fd)
+        self.pipes = dict.fromkeys(self.pipes)
+
+if __name__ == "__main__":
+    """ Soak test: write generated signals into the peppyalsa pipes """
+
+    parser = argparse.ArgumentParser(description="Write test signals into the meter and spectrum pipes")
+    parser.add_argument("--meter-pipe", default="/home/volumio/myfifo")
+    parser.add_argument("--spectrum-pipe", default="/home/volumio/myfifosa")
+    parser.add_argument("--rate", type=float, default=60.0, help="frames per second")
+    parser.add_argument("--bins", type=int, default=20, help="the number of spectrum bins")
+    parser.add_argument("--max-value", type=float, default=100.0)
+    parser.add_argument("--program", default=DEFAULT_PROGRAM, help="comma separated signal:seconds")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--loop", action="store_true")
+    args = parser.parse_args()
+
+    generator = SignalGenerator(args.rate, args.bins, args.max_value, args.seed)
+    writer = PipeWriter(generator, args.meter_pipe, args.spectrum_pipe)
+    try:
+        writer.run(generator.get_program(args.program), args.loop)
+    except KeyboardInterrupt:
+        pass
+    writer.close()
@@ -150,6 +150,61 @@ class Vumeter(ScreensaverMeter):
         m = factory.create_meter()
 
         return m
+    def create_meter(self, util, caches):
+        """ Create and start the meter which draws on the screen of the utility object.
+        Called by the meter switcher in the worker thread.
+
+        :param util: utility object with the screen, meter name and image caches
+        :param caches: needle caches in the order returned by get_needle_caches
+        :return: started meter
+        """
+        factory = MeterFactory(util, util.meter_config, self.data_source, *caches)
+        meter = factory.create_meter()
+        meter.set_volume(self.current_volume)
+        meter.start()
+        return meter
+
+    def set_meter(self, meter):
+        """ Stop the current meter and replace it by the started meter
+
+        :param meter: new meter
+        """
+        self.frames = 0
+        if self.meter:
+            self.meter.stop()
+            if hasattr(self, "callback_stop"):
+                self.callback_stop(self.meter)
+
+        self.meter = meter
+        if not self.util.meter_config[USE_CACHE]:
+            self.release_caches(meter.meter_config[METER])
+        self.sio.emit('getState', {})
+        if hasattr(self, "callback_start"):
+            self.callback_start(self.meter)
+
+    def get_needle_caches(self):
+        """ Get needle caches
+
+        :return: list of the mono, left and right needle sprite and rectangle caches
+        """
+        return [self.mono_needle_cache, self.mono_rect_cache, self.left_needle_cache, self.left_rect_cache,
+            self.right_needle_cache, self.right_rect_cache]
+
+    def release_caches(self, keep=None):
+        """ Remove needle sprites from the caches and return the freed memory to the system.
+        Used when the cache is disabled.
+
+        :param keep: the name of the meter which sprites stay in the caches
+        """
+        caches = self.get_needle_caches()
+        kept = [{keep: c[keep]} if keep in c else {} for c in caches]
+        del caches
+        self.mono_needle_cache, self.mono_rect_cache, self.left_needle_cache, self.left_rect_cache, \
+            self.right_needle_cache, self.right_rect_cache = kept
+
+        if hasattr(self, "malloc_trim"):
+            self.malloc_trim()
+
     def switchmeter1(self):
         self.list_meter_index = (self.list_meter_index + 1) % len(self.meterlist)
         self.util.meter_config[METER] = self.meterlist[self.list_meter_index]
@@ -196,24 +251,8 @@ class Vumeter(ScreensaverMeter):
             self.callback_stop(self.meter)
 
         if not self.util.meter_config[USE_CACHE]:
-            del self.mono_needle_cache
-            del self.mono_rect_cache
-            del self.left_needle_cache
-            del self.left_rect_cache
-            del self.right_needle_cache
-            del self.right_rect_cache
-            del self.meter
-
-            if hasattr(self, "malloc_trim"):
-                self.malloc_trim()
-
-            self.mono_needle_cache = {}
-            self.mono_rect_cache = {}
-            self.left_needle_cache = {}
-            self.left_rect_cache = {}
-            self.right_needle_cache = {}
-            self.right_rect_cache = {}
             self.meter = None
+            self.release_caches()
 
     def restart(self):
         """ Restart random meter """
@@ -221,7 +260,7 @@ class Vumeter(ScreensaverMeter):
         self.stop()
         time.sleep(0.2) # let threads stop
         self.start()
-        pygame.display.update(self.util.meter_config[SCREEN_RECT])
+        self.util.damage.add_screen()
     
     def refresh(self):
         """ Refresh meter. Used to update random meter. """
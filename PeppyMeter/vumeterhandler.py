@@ -31,6 +31,6 @@ class VuMeterHandler(RequestHandler):
         try:
             b = self.request.body.decode("utf-8")
             d = json.loads(b)
-            self.data_source.http_data = (d["left"], d["right"], d["mono"])
+            self.data_source.put_http_data((d["left"], d["right"], d["mono"]))
         except Exception as e:
             logging.debug(e)
@@ -7,14 +7,17 @@ import time
 from datetime import datetime
 import signal
 import socketio
+from configparser import ConfigParser
 from PeppyMeter import settings
 
 basedir = '/data/plugins/user_interface/audiotop' if "linux" in sys.platform else '.'
 python = ["./peppymeter.py"] if 'linux' in sys.platform else ["../vvenv/bin/python", "peppymeter.py"]
+acquisitioncmd = ["./acquisition.py"] if 'linux' in sys.platform else ["../vvenv/bin/python", "acquisition.py"]
 sys.stderr = open(basedir+"/audiotop.log","at")
 print(f"Starting audiotop {datetime.now()}",file=sys.stderr,flush=True)
 
 peppy = None
+acquisition = None
 running = True
 info={}
 settings = settings.Settings()
@@ -58,6 +61,27 @@ def closepeppy():
                 print(f"error on killing peppymeter {datetime.now()}", file=sys.stderr, flush=True)
         peppy = None
 
+def usesharedmemory():
+    config = ConfigParser()
+    config.read("config.txt")
+    return config.get("data.source", "type", fallback="pipe") == "shm"
+
+def checkacquisition():
+    global acquisition
+    if not acquisition or acquisition.poll() != None:
+        print(f"starting acquisition {datetime.now()}", file=sys.stderr, flush=True)
+        acquisition = Popen(acquisitioncmd)
+
+def closeacquisition():
+    global acquisition
+    if acquisition:
+        acquisition.terminate()
+        try:
+            acquisition.wait(timeout=TIMETOSPING)
+        except:
+            acquisition.kill()
+        acquisition = None
+
 sio = socketio.Client()
 @sio.on('pushState')
 def on_message(data):
@@ -86,10 +110,13 @@ os.chdir(basedir+"/PeppyMeter")
 
 lasttime = datetime.now()
 alivelasttime = lasttime
+sharedmemory = usesharedmemory()
 
 startsockio()
 while running:
     try:
+        if sharedmemory:
+            checkacquisition()
         if 'status' in info and info['status'] == "play":
             if not peppy or peppy.poll() != None:
                 peppy = Popen(python,stdin=subprocess.PIPE)
@@ -111,5 +138,6 @@ while running:
 else:
     sio.disconnect()
     closepeppy()
+    closeacquisition()
 
 print(f"Stopping audiotop {datetime.now()}",file=sys.stderr,flush=True)
\ No newline at end of file